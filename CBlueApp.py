@@ -40,7 +40,6 @@ import sys
 import utils
 import os
 import json
-import laspy
 from Subaerial import SensorModel, Jacobian
 from Merge import Merge
 from Sbet import Sbet
@@ -82,10 +81,11 @@ def CBlueApp(controller_configuration):
         print(message)
     sbet_dir_value = controller_configuration["directories"]["sbet"]
     selected_sensor_value = controller_configuration["sensor_model"]
-    sbet = Sbet(sbet_dir_value, selected_sensor_value)
+    # UTM zone of binary sbet positions (0 determines the zone from the sbet longitudes)
+    sbet_utm_zone = controller_configuration.get("sbet_utm_zone", 0)
+    sbet = Sbet(sbet_dir_value, selected_sensor_value, sbet_utm_zone)
     sbet.set_data()
     las_dir_value = controller_configuration["directories"]["las"]
-    sensor_model = SensorModel(selected_sensor_value)
     settings_object = UserInput(controller_configuration)
 
     # Create a sensor object initialized to the user's selected sensor
@@ -99,37 +99,50 @@ def CBlueApp(controller_configuration):
         for l in os.listdir(las_dir_value)
         if l.endswith(".las") | l.endswith(".laz")
     ]
+    # process the largest tiles (by las header point count) first
+    las_files = tpu.schedule_las_files(las_files)
     num_las = len(las_files)
 
-    # GENERATE JACOBIAN FOR SENSOR MODEL OBSERVATION EQUATIONS
-    jacobian = Jacobian(sensor_model)
+    if settings_object.multiprocess != "True":
+        # GENERATE JACOBIAN FOR SENSOR MODEL OBSERVATION EQUATIONS
+        # (in multiprocess mode, each worker builds its own, see Tpu.init_worker)
+        jacobian = Jacobian(
+            SensorModel(selected_sensor_value, settings_object.subaerial_backend),
+            settings_object.subaerial_kernel,
+        )
 
-    # CREATE OBJECT THAT PROVIDES FUNCTIONALITY TO MERGE LAS AND TRAJECTORY DATA
-    merge = Merge(sensor_object)
+        # CREATE OBJECT THAT PROVIDES FUNCTIONALITY TO MERGE LAS AND TRAJECTORY DATA
+        merge = Merge(sensor_object)
     logging.cblue(f"processing {num_las} las file(s) ({settings_object.cpu_process_info[0]})...")
     logging.cblue(f"multiprocessing = {settings_object.multiprocess}")
 
     def sbet_las_tiles_generator():
-        """This generator is the 2nd argument for the run_tpu_multiprocessing method,
+        """This generator is the 2nd argument for the run_tpu_singleprocess method,
         to avoid passing entire sbet or list of tiled sbets to the calc_tpu() method"""
         for las_file in las_files:
             sbet_tile = os.path.split(las_file)[-1]
             logging.cblue(f"({sbet_tile}) generating SBET tile...")
-            inFile = laspy.read(las_file)
-            # west = inFile.header.x_min
-            # east = inFile.header.x_max
-            # north = inFile.header.y_max
-            # south = inFile.header.y_min
-            # yield sbet.get_tile_data(north, south, east, west), las_file, jacobian, merge
-
-            time_min = inFile.gps_time.min()
-            time_max = inFile.gps_time.max()
-            yield sbet.get_tile_data_by_time(time_min, time_max), las_file, jacobian, merge
+            # the tile is decoded once, by the Las object created in calc_tpu(),
+            # which then takes the trajectory rows of the tile's time range from
+            # the trajectory time index (see Tpu.get_tile_sbet)
+            yield sbet, las_file, jacobian, merge
 
     if settings_object.multiprocess == "True":
-        p = tpu.run_tpu_multiprocess(num_las, sbet_las_tiles_generator())
-        p.close()
-        p.join()
+        # the workers memory map the shared trajectory, so only the las file
+        # path of each tile is sent to them (see Sbet.share_data)
+        shared_sbet = sbet.share_data()
+        try:
+            if settings_object.parallel_unit == "flight_line" and not settings_object.chunk_size:
+                p = tpu.run_tpu_multiprocess_flight_lines(num_las, las_files, shared_sbet)
+            else:
+                if settings_object.parallel_unit == "flight_line":
+                    # the flight line tasks need the whole tile decoded
+                    logging.cblue("chunk_size is set, processing whole tiles in parallel (parallel_unit = tile)")
+                p = tpu.run_tpu_multiprocess(num_las, las_files, shared_sbet)
+            p.close()
+            p.join()
+        finally:
+            sbet.release_shared_data()
     elif settings_object.multiprocess == "False":
         tpu.run_tpu_singleprocess(num_las, sbet_las_tiles_generator())
     else:
@@ -210,6 +223,26 @@ if __name__ == "__main__":
                         " with the settings for the current run.\n*WARNING* --save_config is not recommended when running multiple cBlue"\
                         " CLI processes concurrently\n          because of potential multi-write conflicts.\n\n")
     parser.add_argument("--just_save_config", action="store_true", help="Do not run cBLUE process and update the cblue_configuration file only.")
+    # Chunked processing
+    parser.add_argument("-chunk_size", default=None, type=int, help="Process each LAS/LAZ tile in chunks of this many points, so memory use depends on"\
+                        " the chunk size instead of the tile size.\nOverrides chunk_size in cblue_configuration.json (0 processes whole tiles).\n\n")
+    # Multiprocessing
+    parser.add_argument("-number_cores", default=None, type=int, help="Number of worker processes that process the LAS/LAZ tiles"\
+                        " (1 processes the tiles in a single process).\nOverrides multiprocess and number_cores in cblue_configuration.json.\n\n")
+    parser.add_argument("-parallel_unit", default=None, choices=["tile", "flight_line"], help="Unit of parallel work when multiprocessing:"\
+                        " whole LAS/LAZ tiles or the flight lines of the tiles.\nOverrides parallel_unit in cblue_configuration.json.\n\n")
+    parser.add_argument("-flight_line_block_size", default=None, type=int, help="With -parallel_unit flight_line, split flight lines into"\
+                        " blocks of at most this many points.\nOverrides flight_line_block_size in cblue_configuration.json"\
+                        " (0 doesn't split flight lines).\n\n")
+    # Subaerial Jacobian evaluation
+    parser.add_argument("-subaerial_kernel", default=None, choices=["cse", "terms", "fused"], help="Evaluation of the subaerial Jacobian:"\
+                        " a single common-subexpression kernel, one function per Jacobian term, or a fused kernel that"\
+                        " calculates the subaerial THU/TVU without evaluating the Jacobian into arrays.\nOverrides"\
+                        " subaerial_kernel in cblue_configuration.json.\n\n")
+    # Subaerial numeric backend
+    parser.add_argument("-subaerial_backend", default=None, choices=["numexpr", "numpy", "numba"], help="Numeric backend"\
+                        " used to evaluate the sensor model and its Jacobian (numba requires the numba package).\nOverrides"\
+                        " subaerial_backend in cblue_configuration.json.\n\n")
     # Water Surface Ellipsoid Height
     parser.add_argument("water_height", help="Nominal water surface ellipsoid height in meters. Enter a float value.\n"\
                         "Note: In CONUS locations, this will be a negative number.\n      "\
@@ -239,6 +272,12 @@ if __name__ == "__main__":
     save_config = args.save_config
     just_save_config = args.just_save_config
     water_height = float(args.water_height)
+    chunk_size = args.chunk_size
+    number_cores = args.number_cores
+    parallel_unit = args.parallel_unit
+    flight_line_block_size = args.flight_line_block_size
+    subaerial_kernel = args.subaerial_kernel
+    subaerial_backend = args.subaerial_backend
 
     # UPDATE CONFIG
     with open("cblue_configuration.json", "r") as config:
@@ -261,6 +300,19 @@ if __name__ == "__main__":
     config_dict["las_option"] = las
     config_dict["laz_option"] = laz
     config_dict["water_surface_ellipsoid_height"] = water_height
+    if chunk_size is not None:
+        config_dict["chunk_size"] = chunk_size
+    if number_cores is not None:
+        config_dict["number_cores"] = number_cores
+        config_dict["multiprocess"] = "True" if number_cores > 1 else "False"
+    if parallel_unit is not None:
+        config_dict["parallel_unit"] = parallel_unit
+    if flight_line_block_size is not None:
+        config_dict["flight_line_block_size"] = flight_line_block_size
+    if subaerial_kernel is not None:
+        config_dict["subaerial_kernel"] = subaerial_kernel
+    if subaerial_backend is not None:
+        config_dict["subaerial_backend"] = subaerial_backend
 
     if just_save_config:
         # Update the config file and exit without running cBLUE.     
@@ -43,6 +43,72 @@ import laspy
 
 logger = logging.getLogger(__name__)
 
+
+
+class LasPoints:
+    """columns of las points (see Las.get_flight_line)
+
+    Each column is a 1-d array with its own dtype, instead of a column of a
+    float64 array of all the fields.  The coordinates and the gps time are
+    float64, and the integer fields keep their las dtypes, e.g., the
+    classification is uint8.  The columns that are read as they are from the
+    decoded points (e.g., gps time, classification) are views of the point
+    record, not copies.
+
+    Indexing with a column name returns the column, and indexing with an
+    index array or a mask returns the LasPoints of those points.
+
+    ===============     =======================================     ==============
+    column              description                                 sensor type
+    ===============     =======================================     ==============
+    x, y, z             coordinates                                 all
+    t                   gps time (in the trajectory time base)      all
+    classification      classification                              all
+    scan_angle          scan angle (0.006 degree units)             multi
+    scanner_channel     scanner channel                             single_hawkeye
+    user_data           user data                                   single_hawkeye
+    ===============     =======================================     ==============
+    """
+
+    def __init__(self, columns):
+        self.columns = columns  # {name: ndarray}
+
+    def __len__(self):
+        return len(self.columns["t"])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return LasPoints({name: col[key] for name, col in self.columns.items()})
+
+    def to_records(self, **extra_columns):
+        """returns the points as a structured array (e.g., to be saved to a file)
+
+        :param extra_columns: additional columns of the records (e.g., the index of the points)
+        :return: ndarray
+        """
+
+        columns = {**self.columns, **extra_columns}
+        records = np.empty(len(self), dtype=[(name, col.dtype) for name, col in columns.items()])
+        for name, col in columns.items():
+            records[name] = col
+        return records
+
+    @staticmethod
+    def from_records(records, start=0, end=None):
+        """returns the points of rows start:end of a structured array written by to_records()
+
+        Each column is copied to a contiguous array (e.g., from a memory mapped file).
+
+        :param ndarray records: structured array
+        :param int start: first row
+        :param int end: last row (exclusive)
+        :return: LasPoints
+        """
+
+        return LasPoints({name: np.array(records[name][start:end]) for name in records.dtype.names})
+
+
 """
 This class provides the functionality to load las files into cBLUE.  One Las object
 is created for each loaded las file.
@@ -50,23 +116,102 @@ is created for each loaded las file.
 
 
 class Las:
-    def __init__(self, las):
+    # {las file path: bytes decoded} of the point data decoded by this process, counting
+    # every pass over the file (e.g., both passes of the chunked mode)
+    decoded_file_bytes = {}
+
+    def __init__(self, las, time_offset=0.0):
         self.las = las
+        # offset added to the gps_time of the points to convert them to the
+        # time base of the trajectory (see Sbet.get_las_time_offset)
+        self.time_offset = time_offset
         self.las_short_name = os.path.split(las)[-1]
         if ".las" in self.las_short_name:
             self.las_base_name = self.las_short_name.replace(".las", "")
         else:
             self.las_base_name = self.las_short_name.replace(".laz", "")
-        self.inFile = laspy.read(self.las)
+
+        # ingestion counters, used to confirm each tile is only decoded once
+        self.num_reads = 0
+        self.bytes_read = 0  # size of the (possibly compressed) file on disk
+        self.decoded_bytes = 0  # size of the decoded point buffer
+
+        self.inFile = self.read()
         self.points_to_process = self.inFile.points
         self.unq_flight_lines = self.get_flight_line_ids()
         self.num_file_points = self.points_to_process.array.shape[0]
 
-        """index list that would sort gps_time (to be used to
-        later when exporting las data and calculated tpu to a las
-        file
+    def read(self):
+        """decodes the las (or laz) file
+
+        This is the only place cBLUE decodes the point data of a tile.  The
+        decoded data are used for the TPU calculations and for the write-back
+        of the TPU extra bytes, so each tile is only decompressed once.
+
+        :return: laspy.LasData
+        """
+
+        in_file = laspy.read(self.las)
+        self.num_reads += 1
+        self.bytes_read += os.path.getsize(self.las)
+        self.decoded_bytes += in_file.points.array.nbytes
+        self.count_decode(self.las, in_file.points.array.nbytes)
+        return in_file
+
+    @classmethod
+    def count_decode(cls, las_file, num_bytes):
+        """adds decoded point data of a las file to the bytes decoded by this process
+
+        :param str las_file: path of the las (or laz) file
+        :param int num_bytes: size of the decoded points
+        :return: None
         """
-        self.t_argsort = None
+
+        cls.decoded_file_bytes[las_file] = cls.decoded_file_bytes.get(las_file, 0) + num_bytes
+
+    def log_read_stats(self):
+        """logs the number of reads and the bytes read/decoded for this tile
+
+        The decoded bytes are those of every decode of the tile's point data
+        by this process (see count_decode()), not only of this Las object, so
+        a tile decoded once is reported as one pass over its point data.
+        """
+
+        decoded_bytes = self.decoded_file_bytes.get(self.las, 0)
+        logger.las(
+            "({}) {} read(s), {:,} bytes read from disk, {:,} bytes decoded ({:.1f} pass(es) over the point data)".format(
+                self.las_short_name,
+                self.num_reads,
+                self.bytes_read,
+                decoded_bytes,
+                decoded_bytes / self.decoded_bytes if self.decoded_bytes else 0.0,
+            )
+        )
+
+    def get_time_range(self):
+        """returns the minimum and maximum time of the decoded points
+
+        The times are converted to the time base of the trajectory with the
+        time offset (see Sbet.get_las_time_offset), so the range can be used
+        to select the trajectory of the tile (see Tpu.get_tile_sbet).
+
+        :return: (float, float)
+        """
+
+        t = self.points_to_process["gps_time"]
+
+        return t.min() + self.time_offset, t.max() + self.time_offset
+
+    @staticmethod
+    def get_num_points(las_file):
+        """returns the number of points of a las file (from its header only)
+
+        :param str las_file: path of the las (or laz) file
+        :return: int
+        """
+
+        with laspy.open(las_file) as reader:
+            return reader.header.point_count
 
     def get_bathy_points(self, subaqueous_classes):
         bathy_inds = self.inFile.raw_classification in subaqueous_classes
@@ -90,14 +235,23 @@ class Las:
         scale and offset values in the las file header are used to convert
         the integer values to decimal values with centimeter precision.
 
-        :param ? fl:
-        :return: np.array, np.array, np.array, np.array
+        The points are returned in las order; they are sorted by time once per
+        tile when they are matched to the trajectory (see Merge.match_tile).
+
+        The fields are returned as columns with their own dtypes (see
+        LasPoints), rather than stacked into one float64 array, so the fields
+        read as they are from the decoded points aren't copied.
+
+        :param str sensor_type: "single", "single_hawkeye", or "multi" beam
+        :return: LasPoints, np.array las data and flight line id of the points
         """
 
         # xyz_to_coordinate converts the x, y, z integer values to coordinate values
         x, y, z = self.xyz_to_coordinate()
 
         t = self.points_to_process["gps_time"]
+        if self.time_offset:
+            t = t + self.time_offset
 
         if "classification" in self.points_to_process.array.dtype.names:
             c = self.points_to_process["classification"]
@@ -106,30 +260,24 @@ class Las:
         else:
             raise Exception("Unknown las version or missing classification attribute.")
 
-        self.t_argsort = t.argsort()
+        columns = {"x": x, "y": y, "z": z, "t": np.asarray(t), "classification": np.asarray(c)}
 
         # Check if this is a multi beam sensor, if it is the subaqueous processing requires fan angle (scan angle)
         if(sensor_type == "multi"):
-            # Get the fan angle and multiply it by 0.006 to convert to degrees
-            fan_angle = self.inFile.scan_angle*0.006
-            # Add x, y, z, gps time, classification, and fan angle (scan angle) to an array together
-            las_data = np.vstack([x, y, z, t, c, fan_angle]).T
-            # logger.las(f"{sensor_type} Fan Angle: {fan_angle}")
+            # The scan angle (in 0.006 degree units) is converted to a fan angle in degrees by Merge.merge
+            columns["scan_angle"] = np.asarray(self.inFile.scan_angle)
         # Check if this is a HawkEye sensor, if it is the subaquous processing will require 
         # the scanner channel and user data.
         elif(sensor_type == "single_hawkeye"):
-            scanner_channel = self.inFile.scanner_channel
-            user_data = self.inFile.user_data
-            # Add x, y, z, gps time, classification, scanner channel, and user data to an array together
-            las_data = np.vstack([x, y, z, t, c, scanner_channel, user_data]).T
-        else:
-            # Fan angle, is not used by the other sensors
-            # Add x, y, z, gps time, and classification to an array together
-            las_data = np.vstack([x, y, z, t, c]).T
+            columns["scanner_channel"] = np.asarray(self.inFile.scanner_channel)
+            columns["user_data"] = np.asarray(self.inFile.user_data)
+        # Fan angle, is not used by the other sensors
+
+        las_data = LasPoints(columns)
 
         flight_lines = self.points_to_process["pt_src_id"]
 
-        return las_data, self.t_argsort, flight_lines
+        return las_data, flight_lines
 
     
     def xyz_to_coordinate(self):
@@ -172,3 +320,46 @@ class Las:
         # print(f"z: {z}")
 
         return x, y, z
+
+
+class LasChunk(Las):
+    """
+    A fixed-size chunk of the points of a las file, used by the chunked (streaming)
+    TPU mode.  The chunk provides the same interface as Las (e.g., get_flight_line()),
+    but only holds the points decoded by one step of laspy's chunk_iterator.
+    """
+
+    def __init__(self, las, header, points, start, time_offset=0.0):
+        self.header = header
+        self.points = points
+        # index of the first point of the chunk in the las file
+        self.start = start
+        super().__init__(las, time_offset)
+
+    def read(self):
+        """wraps the chunk's points (already decoded by the chunk iterator)
+
+        :return: laspy.LasData
+        """
+
+        in_file = laspy.LasData(header=self.header, points=self.points)
+        self.decoded_bytes += in_file.points.array.nbytes
+        self.count_decode(self.las, in_file.points.array.nbytes)
+        return in_file
+
+    @staticmethod
+    def iter_chunks(las_file, chunk_size, time_offset=0.0):
+        """generates the points of a las file in chunks of chunk_size points
+
+        :param str las_file: path of the las (or laz) file
+        :param int chunk_size: number of points decoded at a time
+        :param float time_offset: see Las
+        :return: generator of LasChunk
+        """
+
+        start = 0
+        with laspy.open(las_file) as reader:
+            for points in reader.chunk_iterator(chunk_size):
+                if len(points):
+                    yield LasChunk(las_file, reader.header, points, start, time_offset)
+                    start += len(points)
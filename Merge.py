@@ -42,6 +42,176 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class TileMatch:
+    """SBET↔LAS timestamp match of all the points of a las tile (see Merge.match_tile)
+
+    The points of the tile are sorted by time and matched to the trajectory
+    once, and each flight line takes its slice of the sorted points and of
+    the match.
+    """
+
+    def __init__(self, las_data, las_idx, flight_lines, sbet_ticks, idx, mask):
+        self.las_data = las_data  # las points sorted by time (see Las.LasPoints)
+        self.las_idx = las_idx  # index of the sorted points in the tile
+        self.flight_lines = flight_lines  # flight line id of the sorted points
+        self.sbet_ticks = sbet_ticks  # see Merge.get_sbet_ticks()
+        self.idx = idx  # matched sbet row of the sorted points
+        self.mask = mask  # whether the sorted points are matched
+
+    def get_flight_line(self, fl):
+        """returns the points of a flight line, sorted by time, and their match
+
+        :param fl: flight line id
+        :return: (LasPoints, ndarray, tuple) las points, index of the points in the tile,
+            and the (idx, mask) match of the points (see Merge.merge)
+        """
+
+        fl_pos = np.flatnonzero(self.flight_lines == fl)
+
+        return (
+            self.las_data[fl_pos],
+            self.las_idx[fl_pos],
+            (self.idx[fl_pos], self.mask[fl_pos]),
+        )
+
+
+class MergedData:
+    """sbet & las data of the merged points of a flight line (see Merge.merge)
+
+    Holds the las columns of the merged points and a single gather index of
+    their matched rows in the trajectory, instead of a copy of the matched
+    trajectory rows.  Indexing a row (e.g., data[8]) returns the same values
+    as the row of the merged data array (see the table of Merge.merge); the
+    sbet rows are gathered from the trajectory when they are read, and
+    data[:, mask] returns the merged data of a subset of the points.
+
+    The trajectory is ~200 Hz, so each of its epochs is matched by many
+    points.  The attitude-only terms (e.g., the radians, sines, and cosines
+    of roll, pitch, and heading) are calculated once per epoch of the range
+    of trajectory rows matched by the points, and gathered by index (see
+    get_epoch_terms); the subsets of the points share these terms.
+    """
+
+    # sbet column of the sbet rows, and whether it is converted to radians
+    sbet_rows = {
+        0: (0, False),  # t_sbet
+        5: (3, False),  # x_sbet
+        6: (4, False),  # y_sbet
+        7: (5, False),  # z_sbet
+        8: (6, True),  # roll
+        9: (7, True),  # pitch
+        10: (8, True),  # heading
+    }
+
+    def __init__(self, sbet_data, sbet_idx, las_data, stddev_consts, epochs=None):
+        self.sbet_data = sbet_data  # trajectory (not copied)
+        self.sbet_idx = sbet_idx  # matched sbet row of the merged points
+        self.las_data = las_data  # t_las, x_las, y_las, z_las rows of the merged points
+        self.stddev_consts = stddev_consts  # (std_a, std_b, std_rho)
+        self.stddev = MergedStddev(self)
+
+        if epochs is None:
+            # the range of trajectory rows matched by the points, and the terms calculated for them
+            first = int(sbet_idx.min()) if sbet_idx.size else 0
+            last = int(sbet_idx.max()) + 1 if sbet_idx.size else 0
+            epochs = (slice(first, last), {})
+        self.epochs, self.epoch_terms = epochs
+        self.epoch_pos = sbet_idx - self.epochs.start  # epoch of the points, in the range
+
+    @property
+    def shape(self):
+        return len(self.sbet_rows) + self.las_data.shape[0], self.sbet_idx.size
+
+    def get_epoch_column(self, col):
+        """returns a trajectory column, converted to radians, at the matched epochs
+
+        :param int col: sbet column
+        :return: ndarray
+        """
+
+        key = ("radians", col)
+        if key not in self.epoch_terms:
+            self.epoch_terms[key] = np.radians(self.sbet_data[self.epochs, col])
+        return self.epoch_terms[key]
+
+    def get_epoch_terms(self, name, f):
+        """returns attitude-only terms, calculated once per matched trajectory epoch
+
+        :param name: key of the terms (e.g., the name and eval type of f)
+        :param f: function of roll, pitch, and heading (radians) that returns a tuple of arrays
+        :return: (tuple(ndarray), ndarray) terms at the epochs, and the epoch of the points
+        """
+
+        if name not in self.epoch_terms:
+            self.epoch_terms[name] = f(*(self.get_epoch_column(col) for col in (6, 7, 8)))
+        return self.epoch_terms[name], self.epoch_pos
+
+    def gather(self, col, to_radians):
+        if to_radians:
+            return self.get_epoch_column(col)[self.epoch_pos]
+        return self.sbet_data[self.sbet_idx, col]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):  # data[:, points]
+            rows, points = key
+            if rows != slice(None):
+                raise IndexError("only all the rows of the merged data can be selected")
+            return MergedData(
+                self.sbet_data,
+                self.sbet_idx[points],
+                self.las_data[:, points],
+                self.stddev_consts,
+                (self.epochs, self.epoch_terms),
+            )
+        if 1 <= key <= 4:
+            return self.las_data[key - 1]
+        return self.gather(*self.sbet_rows[key])
+
+
+class MergedStddev:
+    """standard deviations of the merged points of a flight line (see Merge.merge)
+
+    Rows are indexed as the rows of the merged stddev array; std_a, std_b,
+    and std_rho are the same for all the points, so they are returned as
+    scalars that broadcast against the rows gathered from the trajectory.
+    """
+
+    # sbet column of the sbet rows, and whether it is converted to radians
+    sbet_rows = {
+        2: (12, True),  # std_r
+        3: (13, True),  # std_p
+        4: (14, True),  # std_h
+        5: (9, False),  # stdx_sbet
+        6: (10, False),  # stdy_sbet
+        7: (11, False),  # stdz_sbet
+    }
+    const_rows = {0: 0, 1: 1, 8: 2}  # std_a, std_b, std_rho
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def shape(self):
+        return len(self.sbet_rows) + len(self.const_rows), self.data.sbet_idx.size
+
+    def __getitem__(self, key):
+        if key in self.const_rows:
+            return self.data.stddev_consts[self.const_rows[key]]
+        return self.data.gather(*self.sbet_rows[key])
+
+    def to_array(self):
+        """returns the standard deviations as an ndarray, with the constant rows broadcast
+
+        :return: ndarray
+        """
+
+        num_rows, num_points = self.shape
+        stddev = np.empty((num_rows, num_points))
+        for row in range(num_rows):
+            stddev[row] = self[row]
+        return stddev
+
+
 class Merge:
 
     max_allowable_dt = 1.0  # second
@@ -51,6 +221,135 @@ class Merge:
         self.b_std_dev = sensor_object.b_std_dev  # degrees
         self.std_rho = sensor_object.std_rho
 
+    @staticmethod
+    def get_sort_order(a):
+        """returns the stable sort order of an array, or None if it is already sorted
+
+        Checking whether the array is sorted is O(N), so the sort is skipped
+        for already sorted data (e.g., the trajectory, sorted when it is loaded).
+
+        :param ndarray a: array
+        :return: ndarray or None
+        """
+
+        if a.size < 2 or np.all(a[1:] >= a[:-1]):
+            return None
+        return np.argsort(a, kind="mergesort")
+
+    @staticmethod
+    def get_ticks(t, time_round_decimals=7):
+        """returns times as integer ticks (e.g., 0.1 microsecond ticks for 7 decimals)
+
+        :param t: times (ndarray or float)
+        :param int time_round_decimals: decimal rounding of the times
+        :return: ndarray (int64)
+        """
+
+        scale = int(10 ** int(time_round_decimals))
+        return np.round(np.asarray(t) * scale).astype(np.int64)
+
+    @staticmethod
+    def get_sbet_ticks(sbet_data, time_round_decimals=7):
+        """returns the sbet times as sorted integer ticks
+
+        The ticks are built once per tile and reused to match all of its points
+        (or taken from the trajectory time index, see Sbet.TimeIndex.get_ticks).
+
+        :param ndarray sbet_data: sbet data
+        :param int time_round_decimals: decimal rounding of the times
+        :return: (ndarray, ndarray) sorted ticks, and the sort order of the sbet rows (None if sorted)
+        """
+
+        t_sbet_i = Merge.get_ticks(sbet_data[:, 0], time_round_decimals)
+        order = Merge.get_sort_order(t_sbet_i)
+        if order is not None:
+            t_sbet_i = t_sbet_i[order]
+        return t_sbet_i, order
+
+    @staticmethod
+    def get_max_dt(sbet_data, fl_las_data, idx, mask):
+        """returns the max absolute delta time of the matched points (an empty array if none are matched)"""
+
+        dt = sbet_data[:, 0][idx[mask]] - fl_las_data["t"][mask]
+        return np.max(np.abs(dt)) if dt.size else np.array([])
+
+    @staticmethod
+    def get_nearest_candidates(left, right, xs, ys, zs, xl, yl, zl):
+        """returns the sbet row nearest to each las point among its candidate rows
+
+        The candidates of a las point are the sbet rows [left, right) that
+        share its matched time tick.  The squared distances of all the
+        (point, candidate) pairs are computed at once, one run of candidates
+        after the other, and the first minimum of each run is selected (as
+        np.argmin would for each point).
+
+        :param ndarray left: first candidate row of each las point
+        :param ndarray right: last candidate row (exclusive) of each las point
+        :param ndarray xs: sbet x (ys, zs: y, z)
+        :param ndarray xl: las x of each las point (yl, zl: y, z)
+        :return: ndarray sbet row of each las point
+        """
+
+        num_candidates = right - left
+        starts = np.cumsum(num_candidates) - num_candidates  # start of the run of each point
+
+        # the (point, candidate) pairs, one run after the other
+        point = np.repeat(np.arange(left.size), num_candidates)
+        candidate = np.arange(point.size) - starts[point] + left[point]
+
+        dx = xs[candidate] - xl[point]
+        dy = ys[candidate] - yl[point]
+        dz = zs[candidate] - zl[point]
+        d = dx*dx + dy*dy + dz*dz
+
+        # first minimum of each run
+        is_min = np.flatnonzero(d == np.minimum.reduceat(d, starts)[point])
+        first_min = is_min[np.r_[True, point[is_min[1:]] != point[is_min[:-1]]]]
+
+        return candidate[first_min]
+
+    def is_merged(self, max_dt):
+        """whether the max delta time of a match allows the data to be merged"""
+
+        if isinstance(max_dt, np.ndarray) and max_dt.size == 0:
+            return False
+        return not max_dt > self.max_allowable_dt
+
+    def match_tile(self, sbet_data, las_data, flight_lines, sbet_ticks=None, *, time_round_decimals=7, tie_eps=1e-9):
+        """matches all the points of a las tile to the trajectory
+
+        The points are sorted by time once per tile (the sort is skipped if
+        they already are), in the same deterministic order in which merge()
+        sorts the points of a flight line, so each flight line takes its
+        slice of the match (see TileMatch.get_flight_line).
+
+        :param ndarray sbet_data: sbet data of the tile
+        :param LasPoints las_data: las points of the tile (see Las.get_flight_line)
+        :param ndarray flight_lines: flight line id of the points
+        :param tuple sbet_ticks: see get_sbet_ticks() (built if None)
+        :return: TileMatch
+        """
+
+        las_idx = self.get_sort_order(np.round(las_data["t"], 9))
+        if las_idx is None:
+            las_idx = np.arange(len(las_data))
+        else:
+            las_data = las_data[las_idx]
+            flight_lines = np.asarray(flight_lines)[las_idx]
+
+        if sbet_ticks is None:
+            sbet_ticks = self.get_sbet_ticks(sbet_data, time_round_decimals)
+
+        idx, mask, __ = self.match_timestamps(
+            sbet_data,
+            las_data,
+            time_round_decimals=time_round_decimals,
+            tie_eps=tie_eps,
+            sbet_ticks=sbet_ticks,
+        )
+
+        return TileMatch(las_data, las_idx, np.asarray(flight_lines), sbet_ticks, idx, mask)
+
     @staticmethod
     def _print_match_debug(label, t_las, fl_las_data, idx, mask, t_sbet, idx_out, *,
                            target=None, tol_t=1e-7, tol_xy=1e-2, tol_z=1e-2):
@@ -70,9 +369,9 @@ class Merge:
             tt, xx, yy, zz = target
             matches = np.where(
                 np.isclose(t_las, tt, atol=tol_t)
-                & np.isclose(fl_las_data[:, 0], xx, atol=tol_xy)
-                & np.isclose(fl_las_data[:, 1], yy, atol=tol_xy)
-                & np.isclose(fl_las_data[:, 2], zz, atol=tol_z)
+                & np.isclose(fl_las_data["x"], xx, atol=tol_xy)
+                & np.isclose(fl_las_data["y"], yy, atol=tol_xy)
+                & np.isclose(fl_las_data["z"], zz, atol=tol_z)
             )[0]
 
         if not matches.size:
@@ -81,7 +380,7 @@ class Merge:
 
         i = int(matches[0])
         print(f"\nDEBUG({label}):")
-        print(" LAS t,x,y,z:", float(t_las[i]), float(fl_las_data[i, 0]), float(fl_las_data[i, 1]), float(fl_las_data[i, 2]))
+        print(" LAS t,x,y,z:", float(t_las[i]), float(fl_las_data["x"][i]), float(fl_las_data["y"][i]), float(fl_las_data["z"][i]))
         print(" initial idx:", int(idx[i]))
 
         if 0 < idx[i] < len(t_sbet):
@@ -107,7 +406,8 @@ class Merge:
         *,
         time_round_decimals=7,
         tie_eps=1e-9,
-        debug_target=None
+        debug_target=None,
+        sbet_ticks=None
     ):
         """
         Deterministic SBET↔LAS timestamp matching.
@@ -119,34 +419,43 @@ class Merge:
         Assumes SBET columns:
         time: col 0
         x,y,z: cols 3,4,5   (as used later in merge())
-        LAS flightline array columns:
-        x,y,z: cols 0,1,2
-        time: col 3
+        LAS flightline columns (see Las.LasPoints):
+        x,y,z: "x", "y", "z"
+        time: "t"
+
+        sbet_ticks: the sorted sbet ticks of get_sbet_ticks(), reused across
+        flight lines (built if None)
         """
 
         # --- float times for dt output ---
         t_sbet_f = np.asarray(sbet_data[:, 0])
-        t_las_f  = np.asarray(fl_las_data[:, 3])
+        t_las_f  = fl_las_data["t"]
 
         # --- integer ticks for matching ---
         scale = int(10 ** int(time_round_decimals))
-        t_sbet_i = np.round(t_sbet_f * scale).astype(np.int64)
-        t_las_i  = np.round(t_las_f  * scale).astype(np.int64)
-
-        # --- SBET sort by time ticks (stable) ---
-        order = np.argsort(t_sbet_i, kind="mergesort")
-        t_sbet_i_s = t_sbet_i[order]
-        t_sbet_f_s = t_sbet_f[order]
+        t_las_i  = self.get_ticks(t_las_f, time_round_decimals)
+
+        # --- SBET sort by time ticks (stable), skipped if the SBET is sorted ---
+        if sbet_ticks is None:
+            sbet_ticks = self.get_sbet_ticks(sbet_data, time_round_decimals)
+        t_sbet_i_s, order = sbet_ticks
+        if order is None:
+            t_sbet_f_s = t_sbet_f
+            xs_s = np.asarray(sbet_data[:, 3])
+            ys_s = np.asarray(sbet_data[:, 4])
+            zs_s = np.asarray(sbet_data[:, 5])
+        else:
+            t_sbet_f_s = t_sbet_f[order]
 
-        # SBET positions in the same sorted order
-        xs_s = np.asarray(sbet_data[:, 3])[order]
-        ys_s = np.asarray(sbet_data[:, 4])[order]
-        zs_s = np.asarray(sbet_data[:, 5])[order]
+            # SBET positions in the same sorted order
+            xs_s = np.asarray(sbet_data[:, 3])[order]
+            ys_s = np.asarray(sbet_data[:, 4])[order]
+            zs_s = np.asarray(sbet_data[:, 5])[order]
 
         # LAS positions
-        xl = np.asarray(fl_las_data[:, 0])
-        yl = np.asarray(fl_las_data[:, 1])
-        zl = np.asarray(fl_las_data[:, 2])
+        xl = fl_las_data["x"]
+        yl = fl_las_data["y"]
+        zl = fl_las_data["z"]
 
         # --- time match using searchsorted ---
         idx = np.searchsorted(t_sbet_i_s, t_las_i, side="left")
@@ -192,20 +501,16 @@ class Merge:
         right = np.searchsorted(t_sbet_i_s, chosen_tick, side="right")
         dup = (right - left) > 1
 
-        # only loop over the ambiguous (duplicate) matches — typically small
+        # only the ambiguous (duplicate) matches, best candidate in sorted SBET space
         dup_idx = np.where(mask & dup)[0]
-        for j in dup_idx:
-            l = int(left[j]); r = int(right[j])
-            # candidates are SBET rows with exactly the same time tick
-            dx = xs_s[l:r] - xl[j]
-            dy = ys_s[l:r] - yl[j]
-            dz = zs_s[l:r] - zl[j]
-            k = int(np.argmin(dx*dx + dy*dy + dz*dz))
-            idx_s[j] = l + k  # best candidate in sorted SBET space
+        if dup_idx.size:
+            idx_s[dup_idx] = self.get_nearest_candidates(
+                left[dup_idx], right[dup_idx], xs_s, ys_s, zs_s, xl[dup_idx], yl[dup_idx], zl[dup_idx]
+            )
 
         # map from sorted SBET space back to original SBET indices
         idx_out = idx.copy()
-        idx_out[mask] = order[idx_s[mask]]
+        idx_out[mask] = idx_s[mask] if order is None else order[idx_s[mask]]
 
         # --- optional debug (time or (t,x,y,z)) using your helper if you want ---
         # if you want to keep your existing debug helper, call it here.
@@ -226,9 +531,9 @@ class Merge:
             tt, xx, yy, zz = debug_target
             m = np.where(
                 np.isclose(t_las_f, tt, atol=1e-7) &
-                np.isclose(fl_las_data[:,0], xx, atol=1e-2) &
-                np.isclose(fl_las_data[:,1], yy, atol=1e-2) &
-                np.isclose(fl_las_data[:,2], zz, atol=1e-2)
+                np.isclose(fl_las_data["x"], xx, atol=1e-2) &
+                np.isclose(fl_las_data["y"], yy, atol=1e-2) &
+                np.isclose(fl_las_data["z"], zz, atol=1e-2)
             )[0]
             if m.size:
                 i = int(m[0])
@@ -241,8 +546,7 @@ class Merge:
                         "STDrph=", float(sbet_data[k,12]), float(sbet_data[k,13]), float(sbet_data[k,14]))
 
 
-        dt = t_sbet_f[idx_out[mask]] - t_las_f[mask]
-        max_dt = np.max(np.abs(dt)) if dt.size else np.array([])
+        max_dt = self.get_max_dt(sbet_data, fl_las_data, idx_out, mask)
 
         return idx_out, mask, max_dt
 
@@ -250,7 +554,7 @@ class Merge:
 
     def merge(self, las_short_name, fl, sbet_data, fl_unsorted_las_xyztcf, fl_las_idx, sensor_object,
               *, context_label="", debug_target=None,
-              time_round_decimals=7, tie_eps=1e-9):
+              time_round_decimals=7, tie_eps=1e-9, match=None):
         """returns sbet & las data merged based on timestamps
 
         The cBLUE TPU calculations require the sbet and las data to be in
@@ -269,8 +573,8 @@ class Merge:
         ----------
         sbet_data : ndarray
             SBET data.
-        fl_unsorted_las_xyztcf : ndarray
-            Flightline LAS-derived array, columns: x,y,z,t,classification, ...
+        fl_unsorted_las_xyztcf : LasPoints
+            Flightline LAS points, columns: x,y,z,t,classification, ... (see Las.LasPoints)
         fl_las_idx : ndarray[int]
             Original LAS point indices for write-back.
         sensor_object : object
@@ -283,11 +587,15 @@ class Merge:
             Decimal rounding for LAS time used in matching.
         tie_eps : float
             Tolerance for deterministic tie-break.
+        match : None | (idx, mask)
+            Match of the flight line points, already sorted by time, taken
+            from the match of the whole tile (see match_tile).
 
         Returns
         -------
         (data, stddev, fl_las_idx_masked, raw_class, masked_fan_angle, masked_hawkeye_data)
-        The following table lists the contents of the returned list of ndarrays:
+        data and stddev are a MergedData and its MergedStddev, whose rows are
+        listed in the following table (std_a, std_b, and std_rho are scalars):
 
         =====   =========   ========================    =======
         Index   ndarray     description                 units
@@ -311,6 +619,7 @@ class Merge:
         16      stdx_sbet   sbet x uncertainty
         17      stdy_sbet   sbet y uncertainty
         18      stdz_sbet   sbet z uncertainty
+        19      std_rho     rho uncertainty
         =====   =========   ========================    =======
         """
 
@@ -320,36 +629,17 @@ class Merge:
         else:
             logger.info(f"Num SBET points: {num_sbet_pts}")
 
-        # Deterministic sort by point values: time primary, x/y/z tie-break.
-        t = fl_unsorted_las_xyztcf[:, 3]
-        x = fl_unsorted_las_xyztcf[:, 0]
-        y = fl_unsorted_las_xyztcf[:, 1]
-        z = fl_unsorted_las_xyztcf[:, 2]
-
-        sort_idx = np.argsort(
-            np.round(t, 9),
-            kind="mergesort"   # STABLE SORT
-        )
-
-        fl_las_data = fl_unsorted_las_xyztcf[sort_idx]
-        fl_las_idx = fl_las_idx[sort_idx]
-
-        # Try to match sbet and las dfs based on timestamps
-        idx, mask, max_dt = self.match_timestamps(
-            sbet_data,
-            fl_las_data,
-            time_round_decimals=time_round_decimals,
-            tie_eps=tie_eps,
-            debug_target=debug_target,
-        )
+        if match is None:
+            # Deterministic sort by point values: time primary (stable sort),
+            # skipped if the points are already sorted.
+            sort_idx = self.get_sort_order(np.round(fl_unsorted_las_xyztcf["t"], 9))
+            if sort_idx is None:
+                fl_las_data = fl_unsorted_las_xyztcf
+            else:
+                fl_las_data = fl_unsorted_las_xyztcf[sort_idx]
+                fl_las_idx = fl_las_idx[sort_idx]
 
-        # If max_dt is too large or empty, then we cannot merge the data. 
-        # This is likely due to the LAS data being standard gps time, when we expect adjusted standard gps time.
-        # Attempt time conversions and re-match.
-        if (isinstance(max_dt, np.ndarray) and max_dt.size == 0) or (not isinstance(max_dt, np.ndarray) and max_dt > self.max_allowable_dt):
-            # Standard GPS -> Adjusted Standard
-            fl_las_data = fl_las_data.copy()
-            fl_las_data[:, 3] = fl_las_data[:, 3] - 1e9
+            # Match sbet and las dfs based on timestamps
             idx, mask, max_dt = self.match_timestamps(
                 sbet_data,
                 fl_las_data,
@@ -357,80 +647,63 @@ class Merge:
                 tie_eps=tie_eps,
                 debug_target=debug_target,
             )
+        else:
+            # The flight line points are sorted and matched with the whole tile (see match_tile)
+            fl_las_data = fl_unsorted_las_xyztcf
+            idx, mask = match
+            max_dt = self.get_max_dt(sbet_data, fl_las_data, idx, mask)
+
+        # If max_dt is too large or empty, then we cannot merge the data.
+        # The las timestamps are converted to the time base of the trajectory
+        # (e.g., from standard gps time) when they are loaded (see Sbet.get_las_time_offset),
+        # so the data are matched once.
+        if not self.is_merged(max_dt):
+            logging.warning("trajectory and LAS data NOT MERGED")
+            if context_label:
+                logging.warning(f"({context_label}) max_dt: {max_dt}")
+            else:
+                logging.warning("({} FL {}) max_dt: {}".format(las_short_name, fl, max_dt))
+
+            data = False
+            stddev = False
+            raw_class = False
+            masked_fan_angle = False
+            masked_hawkeye_data = False
+
+            return (
+                data,
+                stddev,
+                fl_las_idx[mask],
+                raw_class,
+                masked_fan_angle,
+                masked_hawkeye_data,
+            )
 
-            if (isinstance(max_dt, np.ndarray) and max_dt.size == 0) or (not isinstance(max_dt, np.ndarray) and max_dt > self.max_allowable_dt):
-                # UTC -> Adjusted (approx by adding 18s after -1e9)
-                fl_las_data[:, 3] = fl_las_data[:, 3] + 18
-                idx, mask, max_dt = self.match_timestamps(
-                    sbet_data,
-                    fl_las_data,
-                    time_round_decimals=time_round_decimals,
-                    tie_eps=tie_eps,
-                    debug_target=debug_target,
-                )
-
-                if (isinstance(max_dt, np.ndarray) and max_dt.size == 0) or (not isinstance(max_dt, np.ndarray) and max_dt > self.max_allowable_dt):
-                    logging.warning("trajectory and LAS data NOT MERGED")
-                    if context_label:
-                        logging.warning(f"({context_label}) max_dt: {max_dt}")
-                    else:
-                        logging.warning("({} FL {}) max_dt: {}".format(las_short_name, fl, max_dt))
-
-                    data = False
-                    stddev = False
-                    raw_class = False
-                    masked_fan_angle = False
-                    masked_hawkeye_data = False
-
-                    return (
-                        data,
-                        stddev,
-                        fl_las_idx[mask],
-                        raw_class,
-                        masked_fan_angle,
-                        masked_hawkeye_data,
-                    )
-
-        data = np.asarray(
-            [
-                sbet_data[:, 0][idx[mask]],              # t_sbet
-                fl_las_data[:, 3][mask],                 # t_las
-                fl_las_data[:, 0][mask],                 # x_las
-                fl_las_data[:, 1][mask],                 # y_las
-                fl_las_data[:, 2][mask],                 # z_las
-                sbet_data[:, 3][idx[mask]],              # x_sbet
-                sbet_data[:, 4][idx[mask]],              # y_sbet
-                sbet_data[:, 5][idx[mask]],              # z_sbet
-                np.radians(sbet_data[:, 6][idx[mask]]),  # roll
-                np.radians(sbet_data[:, 7][idx[mask]]),  # pitch
-                np.radians(sbet_data[:, 8][idx[mask]]),  # heading
-            ]
-        )
+        # The las columns of the merged points and the gather index of their trajectory
+        # rows; the trajectory columns are gathered when they are used (see MergedData)
+        num_points = np.count_nonzero(mask)
+        las_data = np.empty((4, num_points))
+        for row, col in enumerate(("t", "x", "y", "z")):
+            np.compress(mask, fl_las_data[col], out=las_data[row])
 
-        num_points = data[0].shape
-
-        stddev = np.vstack(
-            [
-                np.full(num_points, radians(self.a_std_dev)),  # std_a
-                np.full(num_points, radians(self.b_std_dev)),  # std_b
-                np.radians(sbet_data[:, 12][idx[mask]]),  # std_r
-                np.radians(sbet_data[:, 13][idx[mask]]),  # std_p
-                np.radians(sbet_data[:, 14][idx[mask]]),  # std_h
-                sbet_data[:, 9][idx[mask]],  # stdx_sbet
-                sbet_data[:, 10][idx[mask]],  # stdy_sbet
-                sbet_data[:, 11][idx[mask]],  # stdz_sbet
-                np.full(num_points, self.std_rho),  # std_rho
-            ]
+        data = MergedData(
+            sbet_data,
+            idx[mask],
+            las_data,
+            (radians(self.a_std_dev), radians(self.b_std_dev), self.std_rho),
         )
+        stddev = data.stddev
 
-        raw_class = fl_las_data[:, 4][mask]
+        # the classification keeps its las dtype (uint8)
+        raw_class = fl_las_data["classification"][mask]
 
         masked_fan_angle = []
         masked_hawkeye_data = []
 
         # If this is a multi beam sensor, use the mask on the fan angle array 
         if(sensor_object.type == "multi"):
-            masked_fan_angle = fl_las_data[:, 5][mask]
+            # multiply the scan angle by 0.006 to convert it to degrees
+            masked_fan_angle = fl_las_data["scan_angle"][mask] * 0.006
             #Take the absolute value of the fan angle
             masked_fan_angle = np.absolute(masked_fan_angle)
             #Round fan angle to the nearest integer
@@ -440,23 +713,22 @@ class Merge:
 
             # Unbounded scan angle/fan angle can go past 26 degrees (absolute). 
             # Warn the user if their fan angle exceed maximum allowed fan angle.
-            if not all(i <= 26 for i in masked_fan_angle):
+            if np.any(masked_fan_angle > 26):
                 if hasattr(logger, "merge"):
                     logger.merge("WARNING: A scan angle exceeds an absolute value of 26 degrees. Subaqueous processing will fail.")
                 else:
                     logger.warning("A scan angle exceeds an absolute value of 26 degrees. Subaqueous processing will fail.")
 
         elif sensor_object.type == "single_hawkeye":
-            masked_hawkeye_data = np.asarray(
-                [
-                    fl_las_data[:, 5][mask], # masked scanner_channel
-                    fl_las_data[:, 6][mask]  # masked user_data
-                ]
+            # the scanner channel and user data keep their las dtypes (uint8)
+            masked_hawkeye_data = (
+                fl_las_data["scanner_channel"][mask],
+                fl_las_data["user_data"][mask],
             )
 
             # print(f"masked_hawkeye_data: {masked_hawkeye_data}")
 
-        # logger.merge(f"raw fan angle: {fl_las_data[:, 5]}")
+        # logger.merge(f"raw fan angle: {fl_las_data['scan_angle']}")
         # logger.merge(f"processed fan angle: {masked_fan_angle}")
 
         return (
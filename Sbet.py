@@ -36,6 +36,9 @@ May 12th, 2026
 
 import os
 import time
+import hashlib
+import json
+import tempfile
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -44,18 +47,320 @@ import logging
 import numexpr as ne
 import concurrent.futures
 from tqdm import tqdm
+from Merge import Merge
 
 logger = logging.getLogger(__name__)
 
 """
 This class provides the functionality to load trajectory data into
-cBLUE.  Currently, the sbet files are expected to be ASCII files
-that are exported from Applanix's PosPac software.
+cBLUE.  The sbet files are expected to be either ASCII files that are
+exported from Applanix's PosPac software (.txt) or native Applanix
+binary sbet files (.out), each with a matching smrmsg accuracy file.
 """
 
 
+# columns of the trajectory dataframe (see Sbet.build_sbets_data)
+SBET_COLUMNS = [
+    "time",
+    "lon",
+    "lat",
+    "X",
+    "Y",
+    "Z",
+    "roll",
+    "pitch",
+    "heading",
+    "stdX",
+    "stdY",
+    "stdZ",
+    "stdroll",
+    "stdpitch",
+    "stdheading",
+]
+
+# trajectory files memory mapped by this (worker) process (see Sbet.get_shared_tile_data)
+_shared_data = {}
+
+# record layout of the native Applanix binary sbet file (all values are
+# little-endian float64, angles are in radians)
+SBET_DTYPE = np.dtype(
+    [
+        (name, "<f8")
+        for name in (
+            "time",
+            "lat",
+            "lon",
+            "alt",
+            "x_vel",
+            "y_vel",
+            "z_vel",
+            "roll",
+            "pitch",
+            "heading",
+            "wander",
+            "x_acc",
+            "y_acc",
+            "z_acc",
+            "x_ang_rate",
+            "y_ang_rate",
+            "z_ang_rate",
+        )
+    ]
+)
+
+# record layout of the matching binary smrmsg (accuracy) file (standard
+# deviations in meters, except for roll, pitch, and heading, in arc-minutes)
+SMRMSG_DTYPE = np.dtype(
+    [
+        (name, "<f8")
+        for name in (
+            "time",
+            "north_std",
+            "east_std",
+            "down_std",
+            "v_north_std",
+            "v_east_std",
+            "v_down_std",
+            "roll_std",
+            "pitch_std",
+            "heading_std",
+        )
+    ]
+)
+
+
+class TimeIndex:
+    """time index of the trajectory, built once when the trajectory is loaded
+
+    The index holds the (sorted) trajectory times as the int64 ticks that
+    Merge.match_timestamps() matches with (see Merge.get_ticks()) and the
+    time span of each trajectory file, so the tile and flight line queries are binary searches
+    rather than conversions of the whole (possibly multi-day) trajectory.
+    """
+
+    time_round_decimals = 7  # must match match_timestamps() in merge.py
+
+    # seconds added to the start and end time of a tile (see get_tile_rows())
+    tile_time_buff = 20
+
+    def __init__(self, ticks, file_spans=None):
+        """
+        :param ndarray ticks: sorted trajectory time ticks (see from_times())
+        :param dict file_spans: {trajectory file name: (start time, end time)}
+        """
+
+        self.ticks = ticks
+        self.file_spans = file_spans or {}
+
+        # offset converting las timestamps to the time base of the trajectory,
+        # cached by get_las_time_offset()
+        self.las_time_offset = None
+
+    @classmethod
+    def from_times(cls, t, file_spans=None):
+        """builds the time index of sorted trajectory times
+
+        :param ndarray t: sorted trajectory times
+        :param dict file_spans: {trajectory file name: (start time, end time)}
+        :return: TimeIndex
+        """
+
+        time_index = cls(Merge.get_ticks(t, cls.time_round_decimals), file_spans)
+
+        # epochs sharing a tick with the previous epoch (e.g., in PILLS trajectories or overlapping sbet files)
+        ticks = time_index.ticks
+        num_dup = int(np.count_nonzero(ticks[1:] == ticks[:-1]))
+
+        logger.sbet(
+            "trajectory time index: {:,} epochs, {:,} with a duplicate time tick".format(ticks.size, num_dup)
+        )
+
+        return time_index
+
+    def get_rows(self, start_time, end_time, time_buff=0.0):
+        """returns the (start, end) rows of the epochs within the given start and end time
+
+        The rows are found by two binary searches of the ticks, and the epochs
+        of a cluster of duplicate ticks are either all in or all out of them.
+
+        :param float start_time: starting timestamp
+        :param float end_time: ending timestamp
+        :param float time_buff: seconds added before the start and after the end
+        :return: (int, int)
+        """
+
+        start = np.searchsorted(self.ticks, Merge.get_ticks(start_time - time_buff), side="left")
+        end = np.searchsorted(self.ticks, Merge.get_ticks(end_time + time_buff), side="right")
+
+        return int(start), int(end)
+
+    def get_las_time_offset(self, las_time_min, las_time_max, max_dt=1.0):
+        """returns the offset that converts las timestamps to the time base of the trajectory
+
+        The trajectory is in GPS adjusted standard time, but the las
+        timestamps may be in standard GPS time, in UTC-based standard time
+        (off by the leap seconds), or in GPS seconds-of-week.  The candidate
+        offsets are tried in that order, after the adjusted standard time (no
+        offset), and the first one that puts both ends of the las time range
+        within max_dt of a trajectory epoch is used.  The seconds-of-week
+        candidates are the GPS weeks spanned by the trajectory.
+
+        The offset is resolved from the time range of each tile, once it is
+        decoded (see Tpu.get_tile_sbet()).  The offset of the previous tile is
+        cached and checked first, so resolving it again for the next tile is
+        two binary searches of the ticks, and a tile in another time base is
+        resolved again.  If no candidate matches, a warning is logged and the
+        cached offset (or 0) is returned, without replacing the cached offset.
+
+        :param float las_time_min: minimum gps_time of the las data
+        :param float las_time_max: maximum gps_time of the las data
+        :param float max_dt: maximum time between a las timestamp and the nearest trajectory epoch
+        :return: float
+        """
+
+        ticks = self.ticks
+        ticks_per_sec = 10**self.time_round_decimals
+
+        def covers(offset):
+            las_ticks = Merge.get_ticks(np.array([las_time_min, las_time_max]) + offset, self.time_round_decimals)
+            i = np.clip(np.searchsorted(ticks, las_ticks), 1, ticks.size - 1)
+            dt = np.minimum(np.abs(las_ticks - ticks[i - 1]), np.abs(ticks[i] - las_ticks))
+            return bool(np.all(dt <= max_dt * ticks_per_sec))
+
+        t_first, t_last = ticks[[0, -1]] / ticks_per_sec
+        first_wk, last_wk = (
+            (np.array([t_first, t_last]) + Sbet.GPS_ADJUSTED_OFFSET) // Sbet.SECS_PER_GPS_WK
+        ).astype(int)
+        candidates = [
+            0.0,  # adjusted standard time
+            -Sbet.GPS_ADJUSTED_OFFSET,  # standard GPS time
+            -Sbet.GPS_ADJUSTED_OFFSET + Sbet.LEAP_SECONDS,  # UTC-based standard time
+        ] + [
+            wk * Sbet.SECS_PER_GPS_WK - Sbet.GPS_ADJUSTED_OFFSET  # GPS seconds-of-week
+            for wk in range(first_wk, last_wk + 1)
+        ]
+
+        if self.las_time_offset is not None:
+            candidates.insert(0, self.las_time_offset)
+
+        for offset in candidates:
+            if covers(offset):
+                if offset != self.las_time_offset:
+                    logger.sbet(f"las timestamps are converted to the trajectory time base with an offset of {offset} sec")
+                self.las_time_offset = offset
+                return offset
+
+        logger.warning(
+            f"WARNING: the las time range ({las_time_min}, {las_time_max}) doesn't match the trajectory "
+            f"({t_first}, {t_last}) with any known time base offset"
+        )
+        return self.las_time_offset if self.las_time_offset is not None else 0.0
+
+    def get_tile_rows(self, start_time, end_time):
+        """returns the (start, end) rows of the trajectory of a las tile (or chunk)
+
+        The time range is widened by tile_time_buff seconds, and the trajectory
+        files that span it are logged.
+
+        :param float start_time: starting timestamp of las tile
+        :param float end_time: ending timestamp of las tile
+        :return: (int, int)
+        """
+
+        start, end = self.get_rows(start_time, end_time, self.tile_time_buff)
+
+        files = self.get_files(start_time - self.tile_time_buff, end_time + self.tile_time_buff)
+        logger.sbet(
+            "trajectory rows {:,}-{:,} of {:,} ({})".format(
+                start, end, self.ticks.size, ", ".join(files) or "no trajectory file spans the tile"
+            )
+        )
+
+        return start, end
+
+    def get_ticks(self, start, end):
+        """returns the ticks of rows start:end, as Merge.get_sbet_ticks() does (without converting the times)
+
+        :param int start: first row
+        :param int end: last row (exclusive)
+        :return: (ndarray, None) sorted ticks, and the sort order of the rows (None, as they are sorted)
+        """
+
+        return self.ticks[start:end], None
+
+    def get_files(self, start_time, end_time):
+        """returns the names of the trajectory files whose time span overlaps the given time range
+
+        :param float start_time: starting timestamp
+        :param float end_time: ending timestamp
+        :return: list[str]
+        """
+
+        return [name for name, (t0, t1) in self.file_spans.items() if t0 <= end_time and t1 >= start_time]
+
+
+class SharedSbet:
+    """the trajectory shared with the TPU worker processes (see Sbet.share_data())
+
+    A SharedSbet only holds the paths of the shared trajectory data and time
+    ticks, so it is cheap to send to a worker.  The worker memory maps the
+    files when they are first used, and each tile takes its trajectory rows
+    from the time index once the tile is decoded (see Tpu.get_tile_sbet()).
+    """
+
+    def __init__(self, shared_file, ticks_file, file_spans=None):
+        """
+        :param str shared_file: path of the shared trajectory data
+        :param str ticks_file: path of the shared trajectory time ticks
+        :param dict file_spans: {trajectory file name: (start time, end time)}
+        """
+
+        self.shared_file = shared_file
+        self.ticks_file = ticks_file
+        self.file_spans = file_spans or {}
+        self.time_index = None
+
+    def __getstate__(self):
+        # the memory mapped time index isn't sent to the workers
+        return dict(self.__dict__, time_index=None)
+
+    def get_time_index(self):
+        """returns the time index of the shared trajectory (see TimeIndex)
+
+        :return: TimeIndex
+        """
+
+        if self.time_index is None:
+            self.time_index = TimeIndex(np.load(self.ticks_file, mmap_mode="r"), self.file_spans)
+
+        return self.time_index
+
+    def get_tile_rows_by_time(self, start_time, end_time):
+        """see Sbet.get_tile_rows_by_time()"""
+
+        return self.get_time_index().get_tile_rows(start_time, end_time)
+
+    def get_tile_data_by_rows(self, start, end):
+        """returns the sbet data of rows start:end (see Sbet.get_shared_tile_data())
+
+        :param int start: first row of the tile
+        :param int end: last row (exclusive) of the tile
+        :return: pandas dataframe
+        """
+
+        return Sbet.get_shared_tile_data(self.shared_file, start, end)
+
+
 class Sbet:
-    def __init__(self, sbet_dir, sensor_name):
+    cache_version = 2  # see get_cache_file()
+
+    SECS_PER_GPS_WK = 7 * 24 * 60 * 60  # 604800 sec
+    SECS_PER_DAY = 24 * 60 * 60  # 86400 sec
+    GPS_EPOCH = datetime(1980, 1, 6, 0, 0, 0)
+    GPS_ADJUSTED_OFFSET = 1e9
+    LEAP_SECONDS = 18  # GPS - UTC (sec)
+
+    def __init__(self, sbet_dir, sensor_name, utm_zone=None):
         """
         The data from all of the loaded sbet files are represented by
         a single Sbet object.  When the Sbet class is instantiated,
@@ -63,25 +368,36 @@ class Sbet:
         are "loaded" (assigned to a field of the sbet object) when
         the user clicks the 'Load Sbet Data' button.
         :param str sbet_dir: directory contained trajectory files
+        :param str sensor_name: name of the selected sensor
+        :param int utm_zone: UTM zone the binary sbet positions are projected
+            to (determined from the sbet longitudes if not given)
         """
 
         self.sbet_dir = sbet_dir
 
         self.sensor_name = sensor_name
 
+        self.utm_zone = utm_zone
+
+        # ASCII sbet files (.txt) and binary sbet files (.out); the binary
+        # smrmsg files are read together with their sbet files
         self.sbet_files = sorted(
             [
                 os.path.join(sbet_dir, f)
                 for f in os.listdir(sbet_dir)
                 if f.endswith(".txt")
+                or (f.endswith(".out") and "smrmsg" not in f.lower())
             ]
         )
 
         self.data = None
-        self.SECS_PER_GPS_WK = 7 * 24 * 60 * 60  # 604800 sec
-        self.SECS_PER_DAY = 24 * 60 * 60  # 86400 sec
-        self.GPS_EPOCH = datetime(1980, 1, 6, 0, 0, 0)
-        self.GPS_ADJUSTED_OFFSET = 1e9
+        # time span of each trajectory file, and the time index of the data (see get_time_index())
+        self.file_spans = {}
+        self.time_index = None
+        self.time_index_data = None
+        # files shared with the TPU worker processes (see share_data())
+        self.shared_file = None
+        self.shared_ticks_file = None
 
 
     @staticmethod
@@ -137,6 +453,134 @@ class Sbet:
         else:
             return False
 
+    @staticmethod
+    def get_smrmsg_file(sbet):
+        """returns the smrmsg file matching a binary sbet file
+
+        The smrmsg file is expected to be in the same directory as the sbet
+        file, with "sbet" in the sbet file name replaced by "smrmsg"
+        (e.g., 20160517_sbet_mission1.out and 20160517_smrmsg_mission1.out).
+
+        :param str sbet: binary sbet file path
+        :return: str
+        """
+
+        sbet_dir, sbet_name = os.path.split(sbet)
+        for f in os.listdir(sbet_dir or "."):
+            if f.lower() == sbet_name.lower().replace("sbet", "smrmsg"):
+                return os.path.join(sbet_dir, f)
+
+        raise FileNotFoundError(f"no smrmsg file found for {sbet_name}")
+
+    @staticmethod
+    def geodetic_to_utm(lat, lon, zone):
+        """projects geodetic coordinates to UTM easting and northing
+
+        The projection uses the Krüger series of the transverse Mercator
+        projection (accurate to well below a millimeter within a UTM zone)
+        on the GRS80 ellipsoid.
+
+        :param ndarray lat: latitudes (radians)
+        :param ndarray lon: longitudes (radians)
+        :param int zone: UTM zone number
+        :return: (ndarray, ndarray) easting and northing (meters)
+        """
+
+        a = 6378137.0
+        f = 1 / 298.257222101
+        k0 = 0.9996
+
+        n = f / (2 - f)
+        A = a / (1 + n) * (1 + n**2 / 4 + n**4 / 64)
+        alpha = (
+            n / 2 - 2 * n**2 / 3 + 5 * n**3 / 16,
+            13 * n**2 / 48 - 3 * n**3 / 5,
+            61 * n**3 / 240,
+        )
+
+        lon0 = np.radians(zone * 6 - 183)
+        e = 2 * np.sqrt(n) / (1 + n)
+
+        sin_lat = np.sin(lat)
+        t = np.sinh(np.arctanh(sin_lat) - e * np.arctanh(e * sin_lat))
+        xi = np.arctan2(t, np.cos(lon - lon0))
+        eta = np.arctanh(np.sin(lon - lon0) / np.sqrt(1 + t**2))
+
+        easting = eta.copy()
+        northing = xi.copy()
+        for j, alpha_j in enumerate(alpha, start=1):
+            easting += alpha_j * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+            northing += alpha_j * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+
+        easting = 500000 + k0 * A * easting
+        northing = k0 * A * northing
+        northing[lat < 0] += 10000000
+
+        return easting, northing
+
+    def read_binary_sbet(self, sbet):
+        """reads a native Applanix binary sbet file and its smrmsg file
+
+        Both files are memory mapped (np.memmap), rather than parsed, and the
+        returned dataframe has the same 15 columns as the ASCII sbet files
+        (see build_sbets_data()).  The positions are projected to UTM (see
+        geodetic_to_utm()), the angles are converted to degrees, the true
+        heading is the platform heading minus the wander angle (the sbet
+        heading is relative to the wander azimuth frame), and the smrmsg
+        standard deviations, which are usually logged at a lower rate
+        than the sbet records, are linearly interpolated to the sbet
+        timestamps.
+
+        :param str sbet: binary sbet file path
+        :return: pandas dataframe
+        """
+
+        smrmsg = self.get_smrmsg_file(sbet)
+        logger.sbet(f"reading binary sbet {os.path.split(sbet)[-1]} ({os.path.split(smrmsg)[-1]})")
+
+        sbet_records = np.memmap(
+            sbet, dtype=SBET_DTYPE, mode="r", shape=(os.path.getsize(sbet) // SBET_DTYPE.itemsize,)
+        )
+        smrmsg_records = np.memmap(
+            smrmsg, dtype=SMRMSG_DTYPE, mode="r", shape=(os.path.getsize(smrmsg) // SMRMSG_DTYPE.itemsize,)
+        )
+
+        t = sbet_records["time"]
+        lat = sbet_records["lat"]
+        lon = sbet_records["lon"]
+
+        zone = self.utm_zone
+        if not zone:
+            zone = int((np.degrees(np.median(lon)) + 180) // 6) % 60 + 1
+            logger.sbet(f"projecting binary sbet positions to UTM zone {zone}")
+
+        easting, northing = self.geodetic_to_utm(lat, lon, zone)
+
+        t_smrmsg = smrmsg_records["time"]
+
+        def interp_std(name):
+            return np.interp(t, t_smrmsg, smrmsg_records[name])
+
+        return pd.DataFrame(
+            {
+                "time": np.array(t),
+                "lon": np.degrees(lon),
+                "lat": np.degrees(lat),
+                "X": easting,
+                "Y": northing,
+                "Z": np.array(sbet_records["alt"]),
+                "roll": np.degrees(sbet_records["roll"]),
+                "pitch": np.degrees(sbet_records["pitch"]),
+                "heading": np.degrees(sbet_records["heading"] - sbet_records["wander"]) % 360,
+                "stdX": interp_std("east_std"),
+                "stdY": interp_std("north_std"),
+                "stdZ": interp_std("down_std"),
+                "stdroll": interp_std("roll_std") / 60,
+                "stdpitch": interp_std("pitch_std") / 60,
+                "stdheading": interp_std("heading_std") / 60,
+            }
+        )
+
     def build_sbets_data(self):
         """builds 1 pandas dataframe from all ASCII sbet files
 
@@ -166,23 +610,7 @@ class Sbet:
         """
 
         dfs = []
-        header_sbet = [
-            "time",
-            "lon",
-            "lat",
-            "X",
-            "Y",
-            "Z",
-            "roll",
-            "pitch",
-            "heading",
-            "stdX",
-            "stdY",
-            "stdZ",
-            "stdroll",
-            "stdpitch",
-            "stdheading",
-        ]
+        header_sbet = SBET_COLUMNS
         # Used for holding processed SBET data if this is the PILLS sensor
         modified_sbet_file = "modified_pills_sbet.txt"
 
@@ -219,22 +647,26 @@ class Sbet:
             logger.sbet(f"Processing {os.path.split(sbet)[-1]}")
             sbet_date = self.get_sbet_date(sbet)
 
-            # If this is the PILLS sensor, pre-process the sbet data
-            if(self.sensor_name == "PILLS or RAMMS"):
-                logger.sbet("PILLS or RAMMS Sensor, pre-processing sbet file")
-                self.preprocess_pills_sbet(sbet, modified_sbet_file)
-                # Reassign the SBET file name to the modified file
-                sbet = modified_sbet_file
-            sbet_df = pd.read_csv(
-                sbet,
-                skip_blank_lines=True,
-                engine="c",
-                sep=r"\s+",
-                header=None,
-                names=header_sbet,
-                index_col=False,
-                dtype=dtype_map,
-            )
+            if sbet.endswith(".out"):
+                # native binary sbet (memory mapped, no ASCII export needed)
+                sbet_df = self.read_binary_sbet(sbet)
+            else:
+                # If this is the PILLS sensor, pre-process the sbet data
+                if(self.sensor_name == "PILLS or RAMMS"):
+                    logger.sbet("PILLS or RAMMS Sensor, pre-processing sbet file")
+                    self.preprocess_pills_sbet(sbet, modified_sbet_file)
+                    # Reassign the SBET file name to the modified file
+                    sbet = modified_sbet_file
+                sbet_df = pd.read_csv(
+                    sbet,
+                    skip_blank_lines=True,
+                    engine="c",
+                    sep=r"\s+",
+                    header=None,
+                    names=header_sbet,
+                    index_col=False,
+                    dtype=dtype_map,
+                )
             is_sow = self.check_if_sow(sbet_df["time"][0])
             if is_sow:
                 gps_time_adj = self.gps_sow_to_gps_adj(sbet_date, sbet_df["time"])
@@ -246,6 +678,12 @@ class Sbet:
             dfs = list(executor.map(process_sbet_file, sorted(self.sbet_files)))
         progress.close()
 
+        self.file_spans = {
+            os.path.split(sbet)[-1]: (float(df.time.min()), float(df.time.max()))
+            for sbet, df in zip(sorted(self.sbet_files), dfs)
+            if not df.empty
+        }
+
 
         if dfs:
             sbets_data = pd.concat(dfs, ignore_index=True)
@@ -286,8 +724,18 @@ class Sbet:
         """
 
         sbet_tic = time.process_time()
-        self.data = self.build_sbets_data()  # df
-        self.data = self.data.sort_values("time").reset_index(drop=True)
+
+        cache_file = self.get_cache_file()
+        if os.path.isfile(cache_file):
+            # warm start: the trajectory files haven't changed since they were cached
+            self.data = self.load_cache(cache_file)
+        else:
+            self.data = self.build_sbets_data()  # df
+            self.data = self.data.sort_values("time").reset_index(drop=True)
+            self.save_cache(cache_file)
+
+        self.get_time_index()
+
         sbet_toc = time.process_time()
         logger.sbet(
             "It took {:.1f} mins to load the trajectory data.".format(
@@ -295,6 +743,92 @@ class Sbet:
             )
         )
 
+    def get_cache_file(self):
+        """returns the path of the cache file of the parsed trajectory data
+
+        The parsed, time-converted, and sorted trajectory data are cached in
+        the cblue_cache directory of the trajectory directory.  The cache file
+        name includes a fingerprint of the path, size, and modification time
+        of each trajectory file (and of the smrmsg file of each binary sbet
+        file), the sensor name (PILLS or RAMMS sbet files are pre-processed),
+        and the UTM zone (binary sbet files are projected), so a changed input
+        results in a different cache file.  It also includes cache_version,
+        which is incremented when the parsing of the trajectory files changes
+        (e.g., the wander angle correction of the binary sbet heading).
+
+        :return: str
+        """
+
+        fingerprint = [self.cache_version, self.sensor_name, self.utm_zone]
+        for sbet in self.sbet_files:
+            files = [sbet]
+            if sbet.endswith(".out"):
+                files.append(self.get_smrmsg_file(sbet))
+            for f in files:
+                stat = os.stat(f)
+                fingerprint.append([os.path.abspath(f), stat.st_size, stat.st_mtime_ns])
+
+        key = hashlib.sha1(json.dumps(fingerprint).encode("utf-8")).hexdigest()
+
+        return os.path.join(self.sbet_dir, "cblue_cache", f"trajectory_{key}.npy")
+
+    def load_cache(self, cache_file):
+        """loads the cached trajectory data
+
+        The cache file is memory mapped, rather than read, and the returned
+        dataframe has the same columns as build_sbets_data().
+
+        :param str cache_file: cache file path (see get_cache_file())
+        :return: pandas dataframe
+        """
+
+        logger.sbet(f"loading cached trajectory data ({os.path.split(cache_file)[-1]})")
+
+        spans_file = os.path.splitext(cache_file)[0] + ".json"
+        if os.path.isfile(spans_file):
+            with open(spans_file) as f:
+                self.file_spans = {name: tuple(span) for name, span in json.load(f).items()}
+
+        return pd.DataFrame(np.load(cache_file, mmap_mode="r"), columns=SBET_COLUMNS, copy=False)
+
+    def save_cache(self, cache_file):
+        """saves the trajectory data to the cache and removes stale cache files
+
+        :param str cache_file: cache file path (see get_cache_file())
+        :return: n/a
+        """
+
+        if self.data.empty:
+            return
+
+        cache_dir = os.path.dirname(cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+
+            # cache files of previous (changed) inputs are no longer valid
+            for f in os.listdir(cache_dir):
+                if f.startswith("trajectory_") and f.endswith((".npy", ".json")):
+                    try:
+                        os.remove(os.path.join(cache_dir, f))
+                    except OSError:
+                        # e.g., still memory mapped (on Windows)
+                        logger.sbet(f"stale cache file {f} not removed")
+
+            # write to a temporary file first, so an interrupted write
+            # doesn't leave an incomplete cache file
+            tmp_file = cache_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                np.save(f, self.data[SBET_COLUMNS].to_numpy(dtype=np.float64))
+            os.replace(tmp_file, cache_file)
+
+            # the time spans of the trajectory files (see TimeIndex)
+            with open(os.path.splitext(cache_file)[0] + ".json", "w") as f:
+                json.dump(self.file_spans, f)
+
+            logger.sbet(f"cached trajectory data ({os.path.split(cache_file)[-1]})")
+        except OSError as e:
+            logger.warning(f"trajectory data not cached ({e})")
+
     def get_tile_data(self, north, south, east, west):
         """queries the sbet data points that lie within the given las tile bounding coordinates
 
@@ -348,38 +882,147 @@ class Sbet:
         :return: pandas dataframe
         """
 
-        time_buff = 20  # seconds buffer to add to start and end time to ensure we capture all relevant trajectory data for the tile
-                        # in case the user didn't account for leap seconds converting to adjusted gps standard time.
-        scale = 10**7   # must match match_timestamps() in merge.py
+        pos_lo, pos_hi = self.get_tile_rows_by_time(start_time, end_time)
 
-        # --- adjust time bounds ---
-        start_time_adj = start_time - time_buff
-        end_time_adj   = end_time   + time_buff
+        # --- final deterministic slice (POSITIONAL) ---
+        data = self.data.iloc[pos_lo:pos_hi]
 
-        # --- full SBET time array (POSITIONAL) ---
-        t_full = self.data.time.values
-        t_full_i = np.round(t_full * scale).astype(np.int64)
+        return data
 
-        # --- compute integer bounds ---
-        start_i = int(round(start_time_adj * scale))
-        end_i   = int(round(end_time_adj   * scale))
+    def get_tile_rows_by_time(self, start_time, end_time):
+        """returns the (start, end) row offsets of the sbet data within the given start and end time
 
-        # --- find insertion positions (NOT labels) ---
-        pos_lo = np.searchsorted(t_full_i, start_i, side="left")
-        pos_hi = np.searchsorted(t_full_i, end_i,   side="right")
+        See get_tile_data_by_time().  The offsets are positional, i.e., the
+        sbet data of the tile are self.data.iloc[start:end].  The rows are
+        found by binary searches of the trajectory time index (see
+        get_time_index()), and the epochs of a cluster of duplicate ticks are
+        either all in or all out of the tile.
 
-        # --- expand left to include full duplicate cluster ---
-        while pos_lo > 0 and t_full_i[pos_lo - 1] == t_full_i[pos_lo]:
-            pos_lo -= 1
+        :param float start_time: starting timestamp of las tile
+        :param float end_time: ending timestamp of las tile
+        :return: (int, int)
+        """
 
-        # --- expand right to include full duplicate cluster ---
-        while pos_hi < len(t_full_i) and t_full_i[pos_hi] == t_full_i[pos_hi - 1]:
-            pos_hi += 1
+        # a seconds buffer (TimeIndex.tile_time_buff) is added to the start and end time to ensure we capture all
+        # relevant trajectory data for the tile, in case the user didn't account for leap seconds converting to
+        # adjusted gps standard time.
+        return self.get_time_index().get_tile_rows(start_time, end_time)
 
-        # --- final deterministic slice (POSITIONAL) ---
-        data = self.data.iloc[pos_lo:pos_hi]
+    def get_tile_data_by_rows(self, start, end):
+        """returns the sbet data of rows start:end (see get_tile_rows_by_time())
 
-        return data
+        :param int start: first row of the tile
+        :param int end: last row (exclusive) of the tile
+        :return: pandas dataframe
+        """
+
+        return self.data.iloc[start:end]
+
+    def get_time_index(self):
+        """returns the time index of the trajectory data (see TimeIndex)
+
+        The index is built when the trajectory is loaded (see set_data()), or
+        when it is first needed after the data are replaced.
+
+        :return: TimeIndex
+        """
+
+        if self.time_index is None or self.time_index_data is not self.data:
+            self.time_index = TimeIndex.from_times(self.data.time.values, self.file_spans)
+            self.time_index_data = self.data
+
+        return self.time_index
+
+    @staticmethod
+    def get_rows_by_time(t_sbet, start_time, end_time, time_buff=0.0):
+        """returns the (start, end) row offsets of sorted sbet times within the given start and end time
+
+        The rows are found by two binary searches of the float times of the
+        tile's trajectory (get_tile_rows_by_time() searches the ticks of the
+        time index instead), so querying the trajectory of a flight line (or
+        of a block of one) is O(log n).
+
+        :param ndarray t_sbet: sorted sbet times (e.g., the times of a tile)
+        :param float start_time: starting timestamp
+        :param float end_time: ending timestamp
+        :param float time_buff: seconds added before the start and after the end
+        :return: (int, int)
+        """
+
+        start = np.searchsorted(t_sbet, start_time - time_buff, side="left")
+        end = np.searchsorted(t_sbet, end_time + time_buff, side="right")
+
+        return int(start), int(end)
+
+    def get_las_time_offset(self, las_time_min, las_time_max, max_dt=1.0):
+        """returns the offset that converts las timestamps to the time base of the trajectory
+
+        See TimeIndex.get_las_time_offset().
+
+        :param float las_time_min: minimum gps_time of the las data
+        :param float las_time_max: maximum gps_time of the las data
+        :param float max_dt: maximum time between a las timestamp and the nearest trajectory epoch
+        :return: float
+        """
+
+        return self.get_time_index().get_las_time_offset(las_time_min, las_time_max, max_dt)
+
+    def share_data(self):
+        """writes the sbet data and their time ticks to files that the TPU worker processes memory map
+
+        In multiprocess mode, the worker processes attach to these files (see
+        SharedSbet) and only receive the las file path of each tile, rather
+        than a pickled copy of each tile's sbet data.  The operating system
+        shares the mapped pages among the workers, so the trajectory is held
+        in memory once.
+
+        :return: SharedSbet
+        """
+
+        fd, self.shared_file = tempfile.mkstemp(prefix="cblue_trajectory_", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, self.data[SBET_COLUMNS].to_numpy(dtype=np.float64))
+
+        fd, self.shared_ticks_file = tempfile.mkstemp(prefix="cblue_trajectory_ticks_", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, self.get_time_index().ticks)
+
+        logger.sbet(f"shared trajectory data ({self.shared_file})")
+
+        return SharedSbet(self.shared_file, self.shared_ticks_file, self.file_spans)
+
+    def release_shared_data(self):
+        """removes the files written by share_data() (once the workers are done)
+
+        :return: n/a
+        """
+
+        for shared_file in (self.shared_file, self.shared_ticks_file):
+            if shared_file is not None:
+                try:
+                    os.remove(shared_file)
+                except OSError as e:
+                    logger.warning(f"shared trajectory data not removed ({e})")
+        self.shared_file = None
+        self.shared_ticks_file = None
+
+    @staticmethod
+    def get_shared_tile_data(shared_file, start, end):
+        """returns the sbet data of a tile from the file written by share_data()
+
+        The file is memory mapped once per process, and the returned dataframe
+        is a view of the mapped rows (the rows aren't copied).
+
+        :param str shared_file: shared file path
+        :param int start: first row of the tile (see get_tile_rows_by_time())
+        :param int end: last row (exclusive) of the tile
+        :return: pandas dataframe
+        """
+
+        if shared_file not in _shared_data:
+            _shared_data[shared_file] = np.load(shared_file, mmap_mode="r")
+
+        return pd.DataFrame(_shared_data[shared_file][start:end], columns=SBET_COLUMNS, copy=False)
     
     def preprocess_pills_sbet(self, sbet_file, modified_sbet_file):
         """Pre-process the given PILLS SBET data into the expected cBLUE format so that build_sbets_data()
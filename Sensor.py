@@ -36,6 +36,7 @@ August 4th, 2025
 import logging
 import os
 import json
+from Subaqueous import LookupTables
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +95,9 @@ class Sensor:
             self.horz_lut = self.sensor_config[self.name]["subaqueous_LUTs"]["horizontal"]
             # The path of the range bias uncertainty look up table used for modeling
             self.range_bias_lut = self.sensor_config[self.name]["subaqueous_LUTs"]["range_bias"]
+
+        #The subaqueous look up tables of the sensor, from the look up table pack (see Subaqueous.LookupTables)
+        self.subaqueous_luts = LookupTables.get(self)
         
 
 
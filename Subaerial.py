@@ -34,15 +34,207 @@ May 12th, 2026
 
 """
 
+import hashlib
+import importlib.metadata
+import inspect
 import logging
+import os
+import sys
+import tempfile
+import types
 from Merge import Merge
-from sympy import lambdify, symbols, Matrix, cos, sin
 import numpy as np
 import numexpr as ne
 
 logger = logging.getLogger(__name__)
 
 
+class SensorModelCode:
+    """Persistent cache of the code generated from the symbolic sensor model
+
+    Building the sensor model and its Jacobian symbolically (and
+    "lambdifying" the resulting expressions) takes several seconds, and
+    it is repeated in every worker process.  The source code that sympy
+    generates for the lambdified functions is therefore written to a
+    Python module in cache_dir, and later runs execute that module instead
+    of importing sympy at all.
+
+    The name of the module contains a hash of the sympy version, the eval
+    type, and the source code of the methods that define the sensor model
+    (see definition), so that a change to any of them creates a new module.
+    """
+
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cblue_cache")
+
+    # the methods that symbolically define the generated functions
+    definition = (
+        "SensorModel.set_rotation_matrix_airplane",
+        "SensorModel.set_rotation_matrix_scanning_sensor",
+        "SensorModel.define_obseration_equation",
+        "Jacobian.form_jacobian",
+        "Jacobian.get_trig_substitutions",
+        "Jacobian.lambdify_jacobian",
+        "Jacobian.cse_jacobian",
+        "Jacobian.fuse_subaerial",
+        "Jacobian.generate_kernel",
+    )
+
+    # the names the generated code expects in its namespace, per eval type
+    # (sympy lambdifies with "from numpy import *" for numpy)
+    module_imports = {
+        "numexpr": "from numexpr import evaluate",
+        "numpy": "import numpy\nfrom numpy import *",
+        "numba": "import numba\nimport numpy\nfrom numpy import *",
+    }
+
+    fR_names = ["fR0", "fR1", None, "fR3", "fR4", None, "fR6", "fR7", None]
+    obs_eq_names = ["fF1", "fF2", "fF3"]
+    jacobian_names = {c: ["lJ{}{}".format(c, i) for i in range(9)] for c in "xyz"}
+    jacobian_cse_name = "jacobian_cse"
+    subaerial_fused_name = "subaerial_fused"
+
+    @classmethod
+    def get_cache_file(cls, eval_type):
+        """returns the path of the generated module for eval_type
+
+        :param str eval_type: the eval type for sympy lambdification
+        :return: str (None if the sensor model source is unavailable, e.g., in a frozen build)
+        """
+
+        key = hashlib.sha1()
+        try:
+            key.update(importlib.metadata.version("sympy").encode())
+            for name in cls.definition:
+                cls_name, method_name = name.split(".")
+                method = getattr(globals()[cls_name], method_name)
+                key.update(inspect.getsource(method).encode())
+        except (importlib.metadata.PackageNotFoundError, OSError, TypeError):
+            return None
+        key.update(eval_type.encode())
+
+        return os.path.join(
+            cls.cache_dir, "sensor_model_{}_{}.py".format(eval_type, key.hexdigest())
+        )
+
+    @classmethod
+    def load(cls, eval_type):
+        """executes the cached generated module, if there is one
+
+        :param str eval_type: the eval type for sympy lambdification
+        :return: dict {function name: function} or None
+        """
+
+        cache_file = cls.get_cache_file(eval_type)
+        if cache_file is None or not os.path.isfile(cache_file):
+            return None
+
+        try:
+            with open(cache_file) as f:
+                namespace = cls.execute(f.read(), cache_file)
+        except (OSError, SyntaxError, ImportError) as e:
+            logger.warning("ignoring sensor model cache {} ({})".format(cache_file, e))
+            return None
+
+        names = cls.obs_eq_names + [n for n in cls.fR_names if n]
+        names += [cls.jacobian_cse_name, cls.subaerial_fused_name]
+        for jacobian_names in cls.jacobian_names.values():
+            names += jacobian_names
+        if not all(callable(namespace.get(n)) for n in names):
+            logger.warning("ignoring incomplete sensor model cache {}".format(cache_file))
+            return None
+
+        logger.subaerial("using generated sensor model code {}".format(cache_file))
+        return namespace
+
+    @classmethod
+    def execute(cls, source, filename="<cblue generated>", eval_type=None):
+        """executes generated source code
+
+        Source code read from a file is executed as a module named after the
+        file, which numba needs to reload the compiled functions it caches.
+
+        :param str source: generated source code
+        :param str filename: file name shown in tracebacks
+        :param str eval_type: if given, the imports of eval_type are executed first
+        :return: dict namespace holding the generated functions
+        """
+
+        if eval_type is not None:
+            source = cls.module_imports[eval_type] + "\n\n" + source
+
+        if os.path.isfile(filename):
+            module = types.ModuleType(os.path.splitext(os.path.basename(filename))[0])
+            module.__file__ = filename
+            sys.modules[module.__name__] = module
+            namespace = module.__dict__
+        else:
+            # numba only caches the compiled functions of source files
+            source = source.replace("numba.njit(cache=True", "numba.njit(cache=False")
+            namespace = {}
+
+        exec(compile(source, filename, "exec"), namespace)
+        return namespace
+
+    @staticmethod
+    def get_source(name, function):
+        """returns the source of a lambdified function, renamed to name
+
+        :param str name: function name
+        :param function function: lambdified function
+        :return: str
+        """
+
+        source = inspect.getsource(function)
+        return source.replace("def _lambdifygenerated(", "def {}(".format(name), 1)
+
+    @classmethod
+    def save(cls, eval_type, sources):
+        """writes the generated source code to the cache
+
+        Generated modules of the same eval type with an outdated hash are
+        removed.  Failing to write the cache is not an error, as the
+        functions can always be generated again.
+
+        :param str eval_type: the eval type for sympy lambdification
+        :param list[str] sources: source code of the generated functions
+        :return: str path of the generated module, or None if it wasn't written
+        """
+
+        cache_file = cls.get_cache_file(eval_type)
+        if cache_file is None:
+            return None
+
+        lines = [
+            "# generated by cBLUE from the sensor model in Subaerial.py -- do not edit",
+            cls.module_imports[eval_type],
+            "",
+        ]
+        for source in sources:
+            lines += ["", source]
+
+        try:
+            os.makedirs(cls.cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(suffix=".tmp", dir=cls.cache_dir)
+            with os.fdopen(fd, "w") as f:
+                f.write("\n".join(lines))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning("unable to write sensor model cache {} ({})".format(cache_file, e))
+            return None
+
+        prefix = "sensor_model_{}_".format(eval_type)
+        for f in os.listdir(cls.cache_dir):
+            stale = os.path.join(cls.cache_dir, f)
+            if f.startswith(prefix) and f.endswith(".py") and stale != cache_file:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+        logger.subaerial("saved generated sensor model code {}".format(cache_file))
+        return cache_file
+
+
 class SensorModel:
     """This class is used to define and access the sensor model of a particular
     lidar sensor, including the laser geolocation equation and any
@@ -52,16 +244,56 @@ class SensorModel:
 
     TODO:  move the a, b uncertainty values here
 
+    If the generated code of the sensor model is cached (see SensorModelCode),
+    the symbolic R, M, and obs_eq attributes are None, because sympy isn't used.
+
+    The eval type selects the numeric backend used to evaluate the sensor
+    model and its Jacobian:
+
+    =======     ===============================================================
+    type        description
+    =======     ===============================================================
+    numexpr     numexpr expressions (multithreaded by numexpr)
+    numpy       numpy expressions (single threaded)
+    numba       numpy expressions, except for the cse and fused kernels (see
+                Jacobian), which are compiled by numba into parallel loops
+                over the points (requires the optional numba package)
+    =======     ===============================================================
+
     """
 
-    eval_type = "numexpr"
+    eval_types = ("numexpr", "numpy", "numba")
 
-    def __init__(self, sensor):
-        self.sensor = sensor  # Doesn't appear to do anything (variable never used)
+    # the functions that replace numexpr.evaluate() for the numpy eval type
+    numpy_namespace = dict(vars(np))
+
+    def __init__(self, sensor, eval_type="numexpr"):
+        if eval_type not in self.eval_types:
+            raise ValueError("unknown eval type {} (expected one of {})".format(eval_type, self.eval_types))
+        if eval_type == "numba":
+            import numba  # the numba eval type requires the numba package
+
+            # the cBLUE log records all levels, but not the numba compiler's debugging
+            logging.getLogger("numba").setLevel(logging.WARNING)
 
-        self.R, self.fR = self.set_rotation_matrix_airplane()
-        self.M = self.set_rotation_matrix_scanning_sensor()
-        self.obs_eq, self.obs_eq_pre_poly = self.define_obseration_equation()
+            # each process runs one kernel at a time, and the tbb threading
+            # layer hangs at exit in processes that forked a worker pool
+            numba.config.THREADING_LAYER = "workqueue"
+
+        self.sensor = sensor  # Doesn't appear to do anything (variable never used)
+        self.eval_type = eval_type
+        # numba only compiles the generated kernels (see Jacobian.generate_kernel)
+        self.lambdify_module = "numpy" if eval_type == "numba" else eval_type
+
+        self.code = SensorModelCode.load(self.eval_type)
+        if self.code is None:
+            self.R, self.fR = self.set_rotation_matrix_airplane()
+            self.M = self.set_rotation_matrix_scanning_sensor()
+            self.obs_eq, self.obs_eq_pre_poly = self.define_obseration_equation()
+        else:
+            self.R, self.M, self.obs_eq = None, None, None
+            self.fR = [self.code[n] if n else None for n in SensorModelCode.fR_names]
+            self.obs_eq_pre_poly = [self.code[n] for n in SensorModelCode.obs_eq_names]
         self.rho_est = None
         self.a_est = None
         self.b_est = None
@@ -75,6 +307,34 @@ class SensorModel:
         self.poly_err_surf_coeffs_y = None
         self.poly_err_surf_coeffs_z = None
 
+    def evaluate(self, ex, local_dict):
+        """evaluates an array expression with the eval type's backend
+
+        :param str ex: array expression, e.g., "sqrt(rho_x**2 + rho_y**2)"
+        :param dict local_dict: the variables of the expression
+        :return: ndarray
+        """
+
+        return self.evaluate_with(self.eval_type, ex, local_dict)
+
+    @classmethod
+    def evaluate_with(cls, eval_type, ex, local_dict):
+        """evaluates an array expression with the backend of eval_type
+
+        The expression uses the numexpr syntax, which numpy shares for the
+        expressions used here.  With the numpy and numba eval types, the
+        expression is evaluated by numpy.
+
+        :param str eval_type: the eval type (see SensorModel.eval_types)
+        :param str ex: array expression, e.g., "sqrt(rho_x**2 + rho_y**2)"
+        :param dict local_dict: the variables of the expression
+        :return: ndarray
+        """
+
+        if eval_type == "numexpr":
+            return ne.evaluate(ex, local_dict=local_dict)
+        return eval(ex, cls.numpy_namespace, local_dict)
+
     def get_sensor_model_diagnostic_data(self, las_pox_xyz):
 
         cblue_aer_pos = self.calc_cblue_aer_pos()
@@ -126,6 +386,8 @@ class SensorModel:
         :return: List[lambdify functions]
         """
 
+        from sympy import lambdify, symbols, Matrix, cos, sin
+
         r, p, h = symbols("r p h")
         R1 = Matrix([[1, 0, 0], [0, cos(r), -sin(r)], [0, sin(r), cos(r)]])
 
@@ -136,12 +398,12 @@ class SensorModel:
         R = R3 * R2 * R1
 
         # "functionize" the necessary R components for a and b estimation
-        r00 = lambdify((h, p), R[0], self.eval_type)
-        r01 = lambdify((r, p, h), R[1], self.eval_type)
-        r10 = lambdify((h, p), R[3], self.eval_type)
-        r11 = lambdify((r, p, h), R[4], self.eval_type)
-        r20 = lambdify(p, R[6], self.eval_type)
-        r21 = lambdify((r, p), R[7], self.eval_type)
+        r00 = lambdify((h, p), R[0], self.lambdify_module)
+        r01 = lambdify((r, p, h), R[1], self.lambdify_module)
+        r10 = lambdify((h, p), R[3], self.lambdify_module)
+        r11 = lambdify((r, p, h), R[4], self.lambdify_module)
+        r20 = lambdify(p, R[6], self.lambdify_module)
+        r21 = lambdify((r, p), R[7], self.lambdify_module)
 
         fR = [r00, r01, None, r10, r11, None, r20, r21, None]
 
@@ -169,6 +431,8 @@ class SensorModel:
 
         :return Matrix M: the scanning sensor rotation matrix
         """
+        from sympy import symbols, Matrix, cos, sin
+
         a, b = symbols("a b")
         M1 = Matrix([[1, 0, 0], [0, cos(a), -sin(a)], [0, sin(a), cos(a)]])
 
@@ -196,6 +460,8 @@ class SensorModel:
         :return: (sympy object, sympy object, sympy object, function)
         """
 
+        from sympy import lambdify, symbols
+
         # create variables for symbolic computations
         (
             a,
@@ -233,9 +499,9 @@ class SensorModel:
         )
 
         # converting symbolic to function (for faster computations)
-        fF1 = lambdify((a, b, h, p, r, rho, x), F1, self.eval_type)
-        fF2 = lambdify((a, b, h, p, r, rho, y), F2, self.eval_type)
-        fF3 = lambdify((a, b, p, r, rho, z), F3, self.eval_type)
+        fF1 = lambdify((a, b, h, p, r, rho, x), F1, self.lambdify_module)
+        fF2 = lambdify((a, b, h, p, r, rho, y), F2, self.lambdify_module)
+        fF3 = lambdify((a, b, p, r, rho, z), F3, self.lambdify_module)
         fF_orig = [fF1, fF2, fF3]
 
         # least squares adjustment mimics the Matlab "fit (poly23)" function
@@ -301,29 +567,76 @@ class SensorModel:
         y_sbet = data[6]  # y_sbet
         z_sbet = data[7]  # z_sbet
 
-        rho_x = ne.evaluate("x_las - x_sbet")
-        rho_y = ne.evaluate("y_las - y_sbet")
-        rho_z = ne.evaluate("z_las - z_sbet")
+        rho_x = self.evaluate("x_las - x_sbet", {"x_las": x_las, "x_sbet": x_sbet})
+        rho_y = self.evaluate("y_las - y_sbet", {"y_las": y_las, "y_sbet": y_sbet})
+        rho_z = self.evaluate("z_las - z_sbet", {"z_las": z_las, "z_sbet": z_sbet})
 
-        fR0 = self.fR[0](data[10], data[9])
-        fR3 = self.fR[3](data[10], data[9])
-        fR6 = self.fR[6](data[9])
-        fR1 = self.fR[1](data[8], data[9], data[10])
-        fR4 = self.fR[4](data[8], data[9], data[10])
-        fR7 = self.fR[7](data[8], data[9])
+        fR0, fR1, fR3, fR4, fR6, fR7 = self.gather_epoch_terms(
+            data, ("fR", self.eval_type), self.calc_rotation_terms
+        )
+
+        rho = {"rho_x": rho_x, "rho_y": rho_y, "rho_z": rho_z}
+        self.rho_est = self.evaluate("sqrt(rho_x**2 + rho_y**2 + rho_z**2)", rho)
 
-        self.rho_est = ne.evaluate("sqrt(rho_x**2 + rho_y**2 + rho_z**2)")
-        rho_est = self.rho_est
+        self.b_est = self.evaluate(
+            "arcsin(((fR0 * rho_x) + (fR3 * rho_y) + (fR6 * rho_z)) / (-rho_est))",
+            dict(rho, fR0=fR0, fR3=fR3, fR6=fR6, rho_est=self.rho_est),
+        )
 
-        self.b_est = ne.evaluate(
-            "arcsin(((fR0 * rho_x) + (fR3 * rho_y) + (fR6 * rho_z)) / (-rho_est))"
+        self.a_est = self.evaluate(
+            "arcsin(((fR1 * rho_x) + (fR4 * rho_y) + (fR7 * rho_z)) / (rho_est * cos(b_est)))",
+            dict(rho, fR1=fR1, fR4=fR4, fR7=fR7, rho_est=self.rho_est, b_est=self.b_est),
         )
-        b_est = self.b_est
 
-        self.a_est = ne.evaluate(
-            "arcsin(((fR1 * rho_x) + (fR4 * rho_y) + (fR7 * rho_z)) / (rho_est * cos(b_est)))"
+
+    def calc_rotation_terms(self, r, p, h):
+        """evaluates the components of R used to estimate a and b
+
+        :param r: roll
+        :param p: pitch
+        :param h: heading
+        :return tuple(ndarray): fR0, fR1, fR3, fR4, fR6, and fR7
+        """
+
+        return (
+            self.fR[0](h, p),
+            self.fR[1](r, p, h),
+            self.fR[3](h, p),
+            self.fR[4](r, p, h),
+            self.fR[6](p),
+            self.fR[7](r, p),
         )
 
+    @staticmethod
+    def get_epoch_terms(data, name, f):
+        """returns the attitude-only terms f(r, p, h) of the merged data
+
+        The terms depend only on the roll, pitch, and heading of the matched
+        trajectory epochs, so for a Merge.MergedData they are calculated once
+        per epoch (see MergedData.get_epoch_terms); for a merged data array,
+        they are calculated per point.
+
+        :param data: merged data
+        :param name: key of the terms
+        :param f: function of r, p, and h that returns a tuple of arrays
+        :return (tuple(ndarray), ndarray): terms, and the epoch of the points (None if per point)
+        """
+
+        if isinstance(data, np.ndarray):
+            return f(data[8], data[9], data[10]), None
+        return data.get_epoch_terms(name, f)
+
+    @classmethod
+    def gather_epoch_terms(cls, data, name, f):
+        """returns the attitude-only terms f(r, p, h) of the merged data points (see get_epoch_terms())
+
+        :return tuple(ndarray):
+        """
+
+        terms, epoch_pos = cls.get_epoch_terms(data, name, f)
+        if epoch_pos is None:
+            return terms
+        return tuple(t[epoch_pos] for t in terms)
 
     def calc_poly_surf_coeffs(self, itv=10, sel_mask=None):
         """
@@ -355,22 +668,7 @@ class SensorModel:
             else:
                 sel = sel_mask
 
-        B0 = self.b_est[sel]
-        A0 = self.a_est[sel]
-
-        A = np.vstack(
-            (
-                ne.evaluate("A0 * 0 + 1"),
-                ne.evaluate("A0"),
-                ne.evaluate("B0"),
-                ne.evaluate("A0 ** 2"),
-                ne.evaluate("A0 * B0"),
-                ne.evaluate("B0 ** 2"),
-                ne.evaluate("A0 ** 2 * B0"),
-                ne.evaluate("A0 * B0 ** 2"),
-                ne.evaluate("B0 ** 3"),
-            )
-        ).T
+        A = self.poly_surf_design_matrix(self.a_est[sel], self.b_est[sel], self.eval_type)
 
         dx = self.dx[sel]
         dy = self.dy[sel]
@@ -380,7 +678,34 @@ class SensorModel:
         (self.poly_err_surf_coeffs_y, __, __, __) = np.linalg.lstsq(A, dy, rcond=None)
         (self.poly_err_surf_coeffs_z, __, __, __) = np.linalg.lstsq(A, dz, rcond=None)
 
+    @classmethod
+    def poly_surf_design_matrix(cls, A0, B0, eval_type="numexpr"):
+        """returns the design matrix of the 'poly23' polynomial surface
+
+        The columns correspond to the coefficients p00, p10, p01, p20, p11,
+        p02, p21, p12, and p03, i.e., to the terms 1, a, b, a^2, ab, b^2,
+        a^2b, ab^2, and b^3.
+
+        :param ndarray A0: a values
+        :param ndarray B0: b values
+        :param str eval_type: the eval type used to evaluate the terms
+        :return: ndarray (N x 9)
+        """
+
+        terms = (
+            "A0 * 0 + 1",
+            "A0",
+            "B0",
+            "A0 ** 2",
+            "A0 * B0",
+            "B0 ** 2",
+            "A0 ** 2 * B0",
+            "A0 * B0 ** 2",
+            "B0 ** 3",
+        )
+        local_dict = {"A0": A0, "B0": B0}
 
+        return np.vstack([cls.evaluate_with(eval_type, t, local_dict) for t in terms]).T
 
     @staticmethod
     def calcRMSE(data):
@@ -423,9 +748,9 @@ class SensorModel:
         aer_y_pre = self.aer_y_pre_poly
         aer_z_pre = self.aer_z_pre_poly
 
-        self.dx = ne.evaluate("x_las - aer_x_pre")
-        self.dy = ne.evaluate("y_las - aer_y_pre")
-        self.dz = ne.evaluate("z_las - aer_z_pre")
+        self.dx = self.evaluate("x_las - aer_x_pre", {"x_las": x_las, "aer_x_pre": aer_x_pre})
+        self.dy = self.evaluate("y_las - aer_y_pre", {"y_las": y_las, "aer_y_pre": aer_y_pre})
+        self.dz = self.evaluate("z_las - aer_z_pre", {"z_las": z_las, "aer_z_pre": aer_z_pre})
 
     def calc_aer_pos_pre(self, data):
         """calculates the inital cBLUE aubaerial position
@@ -481,22 +806,7 @@ class SensorModel:
         :return:
         """
 
-        a_est = self.a_est
-        b_est = self.b_est
-
-        A = np.vstack(
-            (
-                ne.evaluate("a_est * 0 + 1"),
-                ne.evaluate("a_est"),
-                ne.evaluate("b_est"),
-                ne.evaluate("a_est ** 2"),
-                ne.evaluate("a_est * b_est"),
-                ne.evaluate("b_est ** 2"),
-                ne.evaluate("a_est ** 2 * b_est"),
-                ne.evaluate("a_est * b_est ** 2"),
-                ne.evaluate("b_est ** 3"),
-            )
-        ).T
+        A = self.poly_surf_design_matrix(self.a_est, self.b_est, self.eval_type)
 
         aer_x_pre = self.aer_x_pre_poly
         aer_y_pre = self.aer_y_pre_poly
@@ -510,9 +820,9 @@ class SensorModel:
         err_y = np.sum(A * coeffs_y, axis=1)
         err_z = np.sum(A * coeffs_z, axis=1)
 
-        aer_pos_x = ne.evaluate("aer_x_pre + err_x")
-        aer_pos_y = ne.evaluate("aer_y_pre + err_y")
-        aer_pos_z = ne.evaluate("aer_z_pre + err_z")
+        aer_pos_x = self.evaluate("aer_x_pre + err_x", {"aer_x_pre": aer_x_pre, "err_x": err_x})
+        aer_pos_y = self.evaluate("aer_y_pre + err_y", {"aer_y_pre": aer_y_pre, "err_y": err_y})
+        aer_pos_z = self.evaluate("aer_z_pre + err_z", {"aer_z_pre": aer_z_pre, "err_z": err_z})
 
         return (
             aer_pos_x,
@@ -520,8 +830,7 @@ class SensorModel:
             aer_pos_z,
         )
 
-    @staticmethod
-    def calc_aer_pos_err(aer_pos, las_pox_xyz):
+    def calc_aer_pos_err(self, aer_pos, las_pox_xyz):
         """calculates the difference between the las and cBLUE positions
 
         This method calculates the differences between the x, y, and z
@@ -558,9 +867,9 @@ class SensorModel:
         y_las = las_pox_xyz[1]
         z_las = las_pox_xyz[2]
 
-        aer_x_err = ne.evaluate("aer_x - x_las")
-        aer_y_err = ne.evaluate("aer_y - y_las")
-        aer_z_err = ne.evaluate("aer_z - z_las")
+        aer_x_err = self.evaluate("aer_x - x_las", {"aer_x": aer_x, "x_las": x_las})
+        aer_y_err = self.evaluate("aer_y - y_las", {"aer_y": aer_y, "y_las": y_las})
+        aer_z_err = self.evaluate("aer_z - z_las", {"aer_z": aer_z, "z_las": z_las})
 
         return (
             aer_x_err,
@@ -569,6 +878,89 @@ class SensorModel:
         )
 
 
+class PolySurfFit:
+    """Accumulates the polynomial-surface least-squares problem of a flight line
+
+    This class is used by the chunked (streaming) TPU mode, in which a flight
+    line is never held in memory all at once.  Instead of keeping the a, b,
+    dX, dY, and dZ values of the whole flight line, the normal equations
+    (A^T A and A^T d) of the 'poly23' fit are summed chunk by chunk.  Because
+    the stable subsample used by SensorModel.calc_poly_surf_coeffs() depends
+    on the number of points of the whole flight line (see
+    Jacobian.get_calc_vals_for_J_eval), the normal equations are accumulated
+    for every candidate modulus, and the modulus is chosen once all of the
+    chunks have been added.  The memory used is independent of the number
+    of points (max_mod x (9x9 + 9x3) values).
+    """
+
+    max_mod = 10
+    min_pts = 50
+
+    def __init__(self, eval_type="numexpr"):
+        self.eval_type = eval_type
+        # index 0 is unused, so that index i holds the sums for modulus i
+        self.AtA = np.zeros((self.max_mod + 1, 9, 9))
+        self.AtD = np.zeros((self.max_mod + 1, 9, 3))
+        self.num_selected = np.zeros(self.max_mod + 1, dtype=np.int64)
+
+    def add(self, a_est, b_est, dx, dy, dz, key):
+        """adds a chunk of points to the normal equations
+
+        :param ndarray a_est: a values
+        :param ndarray b_est: b values
+        :param ndarray dx: las x minus initial cBLUE x
+        :param ndarray dy: las y minus initial cBLUE y
+        :param ndarray dz: las z minus initial cBLUE z
+        :param ndarray key: stable subsample keys (Jacobian.subsample_key)
+        :return: None
+        """
+
+        A = SensorModel.poly_surf_design_matrix(a_est, b_est, self.eval_type)
+        D = np.vstack((dx, dy, dz)).T
+
+        for mod in range(1, self.max_mod + 1):
+            sel = (key % mod) == 0
+            A_sel = A[sel]
+            self.AtA[mod] += A_sel.T @ A_sel
+            self.AtD[mod] += A_sel.T @ D[sel]
+            self.num_selected[mod] += A_sel.shape[0]
+
+    def combine(self, other):
+        """adds the normal equations of another fit of the same flight line
+
+        Used when the blocks of a flight line are fit by different worker
+        processes (see Tpu.run_tpu_multiprocess_flight_lines()).
+
+        :param PolySurfFit other: fit of other points of the flight line
+        :return: None
+        """
+
+        self.AtA += other.AtA
+        self.AtD += other.AtD
+        self.num_selected += other.num_selected
+
+    def solve(self):
+        """solves for the polynomial-surface coefficients
+
+        The modulus is chosen with the same rule as in
+        Jacobian.get_calc_vals_for_J_eval().
+
+        :return: (ndarray, ndarray, ndarray) x, y, and z coefficients
+        """
+
+        mod = self.max_mod
+        while self.num_selected[mod] < self.min_pts and mod > 1:
+            mod -= 1
+
+        # (a tiny flight line uses all of its points, i.e., modulus 1)
+        if self.num_selected[mod] < 9:
+            mod = 1
+
+        coeffs, __, __, __ = np.linalg.lstsq(self.AtA[mod], self.AtD[mod], rcond=None)
+
+        return coeffs[:, 0], coeffs[:, 1], coeffs[:, 2]
+
+
 class Jacobian:
     """This class is used to calculate and evaluate the Jacobian of a
     sensor model's laser geolocation equation.  The class Jacobian attempts
@@ -596,22 +988,119 @@ class Jacobian:
     *var = data[1] * 3* would require something like *data1 = data[1]*
     before executing the numexpr expression *"var = data1 * 3"*.
 
+    Once the lambdified functions have been generated, their source code is
+    cached (see SensorModelCode), and later runs use the cached code without
+    forming the Jacobian symbolically (the symbolic attributes are then None
+    and the variable lists hold the argument names of the cached functions).
+
+    The kernel parameter selects how the Jacobian is evaluated:
+
+    =====   ===============================================================
+    kernel  description
+    =====   ===============================================================
+    cse     single generated function that evaluates the common
+            subexpressions of all terms once, block by block (cse_jacobian)
+    terms   one lambdified function per Jacobian term (lambdify_jacobian)
+    fused   single generated function that calculates the subaerial THU
+            and TVU from the merged data without evaluating the Jacobian
+            into arrays (fuse_subaerial, see Subaerial)
+    =====   ===============================================================
+
     """
 
-    def __init__(self, sensor_model):
+    kernels = ("cse", "terms", "fused")
+
+    # number of points evaluated at a time by the cse and fused kernels
+    # (except with the numba eval type, whose kernels loop over all points)
+    cse_block_size = 32768
+
+    def __init__(self, sensor_model, kernel="terms"):
+        if kernel not in self.kernels:
+            raise ValueError("unknown Jacobian kernel {} (expected one of {})".format(kernel, self.kernels))
+
         self.sensor_model = sensor_model
-        self.OEx = sensor_model.obs_eq[0]
-        self.OEy = sensor_model.obs_eq[1]
-        self.OEz = sensor_model.obs_eq[2]
-        self.Jx, self.Jy, self.Jz = self.form_jacobian()
-        (
-            self.lJx,
-            self.lJy,
-            self.lJz,
-            self.jx_vars,
-            self.jy_vars,
-            self.jz_vars,
-        ) = self.lambdify_jacobian()
+        self.kernel = kernel
+        code = sensor_model.code
+        if code is None:
+            self.OEx = sensor_model.obs_eq[0]
+            self.OEy = sensor_model.obs_eq[1]
+            self.OEz = sensor_model.obs_eq[2]
+            self.Jx, self.Jy, self.Jz = self.form_jacobian()
+            (
+                self.lJx,
+                self.lJy,
+                self.lJz,
+                self.jx_vars,
+                self.jy_vars,
+                self.jz_vars,
+            ) = self.lambdify_jacobian(sensor_model.lambdify_module)
+            self.cse_source = self.cse_jacobian(sensor_model.eval_type)
+            self.fused_source = self.fuse_subaerial(sensor_model.eval_type)
+
+            # the kernels are executed from the saved module, if possible,
+            # so numba can cache their compiled code
+            cache_file = self.save_code()
+            if cache_file is not None:
+                namespace = SensorModelCode.load(sensor_model.eval_type)
+            if cache_file is None or namespace is None:
+                namespace = SensorModelCode.execute(
+                    self.cse_source + "\n\n" + self.fused_source, eval_type=sensor_model.eval_type
+                )
+            self.jacobian_cse = namespace[SensorModelCode.jacobian_cse_name]
+            self.subaerial_fused = namespace[SensorModelCode.subaerial_fused_name]
+        else:
+            self.OEx, self.OEy, self.OEz = None, None, None
+            self.Jx, self.Jy, self.Jz = None, None, None
+            names = SensorModelCode.jacobian_names
+            self.lJx = [code[n] for n in names["x"]]
+            self.lJy = [code[n] for n in names["y"]]
+            self.lJz = [code[n] for n in names["z"]]
+            self.jx_vars = [self.get_arg_names(f) for f in self.lJx]
+            self.jy_vars = [self.get_arg_names(f) for f in self.lJy]
+            self.jz_vars = [self.get_arg_names(f) for f in self.lJz]
+            self.cse_source = None
+            self.fused_source = None
+            self.jacobian_cse = code[SensorModelCode.jacobian_cse_name]
+            self.subaerial_fused = code[SensorModelCode.subaerial_fused_name]
+
+    @staticmethod
+    def get_arg_names(function):
+        """returns the argument names of a lambdified function
+
+        :param function function: lambdified (or cached generated) function
+        :return: list[str]
+        """
+
+        return list(function.__code__.co_varnames[: function.__code__.co_argcount])
+
+    def get_block_size(self, num_points):
+        """returns the number of points the cse and fused kernels evaluate at a time
+
+        :param int num_points: number of points
+        :return: int
+        """
+
+        if self.sensor_model.eval_type == "numba":
+            return max(num_points, 1)
+        return self.cse_block_size
+
+    def save_code(self):
+        """saves the generated code of the sensor model and the Jacobian
+
+        :return: str path of the generated module, or None if it wasn't written
+        """
+
+        functions = {}
+        for name, f in zip(SensorModelCode.fR_names, self.sensor_model.fR):
+            if name:
+                functions[name] = f
+        functions.update(zip(SensorModelCode.obs_eq_names, self.sensor_model.obs_eq_pre_poly))
+        for c, lJ in zip("xyz", (self.lJx, self.lJy, self.lJz)):
+            functions.update(zip(SensorModelCode.jacobian_names[c], lJ))
+
+        sources = [SensorModelCode.get_source(n, f) for n, f in functions.items()]
+        sources += [self.cse_source, self.fused_source]
+        return SensorModelCode.save(self.sensor_model.eval_type, sources)
 
     def form_jacobian(self):
         """generate the jacobian of the specified geolocation equation
@@ -625,6 +1114,8 @@ class Jacobian:
         :return (Matrix, Matrix, Matrix): sympy matrices for x, y, and z J components
         """
 
+        from sympy import symbols, Matrix
+
         a, b, r, p, h, x, y, z, rho = symbols("a b r p h x y z rho")
 
         v = Matrix([a, b, r, p, h, x, y, z, rho])  # vector of unknowns
@@ -635,6 +1126,28 @@ class Jacobian:
 
         return Jx, Jy, Jz
 
+    @staticmethod
+    def get_trig_substitutions():
+        """returns the substitutions of the trig terms of the Jacobian
+
+        The sines and cosines of a, b, r, p, and h are replaced by the
+        symbols sin_a, ..., cos_h, which are evaluated beforehand (see
+        calc_trig_terms()).
+
+        :return list[tuple]: (trig term, symbol) pairs
+        """
+
+        from sympy import symbols, cos, sin
+
+        a, b, r, p, h = symbols("a b r p h")
+
+        substitutions = []
+        for f in (sin, cos):
+            for v in (a, b, r, p, h):
+                substitutions.append((f(v), symbols("{}_{}".format(f.__name__, v))))
+
+        return substitutions
+
     def lambdify_jacobian(self, eval_type="numexpr"):
         """turn the symbolic Jacobian into a function for faster computation
 
@@ -651,52 +1164,9 @@ class Jacobian:
         :return (function, function, function): lambdified x, y, and z Jacobian components
         """
 
-        # create variables for symbolic computations
-        (
-            a,
-            b,
-            r,
-            p,
-            h,
-            rho,
-            p00,
-            p10,
-            p01,
-            p20,
-            p11,
-            p02,
-            p21,
-            p12,
-            p03,
-            sin_a,
-            sin_b,
-            sin_r,
-            sin_p,
-            sin_h,
-            cos_a,
-            cos_b,
-            cos_r,
-            cos_p,
-            cos_h,
-        ) = symbols(
-            "a b r p h rho "
-            "p00 p10 p01 p20 p11 p02 p21 p12 p03 "
-            "sin_a sin_b sin_r sin_p sin_h "
-            "cos_a cos_b cos_r cos_p cos_h"
-        )
+        from sympy import lambdify
 
-        trig_substitutions = [
-            (sin(a), sin_a),
-            (sin(b), sin_b),
-            (sin(r), sin_r),
-            (sin(p), sin_p),
-            (sin(h), sin_h),
-            (cos(a), cos_a),
-            (cos(b), cos_b),
-            (cos(r), cos_r),
-            (cos(p), cos_p),
-            (cos(h), cos_h),
-        ]
+        trig_substitutions = self.get_trig_substitutions()
 
         # functionize the trig terms of the Jacobian components
         Jxsub = [j.subs(trig_substitutions) for j in self.Jx]
@@ -715,35 +1185,249 @@ class Jacobian:
 
         return lJx, lJy, lJz, jx_vars, jy_vars, jz_vars
 
-    def calc_trig_terms(self, a_est, b_est, r, p, h):
+    # rows of the evaluated Jx, Jy, and Jz arrays (see eval_jacobian_terms())
+    # holding each non-constant Jacobian term, {term index: row}
+    jacobian_rows = {
+        "x": {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 8: 6},
+        "y": {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 8: 6},
+        "z": {0: 0, 1: 1, 2: 2, 3: 3, 8: 5},
+    }
+
+    def cse_jacobian(self, eval_type="numexpr"):
+        """generate a kernel that evaluates all of the Jacobian terms at once
+
+        Each lambdified Jacobian term (see lambdify_jacobian()) recomputes the
+        products of the sines, cosines, and rho that it shares with the other
+        terms.  This method uses sympy.cse to extract the common subexpressions
+        of all of the non-constant Jx, Jy, and Jz terms and generates the source
+        code of a single function that evaluates each common subexpression once
+        and writes the terms into the rows of preallocated Jx, Jy, and Jz arrays.
+
+        The polynomial surface coefficients of the x, y, and z components are
+        renamed with a component suffix (e.g., p10_x).  The arguments of the
+        generated function are the sorted names of the variables, followed by
+        the Jx, Jy, and Jz arrays.
+
+        Reference:
+        https://docs.sympy.org/latest/modules/rewriting.html#common-subexpression-detection-and-collection
+
+        :param str eval_type: the eval type of the generated code (see SensorModel)
+        :return str: source code of the generated function
+        """
+
+        from sympy import cse, numbered_symbols, symbols
+
+        trig_substitutions = self.get_trig_substitutions()
+        p_coeffs_vars = symbols("p00 p10 p01 p20 p11 p02 p21 p12 p03")
+
+        terms = []
+        outputs = []
+        for c, J in zip("xyz", (self.Jx, self.Jy, self.Jz)):
+            p_coeffs_sub = {p: symbols("{}_{}".format(p, c)) for p in p_coeffs_vars}
+            for i, row in self.jacobian_rows[c].items():
+                terms.append(J[i].subs(trig_substitutions).subs(p_coeffs_sub))
+                outputs.append(("J" + c, row))
+
+        subexpressions, reduced_terms = cse(terms, symbols=numbered_symbols("cse"))
+
+        args = sorted({str(s) for term in terms for s in term.free_symbols})
+        arrays = [a for a in args if a[0] != "p"]  # the polynomial surface coefficients are scalars
+
+        return self.generate_kernel(
+            SensorModelCode.jacobian_cse_name,
+            args,
+            arrays,
+            subexpressions,
+            list(zip(outputs, reduced_terms)),
+            eval_type,
+        )
+
+    # merged data rows (see Subaerial) and standard deviation rows used by
+    # the function generated by fuse_subaerial(), by argument name
+    fused_data_rows = {
+        "x_las": 2, "y_las": 3, "z_las": 4,
+        "x_sbet": 5, "y_sbet": 6, "z_sbet": 7,
+    }
+    fused_attitude_terms = ["sin_r", "sin_p", "sin_h", "cos_r", "cos_p", "cos_h"]  # see calc_attitude_trig_terms()
+    fused_stddev_rows = {
+        "std_a": 0, "std_b": 1, "std_r": 2, "std_p": 3, "std_h": 4,
+        "std_x": 5, "std_y": 6, "std_z": 7, "std_rho": 8,
+    }
+
+    def fuse_subaerial(self, eval_type="numexpr"):
+        """generate a kernel that calculates the subaerial THU and TVU in one pass
+
+        The subaerial chain (SensorModel.estimate_rho_a_b(), calc_trig_terms(),
+        eval_jacobian(), and Subaerial.propogate_uncertainty()) writes many
+        full-length temporary arrays, so it is limited by memory traffic rather
+        than by arithmetic.  This method generates the source code of a single
+        function that performs the whole chain for a block of points: rho, a,
+        and b are estimated, the x, y, and z variances (the sums of the squared
+        Jacobian terms times the variances of the corresponding variables) are
+        calculated with the common subexpressions evaluated once (sympy.cse),
+        and the THU and TVU are written into preallocated arrays.  Only the
+        merged data and standard deviations are read, and only the THU and TVU
+        are written, at full length.  The sines and cosines of roll, pitch,
+        and heading are arguments, as they are calculated per trajectory epoch
+        (see calc_attitude_trig_terms()).
+
+        The polynomial surface coefficients are renamed as in cse_jacobian().
+        The arguments of the generated function are the sorted names of the
+        variables (see fused_data_rows, fused_attitude_terms, and
+        fused_stddev_rows), followed by the THU and TVU arrays.
+
+        :param str eval_type: the eval type of the generated code (see SensorModel)
+        :return str: source code of the generated function
+        """
+
+        from sympy import asin, cos, cse, numbered_symbols, sin, sqrt, symbols
+
+        trig_substitutions = self.get_trig_substitutions()
+        p_coeffs_vars = symbols("p00 p10 p01 p20 p11 p02 p21 p12 p03")
+        std = symbols(" ".join(self.fused_stddev_rows))  # std_a, std_b, ..., std_rho
+
+        # the variances, i.e., sum(J**2 * stddev**2) (the covariances are assumed to be zero)
+        variances = []
+        for c, J in zip("xyz", (self.Jx, self.Jy, self.Jz)):
+            p_coeffs_sub = {p: symbols("{}_{}".format(p, c)) for p in p_coeffs_vars}
+            J = J.subs(trig_substitutions).subs(p_coeffs_sub)
+            variances.append(sum(J[i] ** 2 * std[i] ** 2 for i in range(9)))
+
+        subexpressions, reduced_variances = cse(variances, symbols=numbered_symbols("cse"))
+
+        # estimate rho, a, and b as in SensorModel.estimate_rho_a_b()
+        x_las, y_las, z_las, x_sbet, y_sbet, z_sbet = symbols(" ".join(self.fused_data_rows))
+        rho_x, rho_y, rho_z, rho, a, b = symbols("rho_x rho_y rho_z rho a b")
+        fR = symbols("fR0:9")
+        R = self.sensor_model.R.subs(trig_substitutions)
+
+        body = [(rho_x, x_las - x_sbet), (rho_y, y_las - y_sbet), (rho_z, z_las - z_sbet)]
+        body += [(fR[i], R[i]) for i in (0, 1, 3, 4, 6, 7)]
+        body += [
+            (rho, sqrt(rho_x**2 + rho_y**2 + rho_z**2)),
+            (b, asin((fR[0] * rho_x + fR[3] * rho_y + fR[6] * rho_z) / (-rho))),
+            (a, asin((fR[1] * rho_x + fR[4] * rho_y + fR[7] * rho_z) / (rho * cos(b)))),
+        ]
+        body += [(s, t) for t, s in trig_substitutions[0:2] + trig_substitutions[5:7]]  # a, b
+        body += subexpressions
+
+        var_x, var_y, var_z = symbols("var_x var_y var_z")
+        body += list(zip((var_x, var_y, var_z), reduced_variances))
+
+        args = {str(s) for v in variances for s in v.free_symbols}
+        args -= {"a", "b", "rho"}
+        args -= {str(s) for __, s in trig_substitutions}
+        args = sorted(args | set(self.fused_data_rows) | set(self.fused_attitude_terms))
+        arrays = list(self.fused_data_rows) + self.fused_attitude_terms + list(self.fused_stddev_rows)
+
+        return self.generate_kernel(
+            SensorModelCode.subaerial_fused_name,
+            args,
+            arrays,
+            body,
+            [(("thu", None), sqrt(var_x + var_y)), (("tvu", None), sqrt(var_z))],
+            eval_type,
+        )
+
+    @staticmethod
+    def generate_kernel(name, args, arrays, body, outputs, eval_type):
+        """generates the source code of a kernel function
+
+        The kernel evaluates the (symbol, expression) assignments of body in
+        order and writes each output expression into its output array.  The
+        outputs are (array name, row) pairs (row None for a 1-d array); the
+        output arrays follow args in the arguments of the kernel.
+
+        With the numexpr and numpy eval types, each assignment is evaluated for
+        all of the points (of a block) at once.  With the numba eval type, the
+        assignments are compiled into a function of a single point, which a
+        parallel loop (numba.prange) calls for each point, so no temporary
+        arrays are created.
+
+        :param str name: name of the generated function
+        :param list[str] args: argument names
+        :param list[str] arrays: names of the arguments that are arrays of point values
+        :param list[tuple] body: (symbol, sympy expression) assignments
+        :param list[tuple] outputs: ((array name, row), sympy expression) outputs
+        :param str eval_type: the eval type of the generated code (see SensorModel)
+        :return str: source code of the generated function
+        """
+
+        from sympy.printing.lambdarepr import NumExprPrinter
+        from sympy.printing.numpy import NumPyPrinter
+
+        out_arrays = list(dict.fromkeys(out for (out, __), __ in outputs))
+        signature = "{}({})".format(name, ", ".join(args + out_arrays))
+
+        def target(out, row, index):
+            return "{}[{}]".format(out, ", ".join(str(i) for i in (row, index) if i is not None))
+
+        if eval_type == "numexpr":
+            printer = NumExprPrinter()
+            lines = ["def {}:".format(signature)]
+            for s, expr in body:
+                lines.append("    {} = evaluate('{}', truediv=True)".format(s, printer._print(expr)))
+            for (out, row), expr in outputs:
+                out = out if row is None else target(out, row, None)
+                lines.append("    evaluate('{}', out={}, truediv=True)".format(printer._print(expr), out))
+        elif eval_type == "numpy":
+            printer = NumPyPrinter()
+            lines = ["def {}:".format(signature)]
+            for s, expr in body:
+                lines.append("    {} = {}".format(s, printer.doprint(expr)))
+            for (out, row), expr in outputs:
+                lines.append("    {} = {}".format(target(out, row, ":"), printer.doprint(expr)))
+        elif eval_type == "numba":
+            printer = NumPyPrinter()
+            point = "_{}_point".format(name)
+            lines = ["@numba.njit(cache=True)", "def {}({}):".format(point, ", ".join(args))]
+            for s, expr in body:
+                lines.append("    {} = {}".format(s, printer.doprint(expr)))
+            lines.append("    return {}".format(", ".join(printer.doprint(expr) for __, expr in outputs)))
+            lines += [
+                "",
+                "",
+                "@numba.njit(cache=True, parallel=True)",
+                "def {}:".format(signature),
+                "    for i in numba.prange({}.shape[-1]):".format(out_arrays[0]),
+                "        {} = {}({})".format(
+                    ", ".join(target(out, row, "i") for (out, row), __ in outputs),
+                    point,
+                    ", ".join(a + "[i]" if a in arrays else a for a in args),
+                ),
+            ]
+        else:
+            raise ValueError("unknown eval type {}".format(eval_type))
+
+        return "\n".join(lines) + "\n"
+
+    def calc_trig_terms(self, a_est, b_est, data):
         """helper method to evaluate the trigonometric terms in the Jacobian
 
         This method aims to simplify evaluation of the Jacobian by pre-evaluating
         the trigonometic terms of the Jacobian.  The reasoning is that this speeds
         up the computations because the trigonometric terms are only evaluated
-        once, instead of every time they show up in the Jacobian.
+        once, instead of every time they show up in the Jacobian.  The terms of
+        roll, pitch, and heading are evaluated once per trajectory epoch (see
+        SensorModel.get_epoch_terms()).
 
         :param a_est: a calculated from the data
         :param b_est: b calculated from the data
-        :param r: roll data
-        :param p: pitch data
-        :param h: heave data
+        :param data: merged data
         :return tupe(ndarray): the evaluated trigonometric terms
         """
 
-        sin_a = ne.evaluate("sin(a_est)")
-        sin_b = ne.evaluate("sin(b_est)")
-
-        cos_a = ne.evaluate("cos(a_est)")
-        cos_b = ne.evaluate("cos(b_est)")
+        evaluate = self.sensor_model.evaluate
+        ab = {"a_est": a_est, "b_est": b_est}
+        sin_a = evaluate("sin(a_est)", ab)
+        sin_b = evaluate("sin(b_est)", ab)
 
-        sin_r = ne.evaluate("sin(r)")
-        sin_p = ne.evaluate("sin(p)")
-        sin_h = ne.evaluate("sin(h)")
+        cos_a = evaluate("cos(a_est)", ab)
+        cos_b = evaluate("cos(b_est)", ab)
 
-        cos_r = ne.evaluate("cos(r)")
-        cos_p = ne.evaluate("cos(p)")
-        cos_h = ne.evaluate("cos(h)")
+        sin_r, sin_p, sin_h, cos_r, cos_p, cos_h = self.sensor_model.gather_epoch_terms(
+            data, ("trig", self.sensor_model.eval_type), self.calc_attitude_trig_terms
+        )
 
         return (
             sin_a,
@@ -758,7 +1442,126 @@ class Jacobian:
             cos_h,
         )
 
-    def get_calc_vals_for_J_eval(self, data):
+    def calc_attitude_trig_terms(self, r, p, h):
+        """evaluates the sines and cosines of roll, pitch, and heading
+
+        :param r: roll
+        :param p: pitch
+        :param h: heading
+        :return tuple(ndarray): sin_r, sin_p, sin_h, cos_r, cos_p, and cos_h
+        """
+
+        evaluate = self.sensor_model.evaluate
+        rph = {"r": r, "p": p, "h": h}
+        sin_r = evaluate("sin(r)", rph)
+        sin_p = evaluate("sin(p)", rph)
+        sin_h = evaluate("sin(h)", rph)
+
+        cos_r = evaluate("cos(r)", rph)
+        cos_p = evaluate("cos(p)", rph)
+        cos_h = evaluate("cos(h)", rph)
+
+        return sin_r, sin_p, sin_h, cos_r, cos_p, cos_h
+
+    @staticmethod
+    def subsample_key(data):
+        """returns a stable subsample key for each point of the merged data
+
+        The key is based on the point identity (t, x, y, z), rather than on
+        the position of the point in the array, so the subsample used for the
+        polynomial surface fitting doesn't depend on the point order (or on
+        how a flight line is split into chunks).
+
+        :param data: merged data
+        :return: ndarray (int64)
+        """
+
+        t_i = np.round(data[1] * 1e7).astype(np.int64)   # 0.1 microsecond ticks
+        x_i = np.round(data[2] * 100).astype(np.int64)   # centimeters
+        y_i = np.round(data[3] * 100).astype(np.int64)
+        z_i = np.round(data[4] * 100).astype(np.int64)
+
+        return (t_i
+            ^ (x_i * np.int64(1000003))
+            ^ (y_i * np.int64(10007))
+            ^ (z_i * np.int64(101))).astype(np.int64)
+
+    def poly_surf_subsample(self, data):
+        """selects the stable subsample used for the polynomial surface fitting
+
+        :param data: merged data
+        :return (int, ndarray): modulus and selection mask (see subsample_key())
+        """
+
+        key = self.subsample_key(data)
+
+        # Choose a modulus that guarantees enough points, deterministically.
+        min_pts = 50
+        mod = 10
+        sel_mask = (key % mod) == 0
+
+        # deterministically relax mod until we have enough points
+        while sel_mask.sum() < min_pts and mod > 1:
+            mod -= 1
+            sel_mask = (key % mod) == 0
+
+        # If still too small (tiny flightline), just use all points (only for tiny cases)
+        if sel_mask.sum() < 9:
+            sel_mask[:] = True
+
+        return mod, sel_mask
+
+    def fit_poly_surf_coeffs(self, data):
+        """fits the polynomial surface coefficients to the subsample only
+
+        This method performs steps 1-4 of get_calc_vals_for_J_eval() for the
+        points of the stable subsample (see poly_surf_subsample()), which are
+        the only points used by the fit, so the coefficients are the same as
+        those of get_calc_vals_for_J_eval().
+
+        :param data: merged data
+        :return (ndarray, ndarray, ndarray): x, y, and z polynomial surface coefficients
+        """
+
+        mod, sel_mask = self.poly_surf_subsample(data)
+        subsample = data[:, sel_mask]
+
+        self.sensor_model.estimate_rho_a_b(subsample)
+        self.sensor_model.calc_aer_pos_pre(subsample)
+        self.sensor_model.calc_diff(subsample[2], subsample[3], subsample[4])
+        self.sensor_model.calc_poly_surf_coeffs(itv=1)
+
+        return (
+            self.sensor_model.poly_err_surf_coeffs_x,
+            self.sensor_model.poly_err_surf_coeffs_y,
+            self.sensor_model.poly_err_surf_coeffs_z,
+        )
+
+    def add_to_poly_surf_fit(self, data, poly_surf_fit):
+        """adds a chunk of merged data to a flight line's polynomial surface fit
+
+        This method performs steps 1-3 of get_calc_vals_for_J_eval() and adds
+        the result to the normal equations held by poly_surf_fit.
+
+        :param data: merged data (a chunk of a flight line)
+        :param PolySurfFit poly_surf_fit: the flight line's polynomial surface fit
+        :return: None
+        """
+
+        self.sensor_model.estimate_rho_a_b(data)
+        self.sensor_model.calc_aer_pos_pre(data)
+        self.sensor_model.calc_diff(data[2], data[3], data[4])
+
+        poly_surf_fit.add(
+            self.sensor_model.a_est,
+            self.sensor_model.b_est,
+            self.sensor_model.dx,
+            self.sensor_model.dy,
+            self.sensor_model.dz,
+            self.subsample_key(data),
+        )
+
+    def get_calc_vals_for_J_eval(self, data, poly_surf_coeffs=None):
         """calculatse and assembles the values needed to evaluate the Jacobian
 
         This methods calculates and assembles the values needed to evaluate the Jacobian.
@@ -790,7 +1593,12 @@ class Jacobian:
         cos_h       calculated cos(h) values
         =========   ===================================================================
 
+        If poly_surf_coeffs is given (e.g., when a flight line is processed
+        in chunks, see PolySurfFit), steps 2-4 are skipped and the given
+        coefficients are used instead.
+
         :param data
+        :param tuple(ndarray) poly_surf_coeffs: optional x, y, and z polynomial surface coefficients
         :return dict: calcualted values used to evaluate Jacobian
 
         """
@@ -798,43 +1606,27 @@ class Jacobian:
         # estimate rho, a, and b from data
         self.sensor_model.estimate_rho_a_b(data)
 
-        # use rho, a, and b estimates to calculate initial estimate of X, Y, Z
-        self.sensor_model.calc_aer_pos_pre(data)
-
-        # calculate differece between initial X, Y, and Z estimates and las X, Y, and Z
-        self.sensor_model.calc_diff(data[2], data[3], data[4])
-
-        # --- stable subsample mask based on point identity (t,x,y,z) ---
-        t_i = np.round(data[1] * 1e7).astype(np.int64)   # 0.1 microsecond ticks
-        x_i = np.round(data[2] * 100).astype(np.int64)   # centimeters
-        y_i = np.round(data[3] * 100).astype(np.int64)
-        z_i = np.round(data[4] * 100).astype(np.int64)
-
-        key = (t_i
-            ^ (x_i * np.int64(1000003))
-            ^ (y_i * np.int64(10007))
-            ^ (z_i * np.int64(101))).astype(np.int64)
-
-        # Choose a modulus that guarantees enough points, deterministically.
-        min_pts = 50
-        mod = 10
-        sel_mask = (key % mod) == 0
+        if poly_surf_coeffs is None:
+            # use rho, a, and b estimates to calculate initial estimate of X, Y, Z
+            self.sensor_model.calc_aer_pos_pre(data)
 
-        # deterministically relax mod until we have enough points
-        while sel_mask.sum() < min_pts and mod > 1:
-            mod -= 1
-            sel_mask = (key % mod) == 0
+            # calculate differece between initial X, Y, and Z estimates and las X, Y, and Z
+            self.sensor_model.calc_diff(data[2], data[3], data[4])
 
-        # If still too small (tiny flightline), just use all points (only for tiny cases)
-        if sel_mask.sum() < 9:
-            sel_mask[:] = True
+            # --- stable subsample mask based on point identity (t,x,y,z) ---
+            mod, sel_mask = self.poly_surf_subsample(data)
 
-        self.sensor_model.calc_poly_surf_coeffs(itv=mod, sel_mask=sel_mask)
-        # print("sel_mask_sum =", int(sel_mask.sum()), "N =", int(sel_mask.size), "mod =", mod)
+            self.sensor_model.calc_poly_surf_coeffs(itv=mod, sel_mask=sel_mask)
+            # print("sel_mask_sum =", int(sel_mask.sum()), "N =", int(sel_mask.size), "mod =", mod)
+        else:
+            # the coefficients were already fit to the whole flight line
+            (
+                self.sensor_model.poly_err_surf_coeffs_x,
+                self.sensor_model.poly_err_surf_coeffs_y,
+                self.sensor_model.poly_err_surf_coeffs_z,
+            ) = poly_surf_coeffs
 
-        trig_subs = self.calc_trig_terms(
-            self.sensor_model.a_est, self.sensor_model.b_est, data[8], data[9], data[10]
-        )
+        trig_subs = self.calc_trig_terms(self.sensor_model.a_est, self.sensor_model.b_est, data)
 
         p_coeffs_vars = ["p00", "p10", "p01", "p20", "p11", "p02", "p21", "p12", "p03"]
 
@@ -893,9 +1685,71 @@ class Jacobian:
 
         return vals
 
-    def eval_jacobian(self, data):
+    def eval_jacobian(self, data, poly_surf_coeffs=None):
         """evaluate the Jacobian of the modified laser geolocation equation
 
+        The Jacobian is evaluated with the selected kernel (see the class
+        docstring); both kernels return the same arrays.
+
+        :param data:
+        :param tuple(ndarray) poly_surf_coeffs: optional x, y, and z polynomial surface coefficients
+        :return (ndarray, ndarray, ndarray): x, y, and z evaluated Jacobian components
+        """
+
+        J_param_values = self.get_calc_vals_for_J_eval(data, poly_surf_coeffs)
+
+        if self.kernel == "cse":
+            return self.eval_jacobian_cse(J_param_values, data.shape[1])
+        return self.eval_jacobian_terms(J_param_values, data.shape[1])
+
+    def eval_jacobian_cse(self, J_param_values, num_points):
+        """evaluate the Jacobian with the common-subexpression kernel
+
+        This method evaluates the Jacobian with the function generated by
+        cse_jacobian(), cse_block_size points at a time, so the common
+        subexpressions of a block stay in the cache between the terms that
+        use them.  The rows of the Jacobian terms equal to 1 are set to all 1s,
+        as in eval_jacobian_terms().
+
+        :param dict J_param_values: values returned by get_calc_vals_for_J_eval()
+        :param int num_points: number of points
+        :return (ndarray, ndarray, ndarray): x, y, and z evaluated Jacobian components
+        """
+
+        args = []
+        for var in self.get_arg_names(self.jacobian_cse)[:-3]:
+            if var[0] == "p":  # e.g., 'p00_x'
+                coeff, J_comp = var.split("_")
+                args.append(J_param_values["p_coeffs"][J_comp][coeff])
+            else:
+                args.append(J_param_values[var])
+
+        Jx = np.empty((7, num_points))
+        Jy = np.empty((7, num_points))
+        Jz = np.empty((6, num_points))
+        Jx[5] = 1
+        Jy[5] = 1
+        Jz[4] = 1
+
+        block_size = self.get_block_size(num_points)
+        for start in range(0, num_points, block_size):
+            block = slice(start, start + block_size)
+            self.jacobian_cse(
+                *[a[block] if isinstance(a, np.ndarray) else a for a in args],
+                Jx[:, block],
+                Jy[:, block],
+                Jz[:, block],
+            )
+
+        return (
+            Jx,
+            Jy,
+            Jz,
+        )
+
+    def eval_jacobian_terms(self, J_param_values, num_points):
+        """evaluate the Jacobian of the modified laser geolocation equation term by term
+
         This method evaluates the Jacobian by passing the relevant parameters
         to the lambdified functions representing the x, y, and z components
         of the Jacobian.
@@ -907,12 +1761,11 @@ class Jacobian:
         terms equal to 1; rather, the corresponding row in the evaluated Jacobian
         array is set to all 1s.
 
-        :param data:
+        :param dict J_param_values: values returned by get_calc_vals_for_J_eval()
+        :param int num_points: number of points
         :return (ndarray, ndarray, ndarray): x, y, and z evaluated Jacobian components
         """
 
-        J_param_values = self.get_calc_vals_for_J_eval(data)
-
         Jx = np.vstack(
             (
                 self.lJx[0](
@@ -930,7 +1783,7 @@ class Jacobian:
                 self.lJx[4](
                     *self.get_J_term_values("x", self.jx_vars[4], J_param_values)
                 ),
-                np.ones(data[0].size),
+                np.ones(num_points),
                 self.lJx[8](
                     *self.get_J_term_values("x", self.jx_vars[8], J_param_values)
                 ),
@@ -954,7 +1807,7 @@ class Jacobian:
                 self.lJy[4](
                     *self.get_J_term_values("y", self.jy_vars[4], J_param_values)
                 ),
-                np.ones(data[0].size),
+                np.ones(num_points),
                 self.lJy[8](
                     *self.get_J_term_values("y", self.jy_vars[8], J_param_values)
                 ),
@@ -975,7 +1828,7 @@ class Jacobian:
                 self.lJz[3](
                     *self.get_J_term_values("z", self.jz_vars[3], J_param_values)
                 ),
-                np.ones(data[0].size),
+                np.ones(num_points),
                 self.lJz[8](
                     *self.get_J_term_values("z", self.jz_vars[8], J_param_values)
                 ),
@@ -1033,15 +1886,21 @@ class Subaerial:
     8       std_rho     ?
     =====   =========   =======================
 
+    If the Jacobian's kernel is "fused", the THU and TVU are calculated by
+    calc_subaerial_tpu_fused(), and the component uncertainties are not kept.
+
     :param Jacobian J: Jacobian object
-    :param ndarray: merged Lidar/Trajectory data
-    :param ndarray: standard deviations of component variables
+    :param ndarray: merged Lidar/Trajectory data (or a Merge.MergedData)
+    :param ndarray: standard deviations of component variables (or a Merge.MergedStddev)
+    :param tuple(ndarray): optional polynomial surface coefficients (chunked mode)
     """
 
-    def __init__(self, jacobian, merged_data, stddev):
+    def __init__(self, jacobian, merged_data, stddev, poly_surf_coeffs=None):
         self.jacobian = jacobian  # Jacobian object
-        self.merged_data = merged_data  # merged-data ndarray
-        self.stddev = stddev  # nparray of standard deviations
+        self.merged_data = merged_data  # merged data (see Merge.merge)
+        self.stddev = stddev  # standard deviations (see Merge.merge)
+        # optional polynomial surface coefficients fit to the whole flight line
+        self.poly_surf_coeffs = poly_surf_coeffs
         self.x_comp_uncertainties = None
         self.y_comp_uncertainties = None
         self.z_comp_uncertainties = None
@@ -1080,8 +1939,11 @@ class Subaerial:
         :return (ndarray, ndarray, list[str]): subaerial THU, subaerial TVU, THU and TVU column headers
         """
 
+        evaluate = self.jacobian.sensor_model.evaluate
         stddev = self.stddev
-        V = ne.evaluate("stddev * stddev")  # variance = stddev**2
+        if not isinstance(stddev, np.ndarray):  # e.g., Merge.MergedStddev
+            stddev = stddev.to_array()
+        V = evaluate("stddev * stddev", {"stddev": stddev})  # variance = stddev**2
 
         # delete the rows corresponding to the Jacobian terms that equal 0
         Vx = np.delete(V, [6, 7], 0)
@@ -1093,23 +1955,19 @@ class Subaerial:
         Jz = J_eval[2]
 
         # componenet uncertainties
-        self.x_comp_uncertainties = ne.evaluate("Jx * Jx * Vx")
-        self.y_comp_uncertainties = ne.evaluate("Jy * Jy * Vy")
-        self.z_comp_uncertainties = ne.evaluate("Jz * Jz * Vz")
+        self.x_comp_uncertainties = evaluate("Jx * Jx * Vx", {"Jx": Jx, "Vx": Vx})
+        self.y_comp_uncertainties = evaluate("Jy * Jy * Vy", {"Jy": Jy, "Vy": Vy})
+        self.z_comp_uncertainties = evaluate("Jz * Jz * Vz", {"Jz": Jz, "Vz": Vz})
 
-        x_comp_uncertainties = self.x_comp_uncertainties
-        y_comp_uncertainties = self.y_comp_uncertainties
-        z_comp_uncertainties = self.z_comp_uncertainties
+        sum_Jx = evaluate("sum(u, axis=0)", {"u": self.x_comp_uncertainties})
+        sum_Jy = evaluate("sum(u, axis=0)", {"u": self.y_comp_uncertainties})
+        sum_Jz = evaluate("sum(u, axis=0)", {"u": self.z_comp_uncertainties})
 
-        sum_Jx = ne.evaluate("sum(x_comp_uncertainties, axis=0)")
-        sum_Jy = ne.evaluate("sum(y_comp_uncertainties, axis=0)")
-        sum_Jz = ne.evaluate("sum(z_comp_uncertainties, axis=0)")
+        sx = evaluate("sqrt(sum_Jx)", {"sum_Jx": sum_Jx})
+        sy = evaluate("sqrt(sum_Jy)", {"sum_Jy": sum_Jy})
 
-        sx = ne.evaluate("sqrt(sum_Jx)")
-        sy = ne.evaluate("sqrt(sum_Jy)")
-
-        self.tvu = ne.evaluate("sqrt(sum_Jz)")
-        self.thu = ne.evaluate("sqrt(sx**2 + sy**2)")
+        self.tvu = evaluate("sqrt(sum_Jz)", {"sum_Jz": sum_Jz})
+        self.thu = evaluate("sqrt(sx**2 + sy**2)", {"sx": sx, "sy": sy})
 
     def calc_subaerial_tpu(self):
         """calculates the subaerial uncertainty
@@ -1136,14 +1994,76 @@ class Subaerial:
         :return: (ndarray, ndarray, list[str])
         """
 
+        if self.jacobian.kernel == "fused":
+            return self.calc_subaerial_tpu_fused()
+
         # EVALUATE JACOBIAN
-        J_eval = self.jacobian.eval_jacobian(self.merged_data)
+        J_eval = self.jacobian.eval_jacobian(self.merged_data, self.poly_surf_coeffs)
 
         # PROPAGATE UNCERTAINTY
         self.propogate_uncertainty(J_eval)
 
         return self.thu, self.tvu
 
+    def calc_subaerial_tpu_fused(self):
+        """calculates the subaerial uncertainty with the fused kernel
+
+        The polynomial surface coefficients are fit to the stable subsample
+        of the merged data (see Jacobian.fit_poly_surf_coeffs()), unless they
+        were given, and the function generated by Jacobian.fuse_subaerial()
+        then calculates the THU and TVU, Jacobian.cse_block_size points at a
+        time, without writing the Jacobian or any other temporary arrays at
+        full length.  The sines and cosines of roll, pitch, and heading are
+        calculated per trajectory epoch and gathered one block at a time.
+
+        :return: (ndarray, ndarray)
+        """
+
+        data = self.merged_data
+        jacobian = self.jacobian
+        num_points = data.shape[1]
+
+        poly_surf_coeffs = self.poly_surf_coeffs
+        if poly_surf_coeffs is None:
+            poly_surf_coeffs = jacobian.fit_poly_surf_coeffs(data)
+        p_coeffs_vars = ["p00", "p10", "p01", "p20", "p11", "p02", "p21", "p12", "p03"]
+
+        sensor_model = jacobian.sensor_model
+        attitude_terms, epoch_pos = sensor_model.get_epoch_terms(
+            data, ("trig", sensor_model.eval_type), jacobian.calc_attitude_trig_terms
+        )
+
+        args = []
+        attitude_args = []  # the args gathered by epoch
+        for var in jacobian.get_arg_names(jacobian.subaerial_fused)[:-2]:
+            if var in jacobian.fused_data_rows:
+                args.append(data[jacobian.fused_data_rows[var]])
+            elif var in jacobian.fused_attitude_terms:
+                attitude_args.append(len(args))
+                args.append(attitude_terms[jacobian.fused_attitude_terms.index(var)])
+            elif var in jacobian.fused_stddev_rows:
+                # the constant standard deviations are scalars (see Merge.MergedStddev),
+                # broadcast without copying so that the kernels index them as the other rows
+                args.append(np.broadcast_to(self.stddev[jacobian.fused_stddev_rows[var]], num_points))
+            else:  # e.g., 'p00_x'
+                coeff, J_comp = var.split("_")
+                args.append(poly_surf_coeffs["xyz".index(J_comp)][p_coeffs_vars.index(coeff)])
+
+        self.thu = np.empty(num_points)
+        self.tvu = np.empty(num_points)
+
+        block_size = jacobian.get_block_size(num_points)
+        for start in range(0, num_points, block_size):
+            block = slice(start, start + block_size)
+            block_args = [a[block] if isinstance(a, np.ndarray) else a for a in args]
+            if epoch_pos is not None:
+                block_epoch_pos = epoch_pos[block]
+                for i in attitude_args:
+                    block_args[i] = args[i][block_epoch_pos]
+            jacobian.subaerial_fused(*block_args, self.thu[block], self.tvu[block])
+
+        return self.thu, self.tvu
+
 
 if __name__ == "__main__":
     pass
@@ -33,14 +33,312 @@ Keana Kief (OSU)
 August 5th, 2025
 """
 
+import hashlib
+import json
 import logging
+import os
 import pandas as pd
 import numpy as np
-from math import sqrt
 
 logger = logging.getLogger(__name__)
 
 
+class LookupTables:
+    """Subaqueous look up tables of the sensors
+
+    The look up tables of a sensor (see lidar_sensors.json) are loaded when
+    the Sensor is created (Sensor.subaqueous_luts), and their observation
+    equation coefficients are stored as contiguous float64 arrays indexed by
+    wind and kd:
+
+    ==============  =====================================   ==========================
+    sensor type     tables                                  shape
+    ==============  =====================================   ==========================
+    single          vertical, horizontal                    (wind, kd, 2): a, b
+                    range_bias                              (wind, kd, 4): a, b, c, d
+    single_hawkeye  the single tables of the deep_narrow,   as single
+                    deep_wide, and shallow channels
+    multi           vertical, horizontal                    (wind, kd, 2, fan angle)
+    ==============  =====================================   ==========================
+
+    The tables of all the sensors are compiled into a look up table pack
+    (python Subaqueous.py), a float64 .npy file of the tables one after the
+    other and a .json index of their offsets, shapes, and source files (with
+    the size, modification time, and sha1 of each source file). The pack is
+    memory-mapped and validated when the first sensor is created, and the
+    tables of a sensor are only read from their csv/xlsx files if the sensor
+    isn't in the pack, or its look up table paths or files changed since the
+    pack was built.  The tables read from the csv/xlsx files are kept in a
+    process-wide registry (tables), so they are read once per process.
+
+    The worker processes of the multiprocessing pool don't load the tables;
+    they get them with the pickled Sensor sent to the pool initializer (see
+    Tpu.init_worker()).
+    """
+
+    # the single beam csv rows are ordered by wind (low to high), then kd (low to high)
+    num_wind = 5
+    num_kd = 6
+
+    # the multi beam workbook sheets are ordered by kd (low to high), then wind (low to high)
+    num_multi_beam_kd = 5
+    num_fan_angles = 27
+
+    # the look up table pack (the index is the .json file of the same name)
+    pack_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lookup_tables", "subaqueous_luts.npy")
+
+    # {sensor name: {table name: ndarray}} of the tables read from the csv/xlsx files
+    tables = {}
+
+    # {sensor name: {"sources": {table name: path}, "stamps": {table name: dict}, "tables": {table name: ndarray}}},
+    # loaded on first use
+    pack = None
+
+    @classmethod
+    def get(cls, sensor_object):
+        """returns the look up tables of a sensor, from the look up table pack or reading them on first use
+
+        :param Sensor sensor_object: sensor
+        :return: dict {table name (e.g., 'vertical'): ndarray}
+        """
+
+        tables = cls.get_packed(sensor_object.name, sensor_object.sensor_config)
+        if tables is None:
+            tables = cls.tables.get(sensor_object.name)
+            if tables is None:
+                tables = cls.read(sensor_object.name, sensor_object.sensor_config)
+                cls.tables[sensor_object.name] = tables
+        return tables
+
+    @classmethod
+    def get_packed(cls, sensor_name, sensor_config):
+        """returns the look up tables of a sensor from the look up table pack
+
+        :param str sensor_name: name of the sensor in the sensor configuration
+        :param dict sensor_config: sensor configuration (see lidar_sensors.json)
+        :return: dict {table name (e.g., 'vertical'): ndarray}, or None if the pack is out of date for the sensor
+        """
+
+        if cls.pack is None:
+            cls.pack = cls.load_pack(cls.pack_file)
+
+        sources = {name: lut for name, lut in sensor_config[sensor_name]["subaqueous_LUTs"].items() if lut}
+        packed = cls.pack.get(sensor_name)
+        if packed is None or packed["sources"] != sources:
+            logger.subaqueous(
+                f"the look up tables of {sensor_name} aren't in the look up table pack, "
+                f"rebuild it with python Subaqueous.py"
+            )
+            return None
+
+        changed = [lut for name, lut in sources.items() if not cls.is_current(lut, packed["stamps"].get(name))]
+        if changed:
+            logger.subaqueous(
+                f"the look up tables {changed} of {sensor_name} changed since the look up table pack was built, "
+                f"rebuild it with python Subaqueous.py"
+            )
+            return None
+        return packed["tables"]
+
+    @staticmethod
+    def get_stamp(lut, with_hash=True):
+        """returns the size, modification time, and sha1 of a look up table file
+
+        :param str lut: path of the look up table
+        :param bool with_hash: if False, the sha1 isn't calculated
+        :return: dict {"size": int, "mtime_ns": int, "sha1": str}
+        """
+
+        stat = os.stat(lut)
+        stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if with_hash:
+            with open(lut, "rb") as f:
+                stamp["sha1"] = hashlib.sha1(f.read()).hexdigest()
+        return stamp
+
+    @classmethod
+    def is_current(cls, lut, stamp):
+        """checks that a look up table file is the one the look up table pack was built from
+
+        The size and modification time are compared first.  If only the
+        modification time differs (e.g., in a fresh checkout of the
+        repository), the sha1 of the file decides.
+
+        :param str lut: path of the look up table
+        :param dict stamp: the stamp of the file in the pack index (see get_stamp()), or None
+        :return: bool
+        """
+
+        if stamp is None or not os.path.isfile(lut):
+            return False
+        current = cls.get_stamp(lut, with_hash=False)
+        if current["size"] != stamp["size"]:
+            return False
+        if current["mtime_ns"] == stamp["mtime_ns"]:
+            return True
+        return cls.get_stamp(lut)["sha1"] == stamp["sha1"]
+
+    @classmethod
+    def read(cls, sensor_name, sensor_config):
+        """reads the look up tables of a sensor
+
+        :param str sensor_name: name of the sensor in the sensor configuration
+        :param dict sensor_config: sensor configuration (see lidar_sensors.json)
+        :return: dict {table name (e.g., 'vertical'): ndarray}
+        """
+
+        sensor_type = sensor_config[sensor_name]["sensor_model"]["type"]
+        tables = {}
+        for name, lut in sensor_config[sensor_name]["subaqueous_LUTs"].items():
+            if not lut:  # i.e., multi beam sensors have no range bias table
+                continue
+            if sensor_type == "multi":
+                tables[name] = cls.read_multi_beam_lut(lut)
+            else:
+                tables[name] = cls.read_lut(lut)
+
+        cls.validate(sensor_name, sensor_type, tables)
+        logger.subaqueous(f"read {len(tables)} look up tables of {sensor_name}")
+        return tables
+
+    @classmethod
+    def validate(cls, sensor_name, sensor_type, tables):
+        """checks that the look up tables of a sensor cover every wind and kd combination
+
+        :param str sensor_name: name of the sensor
+        :param str sensor_type: "single", "single_hawkeye", or "multi"
+        :param dict tables: {table name (e.g., 'vertical'): ndarray}
+        :return: None
+        """
+
+        for name, coeffs in tables.items():
+            if sensor_type == "multi":
+                shape = (cls.num_wind, cls.num_multi_beam_kd, 2, cls.num_fan_angles)
+            elif name.startswith("range_bias"):
+                shape = (cls.num_wind, cls.num_kd, 4)
+            else:
+                shape = (cls.num_wind, cls.num_kd, 2)
+
+            if coeffs.shape != shape:
+                raise ValueError(f"{sensor_name} {name} look up table has shape {coeffs.shape}, instead of {shape}")
+            if not np.all(np.isfinite(coeffs)):
+                wind_kd = sorted({tuple(i[:2]) for i in np.argwhere(~np.isfinite(coeffs)).tolist()})
+                raise ValueError(f"{sensor_name} {name} look up table has no coefficients for (wind, kd) {wind_kd}")
+
+    @classmethod
+    def load_pack(cls, pack_file):
+        """memory-maps and validates a look up table pack
+
+        :param str pack_file: path of the look up table pack (.npy)
+        :return: dict {sensor name: {"sources": {table name: path}, "stamps": {table name: dict},
+                 "tables": {table name: ndarray}}}
+        """
+
+        index_file = os.path.splitext(pack_file)[0] + ".json"
+        if not (os.path.isfile(pack_file) and os.path.isfile(index_file)):
+            logger.subaqueous(f"{pack_file} doesn't exist, the look up tables are read from their csv/xlsx files")
+            return {}
+
+        with open(index_file) as f:
+            index = json.load(f)
+        data = np.asarray(np.load(pack_file, mmap_mode="r"))
+
+        pack = {}
+        for sensor_name, sensor in index["sensors"].items():
+            tables = {}
+            for name, entry in sensor["tables"].items():
+                start = entry["offset"]
+                stop = start + int(np.prod(entry["shape"]))
+                if stop > data.size:
+                    raise ValueError(f"{pack_file} is truncated, {sensor_name} {name} look up table is missing")
+                tables[name] = data[start:stop].reshape(entry["shape"])
+            cls.validate(sensor_name, sensor["type"], tables)
+            pack[sensor_name] = {
+                "sources": {name: entry["source"] for name, entry in sensor["tables"].items()},
+                "stamps": {name: entry.get("stamp") for name, entry in sensor["tables"].items()},
+                "tables": tables,
+            }
+
+        logger.subaqueous(f"loaded the look up tables of {len(pack)} sensors from {pack_file}")
+        return pack
+
+    @classmethod
+    def build_pack(cls, sensor_config, pack_file):
+        """compiles the look up tables of all the sensors into a look up table pack
+
+        :param dict sensor_config: sensor configuration (see lidar_sensors.json)
+        :param str pack_file: path of the look up table pack (.npy)
+        :return: None
+        """
+
+        chunks = []
+        offsets = {}  # {source: offset}, the sensors that share a look up table share its coefficients
+        stamps = {}  # {source: stamp}
+        offset = 0
+        sensors = {}
+        for sensor_name in sensor_config:
+            entries = {}
+            for name, coeffs in cls.read(sensor_name, sensor_config).items():
+                source = sensor_config[sensor_name]["subaqueous_LUTs"][name]
+                if source not in offsets:
+                    offsets[source] = offset
+                    stamps[source] = cls.get_stamp(source)
+                    chunks.append(coeffs.ravel())
+                    offset += coeffs.size
+                entries[name] = {
+                    "source": source,
+                    "stamp": stamps[source],
+                    "offset": offsets[source],
+                    "shape": list(coeffs.shape),
+                }
+            sensors[sensor_name] = {"type": sensor_config[sensor_name]["sensor_model"]["type"], "tables": entries}
+
+        np.save(pack_file, np.concatenate(chunks))
+        with open(os.path.splitext(pack_file)[0] + ".json", "w") as f:
+            json.dump({"sensors": sensors}, f, indent=4)
+        logger.subaqueous(f"wrote the look up tables of {len(sensors)} sensors to {pack_file}")
+
+    @classmethod
+    def read_lut(cls, lut):
+        """reads a single beam look up table (csv)
+
+        :param str lut: path of the look up table
+        :return: ndarray (wind, kd, coefficient)
+        """
+
+        # Only grab the coefficient columns that exist in the csv file: columns a and b
+        # from the vertical and horizontal LUTs, and columns a, b, c, and d from the range bias LUT.
+        cols = {"a", "b", "c", "d"}
+        coeffs = pd.read_csv(lut, usecols=lambda i: i in cols).to_numpy(dtype=np.float64)
+
+        if coeffs.shape[0] != cls.num_wind * cls.num_kd:
+            raise ValueError(
+                f"{lut} has {coeffs.shape[0]} rows, instead of one per wind and kd ({cls.num_wind * cls.num_kd})"
+            )
+
+        return np.ascontiguousarray(coeffs.reshape(cls.num_wind, cls.num_kd, -1))
+
+    @classmethod
+    def read_multi_beam_lut(cls, lut):
+        """reads a multi beam look up table (xlsx, a sheet of fan angle coefficients per kd and wind)
+
+        :param str lut: path of the look up table
+        :return: ndarray (wind, kd, coefficient, fan angle)
+        """
+
+        sheets = list(pd.read_excel(lut, sheet_name=None, header=None).values())
+
+        if len(sheets) != cls.num_wind * cls.num_multi_beam_kd:
+            raise ValueError(
+                f"{lut} has {len(sheets)} sheets, instead of one per kd and wind ({cls.num_wind * cls.num_multi_beam_kd})"
+            )
+
+        coeffs = np.stack([sheet.to_numpy(dtype=np.float64).T for sheet in sheets])
+        coeffs = coeffs.reshape(cls.num_multi_beam_kd, cls.num_wind, *coeffs.shape[1:])
+
+        return np.ascontiguousarray(coeffs.swapaxes(0, 1))
+
+
 class Subaqueous:
     """Processing of the SubAqueous portion of LIDAR TopoBathymetric TPU.
     To be used in conjunction with the associated
@@ -59,6 +357,9 @@ class Subaqueous:
         # print(self.subaqueous_class_values)
         # self.subaqueous_class_values  = {40, 43, 46, 64}
 
+        #A boolean mask of the points with a subaqueous classification
+        self.subaqueous_mask = self.get_class_mask(classification, self.subaqueous_class_values)
+
         logger.subaqueous(f"kd_par {self.gui_object.kd_ind}")
         logger.subaqueous(f"wind_par {self.gui_object.wind_ind}")
         if(self.sensor_object.type == "single_hawkeye"):
@@ -70,6 +371,24 @@ class Subaqueous:
             logger.subaqueous(f"horizontal lut{self.sensor_object.horz_lut}")
             logger.subaqueous(f"range bias lut {self.sensor_object.range_bias_lut}")
 
+    @staticmethod
+    def get_class_mask(classification, class_values):
+        """Returns a boolean mask of the points whose classification is one of class_values.
+
+        The classification values (0-255 in las files) index a lookup table of
+        the class values, instead of each point being compared to the list.
+
+        :param ndarray classification: classification of each point
+        :param list[int] class_values: classification values to select
+        :return: boolean mask of the selected points
+        :rtype: ndarray
+        """
+        class_lut = np.zeros(256, dtype=bool)
+        class_lut[list(class_values)] = True
+
+        # the las classification (uint8, see Las.LasPoints) indexes the table without a copy
+        return class_lut[np.asarray(classification, dtype=np.uint8)]
+
     def fit_lut(self):
         """Called to begin the SubAqueous processing."""
     
@@ -80,10 +399,7 @@ class Subaqueous:
         fit_tvu, fit_thu, range_bias = self.model_process()
 
         # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
-        a_rb = range_bias["a"]
-        b_rb = range_bias["b"]
-        c_rb = range_bias["c"]
-        d_rb = range_bias["d"]
+        a_rb, b_rb, c_rb, d_rb = range_bias
 
         # print(f"a_rb: {a_rb}, b_rb: {b_rb}, c_rb: {c_rb}, d_rb: {d_rb}")
         # print(self.depth)
@@ -94,8 +410,7 @@ class Subaqueous:
 
         # a_z := vertical a coefficient
         # b_z := vertical b coefficient
-        a_z = fit_tvu["a"]
-        b_z = fit_tvu["b"]
+        a_z, b_z = fit_tvu
         # TVU is an IHO fit: (a^2+(b*x)^2)^0.5
         res_tvu =  np.sqrt(np.square(a_z) + np.square(b_z * self.depth))
 
@@ -104,20 +419,16 @@ class Subaqueous:
 
         # a_h := horizontal coefficient
         # b_h := horizontal offset
-        a_h = fit_thu["a"]
-        b_h = fit_thu["b"]
+        a_h, b_h = fit_thu
         # THU is a Linear fit: a + b*x 
         res_thu = (a_h + b_h * self.depth)
 
         # Check classification values.
-        for i, classification in enumerate(self.classification):
-            # If the point is not subaqueous, set range bias and subaqueous THU and TVU values to 0.
-            if classification not in self.gui_object.subaqueous_classes:
-                res_thu[i] = 0
-                res_tvu[i] = 0
-                res_range_bias[i] = 0
-            # else:
-            #     print(f"subaqueous tvu[{i}]: {res_tvu[i]}")
+        # If the point is not subaqueous, set range bias and subaqueous THU and TVU values to 0.
+        not_subaqueous = ~self.subaqueous_mask
+        res_thu[not_subaqueous] = 0
+        res_tvu[not_subaqueous] = 0
+        res_range_bias[not_subaqueous] = 0
 
 
         return res_tvu, res_thu, res_range_bias
@@ -128,7 +439,7 @@ class Subaqueous:
             given permutations of wind and kd. 
 
         :return: (tvu, thu, range_bias) TVU, THU, and range bias observation equation coefficients.
-        :rtype: (DataFrame, DataFrame, DataFrame)
+        :rtype: (ndarray, ndarray, ndarray)
         """
         # wind_par values range from 0-20 kts, represented as integers 0-4.
         # cBLUE gives users five options for Wind Speed:
@@ -157,23 +468,19 @@ class Subaqueous:
         #     row 1 represents wind speed index 0 "Calm-light air" and kd index 1 "Clear-Moderate", 
         #     [...], row 29 represents wind speed index 4 "Fresh Breeze" and kd index 5 "Very Turbid".
 
-        index = 5*self.gui_object.wind_ind + 1*self.gui_object.wind_ind + self.gui_object.kd_ind
-
-        # Columns to grab from the LUTs. 
-        # Get columns a, b from vert and horz LUTs. 
-        # Get columns a, b, c, d from range bias LUT. 
-        cols = ['a', 'b', 'c', 'd']
-        # Read look up tables, select rows
-        # The lambda statement will only grab columns that exist in the csv file. That way we can get columns a and b
-        # from the vertical and horizontal LUTs, and columns a, b, c, and d from the range bias LUT. 
+        # The look up tables are indexed by wind and kd (see LookupTables).
+        index = (self.gui_object.wind_ind, self.gui_object.kd_ind)
 
-        tvu = pd.read_csv(self.sensor_object.vert_lut, usecols=lambda i: i in set(cols)).iloc[index]
-        thu = pd.read_csv(self.sensor_object.horz_lut, usecols=lambda i: i in set(cols)).iloc[index]
-        range_bias = pd.read_csv(self.sensor_object.range_bias_lut, usecols=lambda i: i in set(cols)).iloc[index]
+        # Get the look up tables of the sensor, select rows
+        # Columns a, b from the vert and horz LUTs, and columns a, b, c, d from the range bias LUT.
+        luts = self.sensor_object.subaqueous_luts
+        tvu = luts["vertical"][index]
+        thu = luts["horizontal"][index]
+        range_bias = luts["range_bias"][index]
 
         # print(f"tvu: {tvu}\nthu: {thu}\nrange_bias: {range_bias}")
 
-        # Return averaged TVU and THU observation equation coefficient DataFrames. 
+        # Return TVU, THU, and range bias observation equation coefficients.
         return tvu, thu, range_bias
     
     def multi_beam_fit_lut(self, masked_fan_angle):
@@ -187,71 +494,53 @@ class Subaqueous:
 
         # a_h := horizontal linear coeffs
         # b_h := horizontal linear offsets
-        a_h = fit_thu["a"].to_numpy()
-        b_h = fit_thu["b"].to_numpy()
+        # Contiguous arrays of the coefficients and offsets, indexed by fan angle
+        a_h, b_h = fit_thu
 
         # a_z := vertical linear coeffs
         # b_z := vertical linear offsets
-        a_z = fit_tvu["a"].to_numpy()
-        b_z = fit_tvu["b"].to_numpy()
+        a_z, b_z = fit_tvu
 
         # logger.subaqueous(f"Horizontal coefficents: {a_h}")
         # logger.subaqueous(f"Horizontal offsets: {b_h}")
         # logger.subaqueous(f"Vertical coefficents: {a_z}")
         # logger.subaqueous(f"Vertical offsets: {b_z}")
 
-        res_thu = []
-        res_tvu = []
+        # If the point is not subaqueous, the subaqueous THU and TVU values are 0.
+        res_thu = np.zeros(len(self.depth))
+        res_tvu = np.zeros(len(self.depth))
 
-        #Loop through the depth and the masked fan angle
-        for depth_point, fan_angle_point, class_point in zip(self.depth, masked_fan_angle, self.classification):
-            
-            # Check classification values.
-            # If the point is not subaqueous, set subaqueous THU and TVU values to 0.
-            if class_point not in self.gui_object.subaqueous_classes:
-                # print(f'Not Subaqueous Class: {self.classification[i]}')
-                res_tvu.append(0)
-                res_thu.append(0)
+        # Only the subaqueous points are looked up
+        depth = np.asarray(self.depth)[self.subaqueous_mask]
+        fan_angle = np.asarray(masked_fan_angle)[self.subaqueous_mask]
 
-            # If the point is subaqueous, calculate THU and TVU values. 
-            else:
-     
-                # print(f'Subaqueous Class: {self.classification[i]}')
-                # Use the fan angle at this point an an index to get the
-                #  horizontal coefficent and offset for this depth point
-                a_h_point = a_h[fan_angle_point]
-                b_h_point = b_h[fan_angle_point]
-
-                # Product of coeffs w/ depths + offsets
-                thu_point = a_h_point * depth_point + b_h_point
-
-                #Add the subaqueous thu at this point to the list of result thu values
-                res_thu.append(thu_point)
+        # The fan angles index the rows of the look up tables
+        num_fan_angles = min(len(a_h), len(a_z))
+        if fan_angle.size and (fan_angle.min() < 0 or fan_angle.max() >= num_fan_angles):
+            raise ValueError(
+                f"Subaqueous fan angles range from {fan_angle.min()} to {fan_angle.max()} degrees, "
+                f"but the multi beam look up tables only cover 0 to {num_fan_angles - 1} degrees."
+            )
 
-                #Use the fan angle at this point an an index to get the
-                #  vertical coefficent and offset for this depth point
-                a_z_point = a_z[fan_angle_point]
-                b_z_point = b_z[fan_angle_point]
+        # Product of coeffs w/ depths + offsets, using the fan angle at each point
+        #  to get the horizontal and vertical coefficent and offset for this depth point
+        res_thu[self.subaqueous_mask] = a_h[fan_angle] * depth + b_h[fan_angle]
 
-                # Product of coeffs w/ depths + offsets
-                tvu_point = a_z_point * depth_point + b_z_point
+        tvu = a_z[fan_angle] * depth + b_z[fan_angle]
 
-                # enforce minimum value for tvu
-                if(tvu_point < min_tvu):
-                    tvu_point = min_tvu
-
-                #Add the subaqueous tvu at this point to the list of result thu values
-                res_tvu.append(tvu_point)
+        # enforce minimum value for tvu
+        np.maximum(tvu, min_tvu, out=tvu)
+        res_tvu[self.subaqueous_mask] = tvu
 
-        return np.asarray(res_tvu), np.asarray(res_thu)
+        return res_tvu, res_thu
     
     def multi_beam_model_process(self):
         """Retrieves the page of TVU and THU observation equation coefficients for all fan angles for the given combination
             of wind and kd. TVU and THU observation equation coefficients are based on the linear regression of 
             precalculated uncertainties from Monte Carlo simulations  
 
-        :return: (fit_tvu, fit_thu) TVU and THU observation equation coefficients for each fan angle.
-        :rtype: (DataFrame, DataFrame)
+        :return: (fit_tvu, fit_thu) TVU and THU observation equation coefficients (rows a, b) for each fan angle.
+        :rtype: (ndarray, ndarray)
         """
 
         # kd_ind are index values that range from 0-4 and represent the user's selection for Turbidity.
@@ -282,20 +571,18 @@ class Subaqueous:
         if wind_ind == 5:
             wind_ind = 4  
 
-        # Get the sheet number for this combination of wind_ind and kd_ind. 
-        sheet = (5 * self.gui_object.kd_ind) + wind_ind
-
+        # The sheets are indexed by wind_ind and kd_ind in the look up tables (see LookupTables).
         logger.subaqueous(f"kd_ind: {self.gui_object.kd_ind}, wind_ind: {self.gui_object.wind_ind}")
-        logger.subaqueous(f"Multi beam look up table sheet number: {sheet}")
 
-        # Read look up tables, select rows
-        fit_tvu = pd.read_excel(self.sensor_object.vert_lut, sheet_name=sheet, header=None, names=["a", "b"])
-        fit_thu = pd.read_excel(self.sensor_object.horz_lut, sheet_name=sheet, header=None, names=["a", "b"])
+        # Get the look up tables of the sensor, select the sheets
+        luts = self.sensor_object.subaqueous_luts
+        fit_tvu = luts["vertical"][wind_ind, self.gui_object.kd_ind]
+        fit_thu = luts["horizontal"][wind_ind, self.gui_object.kd_ind]
 
         # logger.subaqueous(f"Multi beam fit_tvu: {fit_tvu}")
         # logger.subaqueous(f"Multi beam fit_thu: {fit_thu}")
 
-        # Return DataFrames of TVU and THU observation equation coefficients for each fan angle. 
+        # Return TVU and THU observation equation coefficients for each fan angle.
         return fit_tvu, fit_thu
 
     
@@ -312,146 +599,100 @@ class Subaqueous:
         # a_z := vertical a coefficient
         # b_z := vertical b coefficient
 
-        a_z_narrow = tvu_deep_narrow["a"]
-        b_z_narrow = tvu_deep_narrow["b"]
-
-        a_z_wide = tvu_deep_wide["a"]
-        b_z_wide = tvu_deep_wide["b"]                                                             
-
-        a_z_shallow = tvu_shallow["a"]
-        b_z_shallow = tvu_shallow["b"]
+        a_z_narrow, b_z_narrow = tvu_deep_narrow
+        a_z_wide, b_z_wide = tvu_deep_wide
+        a_z_shallow, b_z_shallow = tvu_shallow
 
         # THU is a Linear fit: b + a*x 
         # a_h := horizontal coefficient
         # b_h := horizontal offset
-        a_h_narrow = thu_deep_narrow["a"]
-        b_h_narrow = thu_deep_narrow["b"]
-
-        a_h_wide = thu_deep_wide["a"]
-        b_h_wide = thu_deep_wide["b"]
-
-        a_h_shallow = thu_shallow["a"]
-        b_h_shallow = thu_shallow["b"]
+        a_h_narrow, b_h_narrow = thu_deep_narrow
+        a_h_wide, b_h_wide = thu_deep_wide
+        a_h_shallow, b_h_shallow = thu_shallow
 
         # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
-        a_rb_narrow = range_bias_narrow["a"]
-        b_rb_narrow = range_bias_narrow["b"]
-        c_rb_narrow = range_bias_narrow["c"]
-        d_rb_narrow = range_bias_narrow["d"]
-
-        a_rb_wide = range_bias_wide["a"]
-        b_rb_wide = range_bias_wide["b"]
-        c_rb_wide = range_bias_wide["c"]
-        d_rb_wide = range_bias_wide["d"]
-
-        a_rb_shallow = range_bias_shallow["a"]
-        b_rb_shallow = range_bias_shallow["b"]
-        c_rb_shallow = range_bias_shallow["c"]
-        d_rb_shallow = range_bias_shallow["d"]
-
-        res_thu = []
-        res_tvu = []
-        res_range_bias = []
-        
-        # print(f"length of masked_hawkeye_data (scanner channel): {len(masked_hawkeye_data[0])}"
-        #       f"\nlength of depth: {len(self.depth)}"
-        #       f"\nlength of classification: {len(self.classification)}") 
+        a_rb_narrow, b_rb_narrow, c_rb_narrow, d_rb_narrow = range_bias_narrow
+        a_rb_wide, b_rb_wide, c_rb_wide, d_rb_wide = range_bias_wide
+        a_rb_shallow, b_rb_shallow, c_rb_shallow, d_rb_shallow = range_bias_shallow
+
+        # Coefficients and offsets of each channel, in the order of the channel
+        # index returned by get_hawkeye_channel_index()
+        channel_coeffs = [
+            None,  # topographic (or not subaqueous)
+            (a_h_shallow, b_h_shallow, a_z_shallow, b_z_shallow, a_rb_shallow, b_rb_shallow, c_rb_shallow, d_rb_shallow),
+            (a_h_wide, b_h_wide, a_z_wide, b_z_wide, a_rb_wide, b_rb_wide, c_rb_wide, d_rb_wide),
+            (a_h_narrow, b_h_narrow, a_z_narrow, b_z_narrow, a_rb_narrow, b_rb_narrow, c_rb_narrow, d_rb_narrow),
+        ]
+
+        # If the point is not subaqueous, or is topographic scanner data,
+        # its subaqueous THU, TVU, and range bias values are 0.
+        depth = np.asarray(self.depth)
+        res_thu = np.zeros(len(depth))
+        res_tvu = np.zeros(len(depth))
+        res_range_bias = np.zeros(len(depth))
+
+        channel_index = self.get_hawkeye_channel_index(masked_hawkeye_data)
 
         # Product of coeffs w/ depths + offsets.
-        # Loop through the depth, scanner channel, and user data
-        for depth_point, scanner_channel, user_data, class_point in zip(self.depth, masked_hawkeye_data[0], masked_hawkeye_data[1], self.classification):
-            # print(f"depth_point: {depth_point}, scanner: {scanner_channel}, user: {user_data}, class_point: {class_point}")
-
-            
-            # Check classification values.
-            # If the point is not subaqueous, set subaqueous THU and TVU values to 0.
-            if class_point not in self.gui_object.subaqueous_classes:
-                # print(f'Not Subaqueous Class: {class_point}')
-                res_tvu.append(0)
-                res_thu.append(0)
-                res_range_bias.append(0)
-            else:
+        # Each channel's polynomials are evaluated once over the points of the channel.
+        for channel, coeffs in enumerate(channel_coeffs):
+            if coeffs is None:
+                continue
+            a_h, b_h, a_z, b_z, a_rb, b_rb, c_rb, d_rb = coeffs
+
+            select = channel_index == channel
+            depth_point = depth[select]
+
+            # THU is a Linear fit: a + b*x
+            res_thu[select] = a_h + (b_h * depth_point)
+            # TVU is an IHO fit: (a^2+(b*x)^2)^0.5
+            bx_z = b_z * depth_point
+            tvu_point = np.sqrt((a_z * a_z) + (bx_z * bx_z))
+            # enforce minimum value for tvu
+            np.maximum(tvu_point, min_tvu, out=tvu_point)
+            res_tvu[select] = tvu_point
+            # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
+            depth_square = depth_point * depth_point
+            res_range_bias[select] = a_rb * (depth_point * depth_square) + b_rb * depth_square + c_rb * depth_point + d_rb
+
+        return res_tvu, res_thu, res_range_bias
+
+    def get_hawkeye_channel_index(self, masked_hawkeye_data):
+        """Returns the index of the coefficient set of each HawkEye point.
 
-                # Topographic scanner, only one channel exists
-                # Scanner Channel: 1, User data: 0
-
-                # Shallow scanner, only one channel exists 
-                # Scanner channel: 2, User data: 0
-
-                # Deep scanner, narrow channel
-                # Scanner channel: 3, User data: 0
-
-                # Deep scanner, combined channel (wide)
-                # Scanner channel: 3, User data: 1
-
-                # scanner_channel = masked scanner_channel, 
-                # user_data = masked user_data
-                
-                # If Scanner Channel = 1, then this is topographic scanner data. 
-                # There is no subaqueous uncertainty.
-                if(scanner_channel == 1):
-                    thu_point = 0
-                    tvu_point = 0
-                    range_bias_point = 0
-                # If Scanner Channel = 2 and User Data = 0, then this is the shallow scanner
-                # Use the shallow uncertainty coefficients and offset. 
-                elif(scanner_channel == 2 and user_data == 0):
-                    # THU is a Linear fit: a + b*x 
-                    thu_point = a_h_shallow + (b_h_shallow * depth_point) 
-                    # TVU is an IHO fit: (a^2+(b*x)^2)^0.5
-                    bx_h_shallow = (b_z_shallow * depth_point)
-                    tvu_point = sqrt((a_z_shallow*a_z_shallow) + (bx_h_shallow*bx_h_shallow))
-                    # enforce minimum value for tvu
-                    if(tvu_point < min_tvu):
-                        tvu_point = min_tvu
-                    # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
-                    depth_square = depth_point * depth_point
-                    range_bias_point = a_rb_shallow * (depth_point*depth_square) + b_rb_shallow*depth_square + c_rb_shallow*depth_point + d_rb_shallow
-                # If Scanner Channel = 3 and User Data = 1, then this is the deep scanner, combined channel
-                # Use the deep wide uncertainty coefficients and offset. 
-                elif(scanner_channel == 3 and user_data == 1):
-                    # THU is a Linear fit: a + b*x 
-                    thu_point = a_h_wide + (b_h_wide * depth_point) 
-                    # TVU is an IHO fit: (a^2+(b*x)^2)^0.5
-                    bx_h_wide = (b_z_wide * depth_point)
-                    tvu_point = sqrt((a_z_wide*a_z_wide) + (bx_h_wide*bx_h_wide))
-                    # enforce minimum value for tvu
-                    if(tvu_point < min_tvu):
-                        tvu_point = min_tvu
-                    # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
-                    depth_square = depth_point * depth_point
-                    range_bias_point = a_rb_wide * (depth_point*depth_square) + b_rb_wide*depth_square + c_rb_wide*depth_point + d_rb_wide
-                # If Scanner Channel = 3 and User Data = 0, then this is the deep scanner, narrow channel
-                # Use the deep narrow uncertainty coefficients and offset. 
-                else:   
-                    # THU is a Linear fit: a + b*x
-                    thu_point = (a_h_narrow + (b_h_narrow * depth_point))
-                    # TVU is an IHO fit: (a^2+(b*x)^2)^0.5
-                    bx_h_narrow = (b_z_narrow * depth_point)
-                    tvu_point = sqrt((a_z_narrow*a_z_narrow) + (bx_h_narrow*bx_h_narrow))
-                    # enforce minimum value for tvu
-                    if(tvu_point < min_tvu):
-                        tvu_point = min_tvu
-                    # Range Bias Uncertainty is a 3rd order polynomial fit: ax^3 + bx^2 + cx + d
-                    depth_square = depth_point * depth_point
-                    range_bias_point = a_rb_narrow*(depth_point*depth_square) + b_rb_narrow*depth_square + c_rb_narrow*depth_point + d_rb_narrow
-
-                #Add the subaqueous thu at this point to the list of result thu values
-                res_thu.append(thu_point)
-                #Add the subaqueous tvu at this point to the list of result tvu values
-                res_tvu.append(tvu_point)
-                #Add the range bias uncertainty at this point to the list of result range bias values
-                res_range_bias.append(range_bias_point)
-
-        return np.asarray(res_tvu), np.asarray(res_thu), np.asarray(res_range_bias)
+        =====   =========================   ===============   =========
+        index   coefficients                scanner channel   user data
+        =====   =========================   ===============   =========
+        0       none (topographic)          1                 any
+        1       shallow                     2                 0
+        2       deep, combined (wide)       3                 1
+        3       deep, narrow                other             other
+        =====   =========================   ===============   =========
+
+        Points that are not subaqueous have index 0.
+
+        :param masked_hawkeye_data: scanner channel and user data of each point (two arrays, or a 2xN array)
+        :return: coefficient set index of each point
+        :rtype: ndarray
+        """
+        scanner_channel = np.asarray(masked_hawkeye_data[0])
+        user_data = np.asarray(masked_hawkeye_data[1])
+
+        channel_index = np.full(len(self.depth), 3, dtype=np.int8)
+        channel_index[(scanner_channel == 3) & (user_data == 1)] = 2
+        channel_index[(scanner_channel == 2) & (user_data == 0)] = 1
+        channel_index[scanner_channel == 1] = 0
+        channel_index[~self.subaqueous_mask] = 0
+
+        return channel_index
 
     def hawkeye_model_process(self):
         """Retrieves the TVU, THU, and range uncertainty observation equation coefficients and offsets based 
             on the polynomial regression of precalculated uncertainties from Monte Carlo simulations for all 
             given permutations of wind and kd. 
 
-        :return: (tvu_deep_narrow, thu_deep_narrow, tvu_deep_wide, thu_deep_wide, tvu_shallow, thu_shallow, range_bias ) TVU, THU, and range bias observation equation coefficients.
-        :rtype: (DataFrame, DataFrame, DataFrame, DataFrame, DataFrame, DataFrame, DataFrame)
+        :return: (tvu_deep_narrow, thu_deep_narrow, range_bias_narrow, tvu_deep_wide, thu_deep_wide, range_bias_wide, tvu_shallow, thu_shallow, range_bias_shallow) TVU, THU, and range bias observation equation coefficients.
+        :rtype: (ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray)
         """
         # wind_par values range from 0-20 kts, represented as integers 0-4.
         # cBLUE gives users five options for Wind Speed:
@@ -479,30 +720,36 @@ class Subaqueous:
         #     row 1 represents wind speed index 0 "Calm-light air" and kd index 1 "Clear-Moderate", 
         #     [...], row 29 represents wind speed index 4 "Fresh Breeze" and kd index 5 "Very Turbid".
 
-        index = 5*self.gui_object.wind_ind + 1*self.gui_object.wind_ind + self.gui_object.kd_ind
-
-        # Columns to grab from the LUTs. 
-        # Get columns a, b from vert and horz LUTs. 
-        # Get columns a, b, c, d from range bias LUT. 
-        cols = ['a', 'b', 'c', 'd']
-        # Read look up tables, select rows
-        # The lambda statement will only grab columns that exist in the csv file. That way we can get columns a and b
-        # from the vertical and horizontal LUTs, and columns a, b, c, and d from the range bias LUT. 
-        tvu_deep_narrow = pd.read_csv(self.sensor_object.vert_lut_deep_narrow, usecols=lambda i: i in set(cols)).iloc[index]
-        thu_deep_narrow = pd.read_csv(self.sensor_object.horz_lut_deep_narrow, usecols=lambda i: i in set(cols)).iloc[index]
-        range_bias_narrow = pd.read_csv(self.sensor_object.range_bias_lut_narrow, usecols=lambda i: i in set(cols)).iloc[index]
-        tvu_deep_wide = pd.read_csv(self.sensor_object.vert_lut_deep_wide, usecols=lambda i: i in set(cols)).iloc[index]
-        thu_deep_wide = pd.read_csv(self.sensor_object.horz_lut_deep_wide, usecols=lambda i: i in set(cols)).iloc[index]
-        range_bias_wide = pd.read_csv(self.sensor_object.range_bias_lut_wide, usecols=lambda i: i in set(cols)).iloc[index]
-        tvu_shallow = pd.read_csv(self.sensor_object.vert_lut_shallow, usecols=lambda i: i in set(cols)).iloc[index]
-        thu_shallow = pd.read_csv(self.sensor_object.horz_lut_shallow, usecols=lambda i: i in set(cols)).iloc[index]
-        range_bias_shallow = pd.read_csv(self.sensor_object.range_bias_lut_shallow, usecols=lambda i: i in set(cols)).iloc[index]
+        # The look up tables are indexed by wind and kd (see LookupTables).
+        index = (self.gui_object.wind_ind, self.gui_object.kd_ind)
+
+        # Get the look up tables of the sensor, select rows
+        # Columns a, b from the vert and horz LUTs, and columns a, b, c, d from the range bias LUTs.
+        luts = self.sensor_object.subaqueous_luts
+        tvu_deep_narrow = luts["vertical_deep_narrow"][index]
+        thu_deep_narrow = luts["horizontal_deep_narrow"][index]
+        range_bias_narrow = luts["range_bias_deep_narrow"][index]
+        tvu_deep_wide = luts["vertical_deep_wide"][index]
+        thu_deep_wide = luts["horizontal_deep_wide"][index]
+        range_bias_wide = luts["range_bias_deep_wide"][index]
+        tvu_shallow = luts["vertical_shallow"][index]
+        thu_shallow = luts["horizontal_shallow"][index]
+        range_bias_shallow = luts["range_bias_shallow"][index]
 
         # print(f"TVU Deep Narrow: {tvu_deep_narrow} and THU Deep Narrow: {thu_deep_narrow}")
         # print(f"TVU Deep Wide: {tvu_deep_wide} and THU Deep Wide: {thu_deep_wide}")
         # print(f"TVU Shallow: {tvu_shallow} and THU Shallow: {thu_shallow}")
         # print(f"Range Bias Uncertainty: {range_bias}")
 
-        # Return averaged TVU and THU observation equation coefficient DataFrames. 
+        # Return TVU, THU, and range bias observation equation coefficients.
         return tvu_deep_narrow, thu_deep_narrow, range_bias_narrow, tvu_deep_wide, thu_deep_wide, range_bias_wide, tvu_shallow, thu_shallow, range_bias_shallow
-    
\ No newline at end of file
+    
+
+
+if __name__ == "__main__":
+    # Compile the look up tables of lidar_sensors.json into the look up table pack
+    import utils
+
+    utils.CustomLogger()
+    with open("lidar_sensors.json") as sensor_file:
+        LookupTables.build_pack(json.load(sensor_file), LookupTables.pack_file)
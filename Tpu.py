@@ -36,19 +36,85 @@ May 12th, 2026
 import logging
 from pathos import logger
 import pathos.pools as pp
+import contextlib
+import copy
 import json
 import os
+import tempfile
 import laspy
 import numpy as np
 import pandas as pd
 import progressbar
 from tqdm import tqdm
-from Subaerial import Subaerial
+import time
+import dill
+from Subaerial import Subaerial, PolySurfFit, SensorModel, Jacobian
 from Subaqueous import Subaqueous
-from Las import Las
+from Las import Las, LasChunk, LasPoints
+from Sbet import Sbet
+from Merge import Merge
 
 logger = logging.getLogger(__name__)
 
+# objects of a TPU worker process that are built once, by init_worker(),
+# rather than sent to the worker with each task
+_worker_state = {}
+
+
+def init_worker(tpu, shared_sbet=None):
+    """initializes a TPU worker process of the multiprocessing pool
+
+    The Tpu object is sent to the worker once, the sensor model and its
+    (lambdified) Jacobian and the Merge object are built once per worker,
+    and the shared trajectory is attached once.  The functions mapped over
+    the tasks (see calc_tpu_task()) are module-level functions that use
+    this state, so a task only carries the las file path of a tile (or the
+    rows of a flight line block), rather than a pickled copy of the Tpu
+    object bound to a method.
+
+    :param Tpu tpu: the Tpu object of the main process
+    :param SharedSbet shared_sbet: the trajectory shared by Sbet.share_data()
+    :return: None
+    """
+
+    tic = time.perf_counter()
+    gui_object = tpu.gui_object
+    _worker_state["tpu"] = tpu
+    _worker_state["sbet"] = shared_sbet
+    _worker_state["jacobian"] = Jacobian(
+        SensorModel(tpu.sensor_object.name, gui_object.subaerial_backend), gui_object.subaerial_kernel
+    )
+    _worker_state["merge"] = Merge(tpu.sensor_object)
+    logger.tpu(
+        "worker {} initialized in {:.2f} sec".format(os.getpid(), time.perf_counter() - tic)
+    )
+
+
+def calc_tpu_task(las_file):
+    """calculates the tpu of a las tile in a worker process (see Tpu.run_tpu_multiprocess())
+
+    :param str las_file: las file path
+    :return: (int, float) process id and seconds
+    """
+
+    tic = time.perf_counter()
+    _worker_state["tpu"].calc_tpu(
+        (_worker_state["sbet"], las_file, _worker_state["jacobian"], _worker_state["merge"])
+    )
+    return os.getpid(), time.perf_counter() - tic
+
+
+def fit_fl_block_task(task):
+    """see Tpu.fit_fl_block()"""
+
+    return _worker_state["tpu"].fit_fl_block(task)
+
+
+def calc_fl_block_tpu_task(task):
+    """see Tpu.calc_fl_block_tpu()"""
+
+    return _worker_state["tpu"].calc_fl_block_tpu(task)
+
 
 class Tpu:
     """
@@ -78,6 +144,10 @@ class Tpu:
         self.metadata = {}
         self.flight_line_stats = {}
 
+        # offset converting the las timestamps of the current tile to the time base of
+        # the trajectory, resolved for each tile once it is decoded (see get_tile_sbet)
+        self.las_time_offset = 0.0
+
     def update_fl_stats(self, fl, num_fl_points, fl_tpu_data):
 
         # calc flight line tpu summary stats
@@ -87,6 +157,61 @@ class Tpu:
         fl_tpu_mean = fl_tpu_data[:, 0:6].mean(axis=0).tolist()
         fl_tpu_stddev = fl_tpu_data[:, 0:6].std(axis=0).tolist()
 
+        self.set_fl_stats(
+            fl, num_fl_points, fl_tpu_count, fl_tpu_min, fl_tpu_max, fl_tpu_mean, fl_tpu_stddev
+        )
+
+    @staticmethod
+    def add_fl_tpu_sums(fl_tpu_sums, fl, fl_tpu_data):
+        """adds a chunk of flight line tpu data to the running summary sums
+
+        Used by the chunked mode, in which the tpu of a flight line is never
+        held in memory all at once.
+
+        :param dict fl_tpu_sums: running sums of each flight line
+        :param fl: flight line id
+        :param ndarray fl_tpu_data: total_thu, total_tvu, and index of a chunk of the flight line
+        :return: None
+        """
+
+        tpu = fl_tpu_data[:, 0:2]
+
+        if fl not in fl_tpu_sums:
+            fl_tpu_sums[fl] = {
+                "count": 0,
+                "min": np.full(2, np.inf),
+                "max": np.full(2, -np.inf),
+                "sum": np.zeros(2),
+                "sum_sq": np.zeros(2),
+            }
+
+        sums = fl_tpu_sums[fl]
+        sums["count"] += tpu.shape[0]
+        sums["min"] = np.minimum(sums["min"], tpu.min(axis=0))
+        sums["max"] = np.maximum(sums["max"], tpu.max(axis=0))
+        sums["sum"] += tpu.sum(axis=0)
+        sums["sum_sq"] += (tpu**2).sum(axis=0)
+
+    def update_fl_stats_from_sums(self, fl, num_fl_points, sums):
+
+        # calc flight line tpu summary stats from the running sums (chunked mode)
+        fl_tpu_mean = sums["sum"] / sums["count"]
+        fl_tpu_stddev = np.sqrt(np.maximum(sums["sum_sq"] / sums["count"] - fl_tpu_mean**2, 0))
+
+        self.set_fl_stats(
+            fl,
+            num_fl_points,
+            sums["count"],
+            sums["min"].tolist(),
+            sums["max"].tolist(),
+            fl_tpu_mean.tolist(),
+            fl_tpu_stddev.tolist(),
+        )
+
+    def set_fl_stats(
+        self, fl, num_fl_points, fl_tpu_count, fl_tpu_min, fl_tpu_max, fl_tpu_mean, fl_tpu_stddev
+    ):
+
         fl_stat_indx = {
             "total_thu": 0,
             "total_tvu": 1,
@@ -109,15 +234,42 @@ class Tpu:
         fl_header_str = f"{fl} ({fl_tpu_count}/{num_fl_points} points with TPU)"
         self.flight_line_stats.update({fl_header_str: fl_stats_strs})
 
+    def set_fl_not_merged(self, fl, num_fl_points, merge):
+
+        logger.warning(
+            "SBET and LAS not merged because max delta "
+            "time exceeded acceptable threshold of {} "
+            "sec(s) (las time offset {} sec).".format(merge.max_allowable_dt, self.las_time_offset)
+        )
+
+        self.flight_line_stats.update(
+            {"{} (0/{} points with TPU)".format(fl, num_fl_points): None}
+        )
+
     def calc_tpu(self, sbet_las_files):
         """
 
-        :param sbet_las_tile: generator yielding sbet data and las tile name for each las tile
+        The las tile is decoded once, here, and the same Las object is used
+        to select the trajectory of the tile (see get_tile_sbet()), for the
+        TPU calculations, and for the write-back of the TPU extra bytes.
+
+        If a chunk size is specified (chunk_size in cblue_configuration.json),
+        the tile is instead streamed in chunks by calc_tpu_chunked().
+
+        The sbet is either the Sbet object (or, in a worker process, the
+        SharedSbet) of the whole trajectory, from which the tile takes the
+        rows of its time range, or the sbet data of the tile.
+
+        :param sbet_las_files: sbet, las file path, Jacobian, and Merge objects for one las tile
         :return:
         """
 
         sbet, las_file, jacobian, merge = sbet_las_files
 
+        if self.gui_object.chunk_size:
+            self.calc_tpu_chunked(sbet, las_file, jacobian, merge)
+            return
+
         data_to_output = []
 
         # CREATE LAS OBJECT TO ACCESS INFORMATION IN LAS FILE
@@ -129,200 +281,527 @@ class Tpu:
             )
             logger.tpu("flight lines {}".format(las.unq_flight_lines))
 
-            unsorted_las, t_argsort, flight_lines = las.get_flight_line(self.sensor_object.type)
+            sbet, sbet_ticks = self.get_tile_sbet(sbet, las)
+            unsorted_las, flight_lines = las.get_flight_line(self.sensor_object.type)
+
+            # sort the points by time and match them to the trajectory once for the whole tile
+            tile_match = merge.match_tile(sbet.values, unsorted_las, flight_lines, sbet_ticks)
+            del unsorted_las
 
             self.flight_line_stats = {}  # reset flight line stats dict
             for fl in las.unq_flight_lines:
 
                 logger.tpu("flight line {} \n{}\n".format(fl, "-" * 50))
 
-                # unsorted_las has the same order as points in las (i.e., unordered)
-                fl_idx = flight_lines == fl
-                fl_las_idx = np.nonzero(fl_idx)[0]   # stable index into the original LAS order
-                fl_unsorted_las = unsorted_las[fl_idx]
+                # the points of the flight line sorted by time, their index in the
+                # original LAS order, and their slice of the tile match
+                fl_las, fl_las_idx, fl_match = tile_match.get_flight_line(fl)
 
-                num_fl_points = np.sum(fl_idx)  # count Trues
+                num_fl_points = fl_las_idx.size
                 logger.tpu(f"{las.las_short_name} fl {fl}: {num_fl_points} points")
 
-                # CREATE MERGED-DATA OBJECT
+                fl_sbet, fl_match = self.get_fl_sbet(las.las_short_name, fl, sbet, fl_las, fl_match)
 
-                logger.tpu(
-                    "({}) merging trajectory and las data...".format(las.las_short_name)
+                fl_tpu_data = self.calc_fl_tpu(
+                    las.las_short_name, fl, fl_sbet, jacobian, merge, fl_las, fl_las_idx, match=fl_match
                 )
 
-                merged_data, stddev, unsort_idx, raw_class, masked_fan_angle, masked_hawkeye_data  = merge.merge(
-                    las.las_short_name,
-                    fl,
-                    sbet.values,
-                    fl_unsorted_las,
-                    fl_las_idx,
-                    self.sensor_object,
-                    # context_label=f"{las.las_short_name} FL {fl}", #DEBUGGING
-                    # debug_target=(t_las, x_las, y_las, z_las) ex: debug_target=(415394516.5950186, 389106.83, 4299188.75, -0.43), #DEBUGGING
+                if fl_tpu_data is not None:  # i.e., las and sbet is merged
+                    data_to_output.append(fl_tpu_data)
 
-                )
+                    self.update_fl_stats(fl, num_fl_points, fl_tpu_data)
 
-                if merged_data is not False:  # i.e., las and sbet is merged
+                else:
+                    self.set_fl_not_merged(fl, num_fl_points, merge)
 
-                    logger.tpu(
-                        "({}) calculating subaer thu/tvu...".format(las.las_short_name)
-                    )
-                    subaer_obj = Subaerial(jacobian, merged_data, stddev)
+            self.write_metadata(las)  # TODO: include as VLR?
 
-                    subaer_thu, subaer_tvu = subaer_obj.calc_subaerial_tpu()
+            try:
+                self.output_tpu_to_las_extra_bytes(las, data_to_output)
+            except ValueError as e:
+                raise ValueError("Las files already contain thu and tvu")
 
-                    depth = self.gui_object.water_surface_ellipsoid_height - merged_data[4]
+            las.log_read_stats()
 
-                    # print(f"\nMax depth: {max(depth)}")
-                    # print(f"Min depth: {min(depth)}")
+        else:
+            logger.warning("WARNING: {} has no data points".format(las.las_short_name))
 
-                    logger.tpu(
-                        "({}) calculating subaqueous thu/tvu...".format(
-                            las.las_short_name
-                        )
-                    )
+    def get_tile_sbet(self, sbet, las):
+        """returns the sbet data of a decoded las tile (or chunk) and their sorted ticks
 
-                    #Initalize the subaqueous object
-                    subaqu_obj = Subaqueous(
-                        self.gui_object,
-                        depth,
-                        self.sensor_object,
-                        raw_class
-                    )
+        The rows of the tile are found in the trajectory time index (see
+        get_tile_sbet_rows()), and the tile's slice of the index is its sbet
+        ticks (see Merge.get_sbet_ticks()).
 
-                    if(self.sensor_object.type == "multi"):
-                        #Multi beam sensor: Sending to multi_beam_fit_lut() 
-                        subaqu_tvu, subaqu_thu = subaqu_obj.multi_beam_fit_lut(masked_fan_angle) 
-                    elif(self.sensor_object.type == "single_hawkeye"):
-                        #Hawkeye Sensor: Sending to hawkeye_fit_lut() 
-                        subaqu_tvu, subaqu_thu, range_bias = subaqu_obj.hawkeye_fit_lut(masked_hawkeye_data) 
-                    else:
-                        #Single beam Sensor: Sending to fit_lut() 
-                        subaqu_tvu, subaqu_thu, range_bias = subaqu_obj.fit_lut()     
-
-                    # VDatum file is in cm (1-sigma)
-                    vdatum_mcu = (float(self.gui_object.mcu) / 100.0)
-                    # Optional user input vertical uncertainty component
-                    # vuc is in m 
-                    vuc = float(self.gui_object.vuc)
-                    # Optional user input horizontal uncertainty component
-                    # huc is in m
-                    huc = float(self.gui_object.huc) 
-
-                    logger.tpu(
-                        "({}) calculating total thu...".format(las.las_short_name)
-                    )
+        If sbet is the sbet data of the tile, they are returned as they are,
+        and the las timestamps are converted with las_time_offset.
 
-                    # sum in quadrature - 1 - sigma
-                    total_thu = np.sqrt(subaer_thu**2 + subaqu_thu**2 + huc**2)
+        :param sbet: Sbet or SharedSbet object, or the sbet data of the tile (pandas dataframe)
+        :param Las las: decoded las tile (or LasChunk)
+        :return: (pandas dataframe, tuple) sbet data and sorted sbet ticks (None if sbet is the tile's data)
+        """
 
-                    logger.tpu(
-                        "({}) calculating total tvu...".format(las.las_short_name)
-                    )
+        if isinstance(sbet, pd.DataFrame):
+            las.time_offset = self.las_time_offset
+            return sbet, None
 
-                    if(self.sensor_object.type == "multi"):
-                        # sum in quadrature - 1 - sigma
-                        total_tvu = np.sqrt(
-                            subaer_tvu**2 + subaqu_tvu**2 + vdatum_mcu**2 + vuc**2
-                        )
-                    else:
-                        # sum in quadrature - 1 - sigma
-                        total_tvu = np.sqrt(
-                            subaer_tvu**2 + subaqu_tvu**2 + vdatum_mcu**2 + vuc**2 + range_bias**2
-                        )
-
-                    # Debugging: print a few sample values of the uncertainty components and total TPU, 1 sigma only
-                    # uncertainty_components = pd.DataFrame({
-                    #     "subaer_thu": subaer_thu,
-                    #     "subaqu_thu": subaqu_thu,
-                    #     "subaer_tvu": subaer_tvu,
-                    #     "subaqu_tvu": subaqu_tvu,
-                    #     "vdatum_mcu": vdatum_mcu,
-                    #     "range_bias": range_bias if self.sensor_object.type != "multi" else None,
-                    #     "total_thu": total_thu,
-                    #     "total_tvu": total_tvu
-                    # })
-
-                    # # get csv path for printing uncertainty components
-                    # comp_csv_name = os.path.join(self.gui_object.output_directory, f"uncertainty_components_{las.las_short_name}_fl{fl}.csv")
-                    # logger.tpu(f"Saving uncertainty components CSV as {comp_csv_name}")
-                    # try:
-                    #     uncertainty_components.to_csv(comp_csv_name, index=False)
-                    # except ValueError as e:
-                    #     raise ValueError("CSV writing failed for uncertainty components")
-
-                    # convert to 95% conf, if requested
-                    if self.gui_object.error_type == "95% confidence":
-                        logging.tpu("TPU reported at 95% confidence...")
-                        total_thu *= 1.7308
-                        total_tvu *= 1.96
-                    else:
-                        logging.tpu("TPU reported at 1 sigma...")
-
-                    # print(f"{total_tvu[2279775]}")
-
-                    fl_tpu_data = np.vstack((total_thu, total_tvu, unsort_idx)).T
+        start, end = self.get_tile_sbet_rows(sbet, las)
 
-                    data_to_output.append(fl_tpu_data)
+        return sbet.get_tile_data_by_rows(start, end), sbet.get_time_index().get_ticks(start, end)
 
-                    self.update_fl_stats(fl, num_fl_points, fl_tpu_data)
+    def get_tile_sbet_rows(self, sbet, las):
+        """returns the (start, end) trajectory rows of a decoded las tile (or chunk)
 
-                else:
-                    logger.warning(
-                        "SBET and LAS not merged because max delta "
-                        "time exceeded acceptable threshold of {} "
-                        "sec(s).".format(merge.max_allowable_dt)
-                    )
+        The time base of the las timestamps is resolved from the time range of
+        the decoded points (see TimeIndex.get_las_time_offset()), so the tile
+        isn't decoded again (e.g., to query its time range beforehand).  The
+        offset of the previous tile is checked first, and a tile in another
+        time base gets its own offset.  The offset is set on las, so its
+        points are converted when they are loaded (see Las.get_flight_line()).
 
-                    self.flight_line_stats.update(
-                        {"{} (0/{} points with TPU)".format(fl, num_fl_points): None}
-                    )
+        :param sbet: Sbet or SharedSbet object
+        :param Las las: decoded las tile (or LasChunk)
+        :return: (int, int)
+        """
 
-            self.write_metadata(las)  # TODO: include as VLR?
+        time_index = sbet.get_time_index()
 
-            try:
-                self.output_tpu_to_las_extra_bytes(las, data_to_output)
-            except ValueError as e:
-                raise ValueError("Las files already contain thu and tvu")
+        las.time_offset = 0.0
+        time_min, time_max = las.get_time_range()
+        self.las_time_offset = las.time_offset = time_index.get_las_time_offset(time_min, time_max)
+
+        return sbet.get_tile_rows_by_time(time_min + las.time_offset, time_max + las.time_offset)
+
+    # seconds of trajectory kept before and after the points of a flight line
+    # (see get_fl_sbet), more than Merge.max_allowable_dt
+    fl_time_buff = 2.0
+
+    def get_fl_sbet(self, las_short_name, fl, sbet, fl_las, match=None):
+        """returns the trajectory of the points of a flight line (or of a block or chunk of one)
+
+        The trajectory of a tile spans the time range of all of its points, so
+        a tile crossed by flight lines flown hours apart holds hours of
+        trajectory.  Each flight line only takes the rows of its own time
+        range, plus fl_time_buff seconds, found by binary search (see
+        Sbet.get_rows_by_time), and one more row on each side, so the rows
+        before and after each point in time are the same as in the tile.
+
+        If the points were matched with the whole tile (see Merge.match_tile),
+        the window also holds the rows they are matched to, and the match is
+        shifted to the window.
 
+        :param str las_short_name: name of the las file (for logging)
+        :param fl: flight line id
+        :param sbet: sbet data for the tile (sorted by time)
+        :param LasPoints fl_las: las points of the flight line
+        :param tuple match: optional (idx, mask) match of the points with the tile's sbet data
+        :return: (dataframe, tuple) sbet data of the flight line, and its match (None if not given)
+        """
+
+        num_rows = len(sbet)
+        start, end = 0, 0
+        if len(fl_las):
+            t_las = fl_las["t"]
+            start, end = self.get_fl_sbet_rows(sbet.time.values, t_las.min(), t_las.max())
+
+        if match is not None:
+            idx, mask = match
+            matched = idx[mask]
+            if matched.size:
+                start = min(start, int(matched.min()))
+                end = max(end, int(matched.max()) + 1)
+            match = (idx - start, mask)
+
+        logger.tpu(
+            "({}) fl {}: trajectory rows {:,}-{:,} ({:,} of the {:,} rows of the tile)".format(
+                las_short_name, fl, start, end, end - start, num_rows
+            )
+        )
+
+        return sbet.iloc[start:end], match
+
+    def get_fl_sbet_rows(self, t_sbet, start_time, end_time):
+        """returns the (start, end) rows of the trajectory of a flight line (see get_fl_sbet)
+
+        :param ndarray t_sbet: sorted sbet times of the tile
+        :param float start_time: time of the first point of the flight line
+        :param float end_time: time of the last point of the flight line
+        :return: (int, int)
+        """
+
+        start, end = Sbet.get_rows_by_time(t_sbet, start_time, end_time, self.fl_time_buff)
+        return max(start - 1, 0), min(end + 1, len(t_sbet))
+
+    def calc_fl_tpu(
+        self, las_short_name, fl, sbet, jacobian, merge, fl_unsorted_las, fl_las_idx, poly_surf_coeffs=None,
+        match=None
+    ):
+        """calculates the total thu and tvu of the points of a flight line
+
+        :param str las_short_name: name of the las file (for logging)
+        :param fl: flight line id
+        :param sbet: sbet data for the flight line (see get_fl_sbet)
+        :param Jacobian jacobian:
+        :param Merge merge:
+        :param LasPoints fl_unsorted_las: las points of the flight line (see Las.get_flight_line)
+        :param ndarray fl_las_idx: index of the flight line points in las
+        :param tuple(ndarray) poly_surf_coeffs: optional polynomial surface coefficients
+            fit to the whole flight line (chunked mode)
+        :param tuple match: optional match of the flight line points (see TileMatch.get_flight_line)
+        :return: ndarray (total_thu, total_tvu, index) or None if the sbet and las data weren't merged
+        """
+
+        # CREATE MERGED-DATA OBJECT
+
+        logger.tpu(
+            "({}) merging trajectory and las data...".format(las_short_name)
+        )
+
+        merged_data, stddev, unsort_idx, raw_class, masked_fan_angle, masked_hawkeye_data  = merge.merge(
+            las_short_name,
+            fl,
+            sbet.values,
+            fl_unsorted_las,
+            fl_las_idx,
+            self.sensor_object,
+            match=match,
+            # context_label=f"{las_short_name} FL {fl}", #DEBUGGING
+            # debug_target=(t_las, x_las, y_las, z_las) ex: debug_target=(415394516.5950186, 389106.83, 4299188.75, -0.43), #DEBUGGING
+
+        )
+
+        if merged_data is False:  # i.e., las and sbet not merged
+            return None
+
+
+        logger.tpu(
+            "({}) calculating subaer thu/tvu...".format(las_short_name)
+        )
+        subaer_obj = Subaerial(jacobian, merged_data, stddev, poly_surf_coeffs)
+
+        subaer_thu, subaer_tvu = subaer_obj.calc_subaerial_tpu()
+
+        depth = self.gui_object.water_surface_ellipsoid_height - merged_data[4]
+
+        # print(f"\nMax depth: {max(depth)}")
+        # print(f"Min depth: {min(depth)}")
+
+        logger.tpu(
+            "({}) calculating subaqueous thu/tvu...".format(
+                las_short_name
+            )
+        )
+
+        #Initalize the subaqueous object
+        subaqu_obj = Subaqueous(
+            self.gui_object,
+            depth,
+            self.sensor_object,
+            raw_class
+        )
+
+        if(self.sensor_object.type == "multi"):
+            #Multi beam sensor: Sending to multi_beam_fit_lut() 
+            subaqu_tvu, subaqu_thu = subaqu_obj.multi_beam_fit_lut(masked_fan_angle) 
+        elif(self.sensor_object.type == "single_hawkeye"):
+            #Hawkeye Sensor: Sending to hawkeye_fit_lut() 
+            subaqu_tvu, subaqu_thu, range_bias = subaqu_obj.hawkeye_fit_lut(masked_hawkeye_data) 
         else:
-            logger.warning("WARNING: {} has no data points".format(las.las_short_name))
+            #Single beam Sensor: Sending to fit_lut() 
+            subaqu_tvu, subaqu_thu, range_bias = subaqu_obj.fit_lut()     
+
+        # VDatum file is in cm (1-sigma)
+        vdatum_mcu = (float(self.gui_object.mcu) / 100.0)
+        # Optional user input vertical uncertainty component
+        # vuc is in m 
+        vuc = float(self.gui_object.vuc)
+        # Optional user input horizontal uncertainty component
+        # huc is in m
+        huc = float(self.gui_object.huc) 
+
+        logger.tpu(
+            "({}) calculating total thu...".format(las_short_name)
+        )
 
-    def output_tpu_to_las_extra_bytes(self, las, data_to_output):
-        """output the calculated tpu to a las file
+        # sum in quadrature - 1 - sigma
+        total_thu = np.sqrt(subaer_thu**2 + subaqu_thu**2 + huc**2)
 
-        This method creates a las file tht contains the contents of the
-        original las file and the calculated tpu values as VLR extra bytes.
-        The las file is generated using "The laspy way", as documented in
-        https://laspy.readthedocs.io/en/latest/tut_part_3.html.
+        logger.tpu(
+            "({}) calculating total tvu...".format(las_short_name)
+        )
 
-        The following references have additional information describing las
-        extra bytes:
+        if(self.sensor_object.type == "multi"):
+            # sum in quadrature - 1 - sigma
+            total_tvu = np.sqrt(
+                subaer_tvu**2 + subaqu_tvu**2 + vdatum_mcu**2 + vuc**2
+            )
+        else:
+            # sum in quadrature - 1 - sigma
+            total_tvu = np.sqrt(
+                subaer_tvu**2 + subaqu_tvu**2 + vdatum_mcu**2 + vuc**2 + range_bias**2
+            )
 
-        LAS v1.4 specifications:
-        https://www.asprs.org/a/society/committees/standards/LAS_1_4_r13.pdf
+        # Debugging: print a few sample values of the uncertainty components and total TPU, 1 sigma only
+        # uncertainty_components = pd.DataFrame({
+        #     "subaer_thu": subaer_thu,
+        #     "subaqu_thu": subaqu_thu,
+        #     "subaer_tvu": subaer_tvu,
+        #     "subaqu_tvu": subaqu_tvu,
+        #     "vdatum_mcu": vdatum_mcu,
+        #     "range_bias": range_bias if self.sensor_object.type != "multi" else None,
+        #     "total_thu": total_thu,
+        #     "total_tvu": total_tvu
+        # })
+
+        # # get csv path for printing uncertainty components
+        # comp_csv_name = os.path.join(self.gui_object.output_directory, f"uncertainty_components_{las_short_name}_fl{fl}.csv")
+        # logger.tpu(f"Saving uncertainty components CSV as {comp_csv_name}")
+        # try:
+        #     uncertainty_components.to_csv(comp_csv_name, index=False)
+        # except ValueError as e:
+        #     raise ValueError("CSV writing failed for uncertainty components")
+
+        # convert to 95% conf, if requested
+        if self.gui_object.error_type == "95% confidence":
+            logging.tpu("TPU reported at 95% confidence...")
+            total_thu *= 1.7308
+            total_tvu *= 1.96
+        else:
+            logging.tpu("TPU reported at 1 sigma...")
+
+        # print(f"{total_tvu[2279775]}")
+
+        return np.vstack((total_thu, total_tvu, unsort_idx)).T
+
+    def calc_tpu_chunked(self, sbet, las_file, jacobian, merge):
+        """calculates the tpu of a las tile in fixed-size chunks of points
+
+        This is the bounded-memory alternative to calc_tpu() for very large
+        tiles.  The points are streamed through laspy's chunk iterator, so only
+        one chunk of points (and its merged data, Jacobian, etc.) is in memory
+        at a time, and the peak memory depends on the chunk size rather than on
+        the tile size.  The tile is streamed twice:
+
+        1. For each flight line, the normal equations of the polynomial surface
+           fit are accumulated chunk by chunk (see PolySurfFit), so the fit is
+           still computed once per flight line, from all of its points.  As in
+           calc_tpu(), a flight line is not processed if it can't be merged,
+           i.e., if the max delta time of any of its chunks exceeds the
+           threshold (chunks the trajectory doesn't cover are skipped).
+        2. The tpu of each chunk is calculated with the coefficients of its
+           flight lines, and the chunk is appended to the output file(s) with
+           laspy's chunked writer.
+
+        Each chunk takes the trajectory rows of its own time range, once it is
+        decoded (see get_tile_sbet()).
+
+        :param sbet: Sbet or SharedSbet object, or the sbet data of the tile (see calc_tpu())
+        :param str las_file: path of the las (or laz) tile
+        :param Jacobian jacobian:
+        :param Merge merge:
+        :return: None
+        """
 
-        The LAS 1.4 Specification (ASPRS PERS article)
-        https://www.asprs.org/wp-content/uploads/2010/12/LAS_Specification.pdf
+        chunk_size = self.gui_object.chunk_size
 
-        ASPRS LAS Working Group Github repository
-        https://github.com/ASPRSorg/LAS
+        with laspy.open(las_file) as reader:
+            header = reader.header
+        num_file_points = header.point_count
 
-        The following table lists the information contained as extra bytes:
+        if not num_file_points:
+            logger.warning("WARNING: {} has no data points".format(os.path.split(las_file)[-1]))
+            return
 
-        .. csv-table:: cBLUE VLR Extra Bytes
-            :header: id, dtype, description
-            :widths: 14, 20, 20
+        logger.tpu(
+            "{} ({:,} points, processed in chunks of {:,} points)".format(
+                os.path.split(las_file)[-1], num_file_points, chunk_size
+            )
+        )
 
-            total_thu,  unsigned short (2 bytes), total horizontal uncertainty
-            total_tvu,  unsigned short (2 bytes), total vertical uncertainty
+        # the sorted ticks of the sbet data of a tile are built once and reused to match the points of every chunk
+        tile_sbet_ticks = None
+
+        def get_chunk_sbet(las):
+            nonlocal tile_sbet_ticks
+            chunk_sbet, chunk_sbet_ticks = self.get_tile_sbet(sbet, las)
+            if chunk_sbet_ticks is None:
+                if tile_sbet_ticks is None:
+                    tile_sbet_ticks = merge.get_sbet_ticks(chunk_sbet.values)
+                chunk_sbet_ticks = tile_sbet_ticks
+            return chunk_sbet, chunk_sbet_ticks
+
+        # 1st pass: fit the polynomial surface of each flight line
+        num_fl_points = {}
+        poly_surf_fits = {}
+        not_merged = set()
+
+        for las in LasChunk.iter_chunks(las_file, chunk_size):
+            chunk_sbet, chunk_sbet_ticks = get_chunk_sbet(las)
+            unsorted_las, flight_lines = las.get_flight_line(self.sensor_object.type)
+            chunk_match = merge.match_tile(chunk_sbet.values, unsorted_las, flight_lines, chunk_sbet_ticks)
+
+            for fl in las.unq_flight_lines:
+                fl_las, fl_las_idx, fl_match = chunk_match.get_flight_line(fl)
+                num_fl_points[fl] = num_fl_points.get(fl, 0) + fl_las_idx.size
+
+                if fl in not_merged:
+                    continue
+
+                logger.tpu(
+                    "({}) merging trajectory and las data (fl {}, points {:,}+)...".format(
+                        las.las_short_name, fl, las.start
+                    )
+                )
+
+                fl_sbet, fl_match = self.get_fl_sbet(las.las_short_name, fl, chunk_sbet, fl_las, fl_match)
+
+                merged_data, __, merged_idx, __, __, __ = merge.merge(
+                    las.las_short_name,
+                    fl,
+                    fl_sbet.values,
+                    fl_las,
+                    fl_las_idx,
+                    self.sensor_object,
+                    match=fl_match,
+                )
+
+                if merged_data is not False:
+                    if fl not in poly_surf_fits:
+                        poly_surf_fits[fl] = PolySurfFit(jacobian.sensor_model.eval_type)
+                    jacobian.add_to_poly_surf_fit(merged_data, poly_surf_fits[fl])
+                elif merged_idx.size:
+                    # max delta time exceeded
+                    not_merged.add(fl)
+                # otherwise, the trajectory doesn't cover this part of the flight line
+
+        poly_surf_coeffs = {
+            fl: fit.solve() for fl, fit in poly_surf_fits.items() if fl not in not_merged
+        }
+
+        # points without tpu are filled with -1, or with 0 if the tpu wasn't
+        # calculated for any flight line (as in output_tpu_to_las_extra_bytes)
+        no_data_value = -1 if poly_surf_coeffs else 0
+
+        out_header = copy.deepcopy(header)
+        try:
+            out_header.add_extra_dims(self.get_extra_byte_dimensions())
+        except ValueError as e:
+            raise ValueError("Las files already contain thu and tvu")
+
+        out_laz_name, out_las_name = self.get_output_names(las)
+        out_csv_name = None
+        if self.gui_object.csv_option:
+            logger.tpu(f"Saving CSV as {las.las_base_name}_TPU.csv")
+            out_csv_name = os.path.join(self.gui_object.output_directory, las.las_base_name) + "_TPU.csv"
+
+        # 2nd pass: calculate the tpu of each chunk and append it to the output
+        fl_tpu_sums = {}
+        decoded_bytes = 0
+
+        with contextlib.ExitStack() as stack:
+            writers = [
+                stack.enter_context(laspy.open(out_name, mode="w", header=out_header))
+                for out_name in (out_laz_name, out_las_name)
+                if out_name is not None
+            ]
+
+            for las in LasChunk.iter_chunks(las_file, chunk_size):
+                decoded_bytes += las.decoded_bytes
+                chunk_sbet, chunk_sbet_ticks = get_chunk_sbet(las)
+                unsorted_las, flight_lines = las.get_flight_line(self.sensor_object.type)
+                chunk_match = merge.match_tile(chunk_sbet.values, unsorted_las, flight_lines, chunk_sbet_ticks)
+
+                chunk_tpu = np.full((las.num_file_points, 2), no_data_value, dtype=float)
+
+                for fl in las.unq_flight_lines:
+                    if fl not in poly_surf_coeffs:
+                        continue
+
+                    fl_las, fl_las_idx, fl_match = chunk_match.get_flight_line(fl)
+                    fl_sbet, fl_match = self.get_fl_sbet(las.las_short_name, fl, chunk_sbet, fl_las, fl_match)
+                    fl_tpu_data = self.calc_fl_tpu(
+                        las.las_short_name,
+                        fl,
+                        fl_sbet,
+                        jacobian,
+                        merge,
+                        fl_las,
+                        fl_las_idx,
+                        poly_surf_coeffs[fl],
+                        fl_match,
+                    )
+
+                    if fl_tpu_data is None:  # trajectory doesn't cover this chunk
+                        continue
+
+                    chunk_tpu[fl_tpu_data[:, 2].astype(np.int64)] = fl_tpu_data[:, 0:2]
+                    self.add_fl_tpu_sums(fl_tpu_sums, fl, fl_tpu_data)
+
+                out_points = laspy.ScaleAwarePointRecord.zeros(las.num_file_points, header=out_header)
+                in_array = las.points_to_process.array
+                for name in in_array.dtype.names:
+                    out_points.array[name] = in_array[name]
+                out_points.total_thu = chunk_tpu[:, 0]
+                out_points.total_tvu = chunk_tpu[:, 1]
+
+                for writer in writers:
+                    writer.write_points(out_points)
+
+                if out_csv_name is not None:
+                    try:
+                        pd.DataFrame.from_dict(
+                            {
+                                "GPS Time": np.asarray(out_points.gps_time),
+                                "X": np.asarray(out_points.x),
+                                "Y": np.asarray(out_points.y),
+                                "Z": np.asarray(out_points.z),
+                                "THU": np.asarray(out_points.total_thu),
+                                "TVU": np.asarray(out_points.total_tvu),
+                                "Classification": np.asarray(out_points.classification),
+                            }
+                        ).to_csv(out_csv_name, index=False, mode="w" if las.start == 0 else "a", header=las.start == 0)
+                    except ValueError as e:
+                        raise ValueError("CSV writing failed")
+
+        self.flight_line_stats = {}  # reset flight line stats dict
+        for fl, num_points in num_fl_points.items():
+            if fl in fl_tpu_sums:
+                self.update_fl_stats_from_sums(fl, num_points, fl_tpu_sums[fl])
+            else:
+                self.set_fl_not_merged(fl, num_points, merge)
+
+        self.write_metadata(las)  # TODO: include as VLR?
+
+        logger.las(
+            "({}) streamed twice in chunks of {:,} points, {:,} bytes decoded per pass".format(
+                las.las_short_name, chunk_size, decoded_bytes
+            )
+        )
+
+    @staticmethod
+    def get_extra_byte_dimensions():
+        """returns the definitions of the total_thu and total_tvu extra bytes
+
+        :return: list[laspy.ExtraBytesParams]
+        """
+
+        # note '<f4' -> 32 bit floating point
+        # extra_byte_dimensions = {"total_thu": "<f4", "total_tvu": "<f4"}
+        return [laspy.ExtraBytesParams(name="total_thu", type="<f4", description="total_thu"), \
+                laspy.ExtraBytesParams(name="total_tvu", type="<f4", description="total_tvu")]
+
+    def get_output_names(self, las):
+        """returns the names of the las and laz output files selected by the user
+
+        Existing output files are removed.
 
         :param las:
-        :param data_to_output:
-        :param output_columns:
-        :return:
+        :return: (str, str) laz and las output file names (None if not selected)
         """
 
+        out_laz_name = None
+        out_las_name = None
+
         # Get input file name and append _TPU and file extension.
         # If the user has selected .laz ouput, append .laz
         if self.gui_object.laz_option:
@@ -358,21 +837,56 @@ class Tpu:
                     "writing las and tpu results to new file: {}".format(out_las_name)
                 )
 
-        # read las file
-        in_las = laspy.read(las.las)
+        return out_laz_name, out_las_name
+
+    def output_tpu_to_las_extra_bytes(self, las, data_to_output):
+        """output the calculated tpu to a las file
+
+        This method creates a las file tht contains the contents of the
+        original las file and the calculated tpu values as VLR extra bytes.
+        The las file is generated using "The laspy way", as documented in
+        https://laspy.readthedocs.io/en/latest/tut_part_3.html.
+
+        The following references have additional information describing las
+        extra bytes:
 
-        # copy data from in_las
-        for field in in_las.point_format:
+        LAS v1.4 specifications:
+        https://www.asprs.org/a/society/committees/standards/LAS_1_4_r13.pdf
+
+        The LAS 1.4 Specification (ASPRS PERS article)
+        https://www.asprs.org/wp-content/uploads/2010/12/LAS_Specification.pdf
+
+        ASPRS LAS Working Group Github repository
+        https://github.com/ASPRSorg/LAS
+
+        The following table lists the information contained as extra bytes:
+
+        .. csv-table:: cBLUE VLR Extra Bytes
+            :header: id, dtype, description
+            :widths: 14, 20, 20
+
+            total_thu,  unsigned short (2 bytes), total horizontal uncertainty
+            total_tvu,  unsigned short (2 bytes), total vertical uncertainty
+
+        The extra bytes are added to the las data already decoded by the Las
+        object (las.inFile), rather than re-reading the las file, so the Las
+        object is modified in place; writing the output is its last use.
+
+        :param las:
+        :param data_to_output:
+        :param output_columns:
+        :return:
+        """
+
+        out_laz_name, out_las_name = self.get_output_names(las)
+
+        # las data decoded by the Las object (the las file is not read again)
+        in_las = las.inFile
 
-            las_data = in_las[field.name]
-            in_las[field.name] = las_data
         # print(in_las.header)
         # print(in_las.vlrs)
 
-        # note '<f4' -> 32 bit floating point
-        # extra_byte_dimensions = {"total_thu": "<f4", "total_tvu": "<f4"}
-        extra_byte_dimensions = [laspy.ExtraBytesParams(name="total_thu", type="<f4", description="total_thu"), \
-                                 laspy.ExtraBytesParams(name="total_tvu", type="<f4", description="total_tvu")]
+        extra_byte_dimensions = self.get_extra_byte_dimensions()
 
         num_extra_bytes = len(extra_byte_dimensions)
 
@@ -503,7 +1017,23 @@ class Tpu:
             logger.error(e)
             print(e)
 
-    def run_tpu_multiprocess(self, num_las, sbet_las_generator):
+    @staticmethod
+    def schedule_las_files(las_files):
+        """orders the las files for processing, largest first
+
+        The work of each tile is estimated from the number of points in its
+        las header.  Dispatching the largest tiles first keeps a large tile
+        from starting last, while the other workers sit idle.
+
+        :param list[str] las_files: las (or laz) file paths
+        :return: list[str]
+        """
+
+        num_points = {las_file: Las.get_num_points(las_file) for las_file in las_files}
+
+        return sorted(las_files, key=lambda las_file: num_points[las_file], reverse=True)
+
+    def run_tpu_multiprocess(self, num_las, las_files, shared_sbet):
         """runs the tpu calculations using multiprocessing
 
         This methods initiates the tpu calculations using the pathos
@@ -514,17 +1044,361 @@ class Tpu:
 
         TODO: Include user option to select single processing or multiprocessing
 
-        :param sbet_las_generator:
-        :return:
+        The number of worker processes is number_cores (from
+        cblue_configuration.json or the command line).  Each worker gets this
+        Tpu object, builds its sensor model, Jacobian, and Merge objects, and
+        attaches the shared trajectory once (see init_worker()), so the tasks
+        only carry the las file path of each tile.  The pickled size of the
+        initializer arguments, sent once to each worker, and of a task (with
+        the function mapped over it, as the pool pickles them), and the
+        utilization of each worker, are reported in the log.
+
+        :param int num_las: number of las files
+        :param las_files: las file paths
+        :param SharedSbet shared_sbet: the trajectory shared by Sbet.share_data()
+        :return: process pool
         """
 
         print("Calculating TPU (multi-processing)...")
-        p = pp.ProcessPool(2)
-
-        for _ in tqdm(
-            p.imap(self.calc_tpu, sbet_las_generator), total=num_las, ascii=True
+        num_workers = int(self.gui_object.cpu_process_info[1])
+        p = pp.ProcessPool(num_workers, initializer=init_worker, initargs=(self, shared_sbet))
+
+        # the tiles are handed out one at a time, as workers become free, and
+        # the results are collected in order of completion
+        run_tic = time.perf_counter()
+        worker_stats = {}
+        for pid, secs in tqdm(
+            p.uimap(calc_tpu_task, las_files), total=num_las, ascii=True
         ):
-            pass
+            num_tiles, busy_secs = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (num_tiles + 1, busy_secs + secs)
+        run_secs = time.perf_counter() - run_tic
+
+        logger.tpu(
+            "{} of {} worker(s) used, {:.1f} sec run time".format(
+                len(worker_stats), num_workers, run_secs
+            )
+        )
+        for pid, (num_tiles, busy_secs) in worker_stats.items():
+            logger.tpu(
+                "worker {}: {} tile(s), busy {:.1f} sec ({:.0f}% utilization)".format(
+                    pid, num_tiles, busy_secs, 100 * busy_secs / run_secs
+                )
+            )
+
+        if las_files:
+            # measured once, after the run, rather than for every task sent
+            logger.tpu(
+                "dispatch: {:,} bytes pickled once per worker (Tpu and shared trajectory, "
+                "see init_worker()), {:,} bytes per task (las file path)".format(
+                    len(dill.dumps((init_worker, (self, shared_sbet)))),
+                    len(dill.dumps((calc_tpu_task, las_files[0]))),
+                )
+            )
+
+        return p
+
+    def share_tile_flight_lines(self, las):
+        """writes the las data of a tile, grouped by flight line, to a file that the workers memory map
+
+        The las points (see Las.get_flight_line()) are written as a structured
+        array (see LasPoints.to_records()) with an extra las_idx column holding
+        the index of each point in the las file, so each column keeps its
+        dtype and the workers read only the columns of their block.  The
+        points are sorted by time once for the whole tile (as in
+        Merge.match_tile()) and then grouped by flight line with a stable
+        sort, so the points of each flight line are sorted by time and
+        merge() skips the sort of each block.
+
+        :param Las las: decoded las tile
+        :return: (str, dict) shared file path and the (start, end) rows of each flight line
+        """
+
+        unsorted_las, flight_lines = las.get_flight_line(self.sensor_object.type)
+        flight_lines = np.asarray(flight_lines)
+
+        order = Merge.get_sort_order(np.round(unsorted_las["t"], 9))
+        if order is None:
+            order = np.argsort(flight_lines, kind="stable")
+        else:
+            order = order[np.argsort(flight_lines[order], kind="stable")]
+        sorted_flight_lines = flight_lines[order]
+
+        fd, shared_file = tempfile.mkstemp(prefix="cblue_las_", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, unsorted_las[order].to_records(las_idx=order))
+
+        fl_rows = {
+            fl: (
+                int(np.searchsorted(sorted_flight_lines, fl, side="left")),
+                int(np.searchsorted(sorted_flight_lines, fl, side="right")),
+            )
+            for fl in las.unq_flight_lines
+        }
+
+        return shared_file, fl_rows
+
+    @staticmethod
+    def read_shared_fl_block(shared_file, start, end):
+        """reads a block of flight line points from the file written by share_tile_flight_lines()
+
+        :param str shared_file: shared file path
+        :param int start: first row of the block
+        :param int end: last row (exclusive) of the block
+        :return: (LasPoints, ndarray) las points and index of the points in the las file
+        """
+
+        shared = np.load(shared_file, mmap_mode="r")
+        block = LasPoints.from_records(shared, start, end)
+        del shared  # don't keep the file mapped (it is removed once the tile is done)
+
+        return block, block.columns.pop("las_idx")
+
+    def fit_fl_block(self, task):
+        """fits the polynomial surface to a block of a flight line (in a worker process)
+
+        :param task: las name, flight line id, las rows, and sbet rows of the block
+        :return: (fl, PolySurfFit, bool) the fit (None if not merged) and
+            whether the max delta time was exceeded
+        """
+
+        las_short_name, fl, las_rows, sbet_rows = task
+        jacobian, merge = _worker_state["jacobian"], _worker_state["merge"]
+
+        fl_las, fl_las_idx = self.read_shared_fl_block(*las_rows)
+        sbet = Sbet.get_shared_tile_data(*sbet_rows)
+
+        merged_data, __, merged_idx, __, __, __ = merge.merge(
+            las_short_name, fl, sbet.values, fl_las, fl_las_idx, self.sensor_object
+        )
+
+        if merged_data is False:
+            # as in calc_tpu_chunked(), a block the trajectory doesn't cover is skipped
+            return fl, None, bool(merged_idx.size)
+
+        poly_surf_fit = PolySurfFit(jacobian.sensor_model.eval_type)
+        jacobian.add_to_poly_surf_fit(merged_data, poly_surf_fit)
+
+        return fl, poly_surf_fit, False
+
+    def calc_fl_block_tpu(self, task):
+        """calculates the tpu of a block of a flight line (in a worker process)
+
+        :param task: las name, flight line id, las rows, sbet rows, and
+            polynomial surface coefficients (None for a whole flight line)
+        :return: (fl, ndarray) see calc_fl_tpu()
+        """
+
+        las_short_name, fl, las_rows, sbet_rows, poly_surf_coeffs = task
+        jacobian, merge = _worker_state["jacobian"], _worker_state["merge"]
+
+        fl_las, fl_las_idx = self.read_shared_fl_block(*las_rows)
+        sbet = Sbet.get_shared_tile_data(*sbet_rows)
+
+        return fl, self.calc_fl_tpu(
+            las_short_name, fl, sbet, jacobian, merge, fl_las, fl_las_idx, poly_surf_coeffs
+        )
+
+    def dispatch_tile_flight_lines(self, p, sbet, las_file):
+        """sends the flight line tasks of a las tile to the process pool
+
+        Each flight line is one task, or, if flight_line_block_size is set,
+        is split into blocks of at most that many points.  The polynomial
+        surface of a flight line split into blocks is fit to all of its
+        blocks first (see PolySurfFit), as in calc_tpu_chunked().  The tpu
+        tasks are sent by the callback of the fit tasks, once they are done,
+        so this method doesn't wait for the fits, and the next tile is
+        decoded while they run.
+
+        The trajectory rows of the tile are selected once the tile is decoded
+        (see get_tile_sbet()), and the tasks get the rows of their flight line
+        (see get_fl_sbet).
+
+        :param p: process pool
+        :param SharedSbet sbet: the trajectory shared by Sbet.share_data()
+        :param str las_file: las file path
+        :return: dict tile state (see assemble_tile_flight_lines()) or None if the tile has no points
+        """
+
+        las = Las(las_file)
+
+        if not las.num_file_points:
+            logger.warning("WARNING: {} has no data points".format(las.las_short_name))
+            return None
+
+        logger.tpu("{} ({:,} points)".format(las.las_short_name, las.num_file_points))
+        logger.tpu("flight lines {}".format(las.unq_flight_lines))
+
+        sbet_start, sbet_end = self.get_tile_sbet_rows(sbet, las)
+        shared_file, fl_rows = self.share_tile_flight_lines(las)
+
+        # the blocks are sorted by time, so each one takes the trajectory rows
+        # of the time range of its first and last points (see get_fl_sbet)
+        sbet_file = sbet.shared_file
+        t_sbet = np.load(sbet_file, mmap_mode="r")[sbet_start:sbet_end, 0]
+        t_las = np.load(shared_file, mmap_mode="r")["t"]
+
+        block_size = self.gui_object.flight_line_block_size
+        blocks = {}
+        for fl, (start, end) in fl_rows.items():
+            step = block_size or (end - start)
+            blocks[fl] = []
+            for lo in range(start, end, step):
+                hi = min(lo + step, end)
+                fl_sbet_start, fl_sbet_end = self.get_fl_sbet_rows(t_sbet, t_las[lo], t_las[hi - 1])
+                blocks[fl].append(
+                    ((shared_file, lo, hi), (sbet_file, sbet_start + fl_sbet_start, sbet_start + fl_sbet_end))
+                )
+
+            fl_sbet_rows = [fl_sbet for __, fl_sbet in blocks[fl]]
+            logger.tpu(
+                "({}) fl {}: trajectory rows {:,}-{:,} ({:,} of the {:,} rows of the tile, {} block(s))".format(
+                    las.las_short_name,
+                    fl,
+                    min(r[1] for r in fl_sbet_rows) - sbet_start,
+                    max(r[2] for r in fl_sbet_rows) - sbet_start,
+                    sum(r[2] - r[1] for r in fl_sbet_rows),
+                    sbet_end - sbet_start,
+                    len(fl_sbet_rows),
+                )
+            )
+        del t_sbet, t_las  # don't keep the files mapped
+
+        fit_tasks = [
+            (las.las_short_name, fl, las_rows, fl_sbet_rows)
+            for fl, fl_blocks in blocks.items()
+            if len(fl_blocks) > 1
+            for las_rows, fl_sbet_rows in fl_blocks
+        ]
+
+        tile = {
+            "las": las,
+            "merge": Merge(self.sensor_object),
+            "shared_file": shared_file,
+            "fl_rows": fl_rows,
+        }
+
+        def send_tpu_tasks(fits):
+            # runs in the result handler thread of the pool, which must not
+            # raise, so an error is kept for assemble_tile_flight_lines()
+            try:
+                poly_surf_fits = {}
+                not_merged = set()
+                for fl, poly_surf_fit, fl_not_merged in fits:
+                    if fl_not_merged:
+                        not_merged.add(fl)
+                    elif poly_surf_fit is not None:
+                        if fl in poly_surf_fits:
+                            poly_surf_fits[fl].combine(poly_surf_fit)
+                        else:
+                            poly_surf_fits[fl] = poly_surf_fit
+
+                poly_surf_coeffs = {
+                    fl: fit.solve() for fl, fit in poly_surf_fits.items() if fl not in not_merged
+                }
+
+                tpu_tasks = [
+                    (las.las_short_name, fl, las_rows, fl_sbet_rows, poly_surf_coeffs.get(fl))
+                    for fl, fl_blocks in blocks.items()
+                    if len(fl_blocks) == 1 or fl in poly_surf_coeffs
+                    for las_rows, fl_sbet_rows in fl_blocks
+                ]
+
+                tile["result"] = p.amap(calc_fl_block_tpu_task, tpu_tasks)
+            except Exception as e:
+                tile["error"] = e
+
+        if fit_tasks:
+            tile["fits"] = p.amap(fit_fl_block_task, fit_tasks, callback=send_tpu_tasks)
+        else:
+            send_tpu_tasks([])
+
+        return tile
+
+    def assemble_tile_flight_lines(self, tile):
+        """waits for the flight line tasks of a tile and writes its output
+
+        The fl_tpu_data of the tasks hold the index of each point in the las
+        file, so they are scattered back into the tile's point order by
+        output_tpu_to_las_extra_bytes(), as in calc_tpu().
+
+        :param dict tile: tile state (see dispatch_tile_flight_lines())
+        :return: None
+        """
+
+        las = tile["las"]
+        self.las_time_offset = las.time_offset  # (another tile may have been dispatched since)
+
+        try:
+            if "fits" in tile:
+                tile["fits"].get()  # the callback has sent the tpu tasks once this returns
+            if "error" in tile:
+                raise tile["error"]
+
+            fl_tpu = {}
+            for fl, fl_tpu_data in tile["result"].get():
+                if fl_tpu_data is not None:
+                    fl_tpu.setdefault(fl, []).append(fl_tpu_data)
+        finally:
+            os.remove(tile["shared_file"])
+
+        data_to_output = []
+        self.flight_line_stats = {}  # reset flight line stats dict
+        for fl, (start, end) in tile["fl_rows"].items():
+            if fl in fl_tpu:
+                fl_tpu_data = np.vstack(fl_tpu[fl])
+                data_to_output.append(fl_tpu_data)
+                self.update_fl_stats(fl, end - start, fl_tpu_data)
+            else:
+                self.set_fl_not_merged(fl, end - start, tile["merge"])
+
+        self.write_metadata(las)  # TODO: include as VLR?
+
+        try:
+            self.output_tpu_to_las_extra_bytes(las, data_to_output)
+        except ValueError as e:
+            raise ValueError("Las files already contain thu and tvu")
+
+        las.log_read_stats()
+
+    def run_tpu_multiprocess_flight_lines(self, num_las, las_files, shared_sbet, max_pending_tiles=2):
+        """runs the tpu calculations using multiprocessing, with flight line tasks
+
+        Rather than processing whole tiles, the workers process the flight
+        lines (or blocks of points of the flight lines) of the tiles, so a
+        project with few large tiles, or a tile with one dominant flight line,
+        can use all of the workers.  Each tile is decoded once, in this
+        process, and its flight lines are shared with the workers through a
+        memory-mapped file (see share_tile_flight_lines()).  The flight line
+        tasks of up to max_pending_tiles tiles are in the pool at a time.
+
+        :param int num_las: number of las files
+        :param las_files: las file paths
+        :param SharedSbet shared_sbet: the trajectory shared by Sbet.share_data()
+        :param int max_pending_tiles: number of tiles processed at the same time
+        :return: process pool
+        """
+
+        print("Calculating TPU (multi-processing, flight lines)...")
+        num_workers = int(self.gui_object.cpu_process_info[1])
+        p = pp.ProcessPool(num_workers, initializer=init_worker, initargs=(self, shared_sbet))
+
+        pending = []
+        with tqdm(total=num_las, ascii=True) as bar:
+            for las_file in las_files:
+                tile = self.dispatch_tile_flight_lines(p, shared_sbet, las_file)
+                if tile is not None:
+                    pending.append(tile)
+                else:
+                    bar.update(1)
+
+                while len(pending) >= max_pending_tiles:
+                    self.assemble_tile_flight_lines(pending.pop(0))
+                    bar.update(1)
+
+            while pending:
+                self.assemble_tile_flight_lines(pending.pop(0))
+                bar.update(1)
 
         return p
 
@@ -74,6 +74,28 @@ class UserInput:
         else:
             self.cpu_process_info = ("singleprocess",)
 
+        #Unit of parallel work in multiprocess mode: "tile" (each task is a las tile) or
+        #"flight_line" (each task is a flight line of a tile, or a block of at most
+        #flight_line_block_size points of a flight line; 0 doesn't split flight lines).
+        self.parallel_unit = controller_configuration.get("parallel_unit", "tile")
+        self.flight_line_block_size = int(controller_configuration.get("flight_line_block_size", 0))
+
+        #Number of points per chunk for the bounded-memory chunked processing mode.
+        #0 (the default) processes each las tile all at once.
+        self.chunk_size = int(controller_configuration.get("chunk_size", 0))
+
+        #Kernel used to evaluate the subaerial Jacobian: "terms" (the default, one lambdified
+        #function per Jacobian term), or, opt-in, "cse" (a single generated function that
+        #evaluates the common subexpressions of the Jacobian terms once) or "fused" (a single
+        #generated function that calculates the subaerial THU/TVU block by block, without
+        #evaluating the Jacobian into arrays).  The cse and fused kernels can differ from the
+        #terms kernel in the last bits of the results.
+        self.subaerial_kernel = controller_configuration.get("subaerial_kernel", "terms")
+
+        #Numeric backend used to evaluate the sensor model and its Jacobian: "numexpr",
+        #"numpy", or "numba" (compiles the cse and fused kernels; requires the numba package).
+        self.subaerial_backend = controller_configuration.get("subaerial_backend", "numexpr")
+
         #Get the float value for water surface ellipsoid height. In meters, positive up. 
         self.water_surface_ellipsoid_height = controller_configuration["water_surface_ellipsoid_height"]
 
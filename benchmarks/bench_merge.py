@@ -0,0 +1,125 @@
+"""
+Benchmark of the SBET↔LAS timestamp matching (see Merge.match_timestamps)
+
+Matches the points of a synthetic flight line to a synthetic 200 Hz
+trajectory in which a fraction of the epochs (10% by default) repeat the
+time tick of the previous epoch, as in PILLS trajectories or overlapping
+SBET files, and reports the throughput in points/sec of the match and of
+the tie-break of the points matched to duplicate ticks, along with the
+throughput of the per-point tie-break loop that match_timestamps used
+before the tie-break was vectorized.
+
+usage: python benchmarks/bench_merge.py [-num_points N] [-dup_fraction F] [-repeat R]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import utils  # noqa: E402
+from Las import LasPoints  # noqa: E402
+from Merge import Merge  # noqa: E402
+
+
+def make_trajectory(duration, dup_fraction, rate=200.0, seed=0):
+    """sbet data (see Merge.merge) of a platform flying along x, with duplicate time ticks"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(0, duration, 1.0 / rate)
+    dup = rng.random(t.size) < dup_fraction
+    dup[0] = False
+    t[dup] = t[np.flatnonzero(dup) - 1]  # repeat the tick of the previous epoch
+    sbet_data = np.zeros((t.size, 15))
+    sbet_data[:, 0] = t
+    sbet_data[:, 3] = 1000.0 + 50.0 * t + rng.normal(0, 0.5, t.size)
+    sbet_data[:, 4] = 2000.0 + rng.normal(0, 0.5, t.size)
+    sbet_data[:, 5] = 600.0 + rng.normal(0, 0.1, t.size)
+    return sbet_data
+
+
+def make_flight_line(num_points, duration, seed=1):
+    """las data (see Las.get_flight_line) of a flight line, sorted by time"""
+    rng = np.random.default_rng(seed)
+    t = np.sort(rng.uniform(0, duration, num_points))
+    return LasPoints(
+        {
+            "x": 1000.0 + 50.0 * t + rng.uniform(-200, 200, num_points),
+            "y": 2000.0 + rng.uniform(-200, 200, num_points),
+            "z": rng.normal(0, 2, num_points),
+            "t": t,
+            "classification": np.zeros(num_points, dtype=np.uint8),
+        }
+    )
+
+
+def tie_break_loop(left, right, xs, ys, zs, xl, yl, zl):
+    """the per-point tie-break match_timestamps used before get_nearest_candidates"""
+    idx = np.empty(left.size, dtype=np.int64)
+    for j in range(left.size):
+        l = int(left[j]); r = int(right[j])
+        dx = xs[l:r] - xl[j]
+        dy = ys[l:r] - yl[j]
+        dz = zs[l:r] - zl[j]
+        idx[j] = l + int(np.argmin(dx*dx + dy*dy + dz*dz))
+    return idx
+
+
+def best_time(f, repeat):
+    times = []
+    for __ in range(repeat):
+        tic = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - tic)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SBET/LAS timestamp matching.")
+    parser.add_argument("-num_points", default=2_000_000, type=int, help="Number of points of the flight line.")
+    parser.add_argument("-dup_fraction", default=0.1, type=float, help="Fraction of duplicate trajectory ticks.")
+    parser.add_argument("-repeat", default=3, type=int, help="Number of matches (the best time is reported).")
+    args = parser.parse_args()
+
+    if not hasattr(logging, "TPU"):
+        utils.CustomLogger()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    duration = 600.0  # seconds
+    sbet_data = make_trajectory(duration, args.dup_fraction)
+    las_data = make_flight_line(args.num_points, duration)
+    merge = Merge(SimpleNamespace(a_std_dev=0.02, b_std_dev=0.02, std_rho=0.025))
+
+    sbet_ticks = merge.get_sbet_ticks(sbet_data)
+    idx, mask, __ = merge.match_timestamps(sbet_data, las_data, sbet_ticks=sbet_ticks)
+
+    # the candidate rows of the points matched to duplicate ticks
+    t_sbet_i = sbet_ticks[0]
+    left = np.searchsorted(t_sbet_i, t_sbet_i[idx[mask]], side="left")
+    right = np.searchsorted(t_sbet_i, t_sbet_i[idx[mask]], side="right")
+    dup = (right - left) > 1
+    xl, yl, zl = las_data["x"][mask][dup], las_data["y"][mask][dup], las_data["z"][mask][dup]
+    candidates = (left[dup], right[dup], sbet_data[:, 3], sbet_data[:, 4], sbet_data[:, 5], xl, yl, zl)
+    num_dup = int(np.count_nonzero(dup))
+    print(f"{num_dup:,} of {args.num_points:,} points matched to duplicate ticks")
+
+    assert np.array_equal(tie_break_loop(*candidates), Merge.get_nearest_candidates(*candidates))
+
+    secs = best_time(lambda: tie_break_loop(*candidates), args.repeat)
+    print("{:>22}: {:12,.0f} points/sec".format("tie-break loop", num_dup / secs))
+
+    secs = best_time(lambda: Merge.get_nearest_candidates(*candidates), args.repeat)
+    print("{:>22}: {:12,.0f} points/sec".format("get_nearest_candidates", num_dup / secs))
+
+    secs = best_time(lambda: merge.match_timestamps(sbet_data, las_data, sbet_ticks=sbet_ticks), args.repeat)
+    print("{:>22}: {:12,.0f} points/sec".format("match_timestamps", args.num_points / secs))
+
+
+if __name__ == "__main__":
+    main()
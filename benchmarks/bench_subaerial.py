@@ -0,0 +1,127 @@
+"""
+Benchmark of the subaerial kernels (see Subaerial.Jacobian)
+
+Evaluates the Jacobian of a synthetic flight line with the cse and terms
+kernels and reports the time of each evaluation and the largest difference
+between the kernels, relative to the largest value of the Jacobian.  The
+preparation shared by the kernels (rho, a, b, the polynomial surface fit, and
+the trig terms, see Jacobian.get_calc_vals_for_J_eval) is timed separately.
+
+Then calculates the subaerial THU and TVU of the flight line with each kernel
+(including the fused kernel) and reports the time, the peak memory allocated
+during the calculation, and the largest relative difference from the terms
+kernel.
+
+usage: python benchmarks/bench_subaerial.py [-num_points N] [-repeat R]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import utils  # noqa: E402
+from Subaerial import Jacobian, SensorModel, Subaerial  # noqa: E402
+
+
+def make_flight_line(num_points, seed=0):
+    """merged lidar/trajectory data (see Subaerial) of a straight flight line"""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, num_points / 500_000, num_points)  # 500 kHz pulse rate
+    data = np.empty((11, num_points))
+    data[0] = t
+    data[1] = t
+    data[5] = 1000.0 + 60.0 * t
+    data[6] = 2000.0
+    data[7] = 600.0
+    data[2] = data[5] + rng.uniform(-250, 250, num_points)
+    data[3] = data[6] + rng.uniform(-250, 250, num_points)
+    data[4] = rng.normal(0, 2, num_points)
+    data[8:10] = np.radians(rng.normal(0, 1, (2, num_points)))
+    data[10] = np.radians(90.0 + rng.normal(0, 0.5, num_points))
+    return data
+
+
+def make_stddev(num_points, seed=0):
+    """standard deviations of the merged data variables (see Subaerial)"""
+    rng = np.random.default_rng(seed)
+    stddev = np.empty((9, num_points))
+    stddev[0:2] = np.radians(0.025)
+    stddev[2:5] = np.radians(np.abs(rng.normal(0.005, 0.001, (3, num_points))))
+    stddev[5:8] = np.abs(rng.normal(0.02, 0.005, (3, num_points)))
+    stddev[8] = 0.02
+    return stddev
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the subaerial Jacobian kernels.")
+    parser.add_argument("-num_points", default=10_000_000, type=int, help="Number of points of the flight line.")
+    parser.add_argument("-repeat", default=3, type=int, help="Number of evaluations per kernel (the best time is reported).")
+    parser.add_argument("-eval_type", default="numexpr", choices=SensorModel.eval_types, help="Numeric backend of the sensor model.")
+    args = parser.parse_args()
+
+    if not hasattr(logging, "TPU"):
+        utils.CustomLogger()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    data = make_flight_line(args.num_points)
+    sensor_model = SensorModel("Riegl VQ-880-G (1.0 mrad)", args.eval_type)
+
+    jacobian = Jacobian(sensor_model)
+    tic = time.perf_counter()
+    J_param_values = jacobian.get_calc_vals_for_J_eval(data)
+    print("{:>6}: {:8.3f} sec ({:,} points)".format("prep", time.perf_counter() - tic, args.num_points))
+
+    kernels = {"cse": jacobian.eval_jacobian_cse, "terms": jacobian.eval_jacobian_terms}
+    results = {}
+    for kernel, eval_jacobian in kernels.items():
+        times = []
+        for __ in range(args.repeat):
+            results.pop(kernel, None)
+            tic = time.perf_counter()
+            results[kernel] = eval_jacobian(J_param_values, args.num_points)
+            times.append(time.perf_counter() - tic)
+        print("{:>6}: {:8.3f} sec".format(kernel, min(times)))
+
+    reference = results.pop("terms")
+    for kernel, J_eval in results.items():
+        rel_diff = max(
+            np.max(np.abs(J - J_ref)) / np.max(np.abs(J_ref))
+            for J, J_ref in zip(J_eval, reference)
+        )
+        print("{:>6}: max relative difference from terms {:.2e}".format(kernel, rel_diff))
+    del results, reference, J_param_values
+
+    print("\nsubaerial thu/tvu")
+    stddev = make_stddev(args.num_points)
+    results = {}
+    for kernel in Jacobian.kernels:
+        jacobian = Jacobian(sensor_model, kernel)
+        times = []
+        for __ in range(args.repeat):
+            results.pop(kernel, None)
+            tracemalloc.start()
+            tic = time.perf_counter()
+            results[kernel] = Subaerial(jacobian, data, stddev).calc_subaerial_tpu()
+            times.append(time.perf_counter() - tic)
+            __, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print("{:>6}: {:8.3f} sec, peak {:,.0f} MB".format(kernel, min(times), peak / 2**20))
+
+    reference = results["terms"]
+    for kernel in ("cse", "fused"):
+        rel_diff = max(
+            np.max(np.abs(u - u_ref) / u_ref) for u, u_ref in zip(results[kernel], reference)
+        )
+        print("{:>6}: max relative difference from terms {:.2e}".format(kernel, rel_diff))
+
+
+if __name__ == "__main__":
+    main()
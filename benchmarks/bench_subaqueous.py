@@ -0,0 +1,104 @@
+"""
+Benchmark of the subaqueous lookup table fits (see Subaqueous)
+
+Fits the subaqueous TVU, THU, and range bias of a synthetic flight line
+with Subaqueous.fit_lut and reports the throughput in points/sec, along
+with the throughput of the per-point classification loop that fit_lut
+used before the classification mask was vectorized.
+
+Then fits the subaqueous TVU and THU of the flight line with the multi
+beam look up tables (Subaqueous.multi_beam_fit_lut), with random fan angles,
+and with the HawkEye look up tables (Subaqueous.hawkeye_fit_lut), with
+random scanner channels and user data.
+
+usage: python benchmarks/bench_subaqueous.py [-num_points N] [-repeat R]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import utils  # noqa: E402
+from Sensor import Sensor  # noqa: E402
+from Subaqueous import Subaqueous  # noqa: E402
+
+
+def make_flight_line(num_points, seed=0):
+    """depth, classification, fan angle, and HawkEye channel data of a flight line, about half of it subaqueous"""
+    rng = np.random.default_rng(seed)
+    depth = rng.uniform(0, 30, num_points)
+    classification = rng.choice([2.0, 40.0, 41.0, 43.0, 45.0], num_points)  # as in the merged las data
+    fan_angle = rng.integers(0, 27, num_points)  # rounded absolute fan angle (see Merge.merge)
+    hawkeye_data = np.vstack(  # scanner channel and user data
+        (rng.choice([1.0, 2.0, 3.0], num_points), rng.choice([0.0, 1.0], num_points))
+    )
+    return depth, classification, fan_angle, hawkeye_data
+
+
+def classification_loop(subaqueous, res_tvu, res_thu, res_range_bias):
+    """the per-point classification check fit_lut used before the classification mask"""
+    for i, classification in enumerate(subaqueous.classification):
+        if classification not in subaqueous.gui_object.subaqueous_classes:
+            res_thu[i] = 0
+            res_tvu[i] = 0
+            res_range_bias[i] = 0
+
+
+def best_time(f, repeat):
+    times = []
+    for __ in range(repeat):
+        tic = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - tic)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the subaqueous lookup table fits.")
+    parser.add_argument("-num_points", default=2_000_000, type=int, help="Number of points of the flight line.")
+    parser.add_argument("-repeat", default=3, type=int, help="Number of fits (the best time is reported).")
+    args = parser.parse_args()
+
+    if not hasattr(logging, "TPU"):
+        utils.CustomLogger()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    os.chdir(REPO_DIR)  # the lookup table paths are relative to the repository
+    gui_object = SimpleNamespace(wind_ind=1, kd_ind=2, subaqueous_classes=[40, 43])
+    sensor_object = Sensor("Riegl VQ-880-G (1.0 mrad)")
+    depth, classification, fan_angle, hawkeye_data = make_flight_line(args.num_points)
+
+    subaqueous = Subaqueous(gui_object, depth, sensor_object, classification)
+    res_tvu, res_thu, res_range_bias = subaqueous.fit_lut()
+
+    secs = best_time(lambda: classification_loop(subaqueous, res_tvu, res_thu, res_range_bias), args.repeat)
+    print("{:>20}: {:12,.0f} points/sec".format("classification loop", args.num_points / secs))
+
+    secs = best_time(lambda: Subaqueous(gui_object, depth, sensor_object, classification).fit_lut(), args.repeat)
+    print("{:>20}: {:12,.0f} points/sec".format("fit_lut", args.num_points / secs))
+
+    multi_beam_sensor = Sensor("PILLS or RAMMS")
+    secs = best_time(
+        lambda: Subaqueous(gui_object, depth, multi_beam_sensor, classification).multi_beam_fit_lut(fan_angle),
+        args.repeat,
+    )
+    print("{:>20}: {:12,.0f} points/sec".format("multi_beam_fit_lut", args.num_points / secs))
+
+    hawkeye_sensor = Sensor("HawkEye 4X or 5 400m AGL")
+    secs = best_time(
+        lambda: Subaqueous(gui_object, depth, hawkeye_sensor, classification).hawkeye_fit_lut(hawkeye_data),
+        args.repeat,
+    )
+    print("{:>20}: {:12,.0f} points/sec".format("hawkeye_fit_lut", args.num_points / secs))
+
+
+if __name__ == "__main__":
+    main()
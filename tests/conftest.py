@@ -0,0 +1,123 @@
+"""
+Shared fixtures for the cBLUE tests.
+
+The tests use the LAS snippet in test_data/ together with a synthetic
+trajectory (a platform flying over the snippet at a constant altitude),
+because the trajectory snippet is not distributed with the repository.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import utils  # noqa: E402
+
+if not hasattr(logging, "TPU"):
+    utils.CustomLogger()
+
+LAS_SNIPPET = os.path.join(REPO_DIR, "test_data", "las_snippet_fl.las")
+
+SBET_COLUMNS = [
+    "time", "lon", "lat", "X", "Y", "Z", "roll", "pitch", "heading",
+    "stdX", "stdY", "stdZ", "stdroll", "stdpitch", "stdheading",
+]
+
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # lidar_sensors.json and the lookup tables are resolved against the cwd
+    monkeypatch.chdir(REPO_DIR)
+
+
+def make_sbet_data(las_file, rate=200.0, buff=30.0, seed=0):
+    """synthetic trajectory covering the time span of las_file"""
+    import laspy
+
+    las = laspy.read(las_file)
+    rng = np.random.default_rng(seed)
+    t0, t1 = las.gps_time.min() - buff, las.gps_time.max() + buff
+    t = np.arange(t0, t1, 1.0 / rate)
+    n = t.size
+    x_mid = 0.5 * (las.x.min() + las.x.max())
+    y_mid = 0.5 * (las.y.min() + las.y.max())
+    data = {
+        "time": t,
+        "lon": np.full(n, -80.1),
+        "lat": np.full(n, 25.9),
+        "X": np.interp(t, [t0, t1], [x_mid - 150, x_mid + 150]),
+        "Y": np.full(n, y_mid) + rng.normal(0, 0.01, n),
+        "Z": np.full(n, 600.0),
+        "roll": rng.normal(0, 1, n),
+        "pitch": rng.normal(0, 1, n),
+        "heading": 90.0 + rng.normal(0, 0.5, n),
+    }
+    for col in SBET_COLUMNS[9:]:
+        data[col] = np.abs(rng.normal(0.02, 0.005, n))
+    return pd.DataFrame(data, columns=SBET_COLUMNS)
+
+
+@pytest.fixture
+def sbet_data():
+    return make_sbet_data(LAS_SNIPPET)
+
+
+@pytest.fixture
+def las_dir(tmp_path):
+    """copy of the LAS snippet with two flight lines and subaqueous points"""
+    import laspy
+
+    las = laspy.read(LAS_SNIPPET)
+    n = len(las.points)
+    rng = np.random.default_rng(1)
+    las.point_source_id = np.where(np.arange(n) % 3 == 0, 11, 12).astype(np.uint16)
+    classification = np.array(las.classification)
+    classification[rng.random(n) < 0.5] = 40
+    las.classification = classification
+    las.scanner_channel = rng.choice([1, 2, 3], n).astype(np.uint8)
+    las.user_data = rng.choice([0, 1], n).astype(np.uint8)
+    las.scan_angle = (rng.uniform(-25, 25, n) / 0.006).astype(np.int16)
+    las_dir = tmp_path / "las"
+    las_dir.mkdir()
+    las.write(str(las_dir / "tile_a.las"))
+    return las_dir
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    out_dir = tmp_path / "tpu"
+    out_dir.mkdir()
+    return out_dir
+
+
+def make_config(las_dir, out_dir, sensor="Riegl VQ-880-G (1.0 mrad)", **kwargs):
+    with open(os.path.join(REPO_DIR, "cblue_configuration.json")) as f:
+        config = json.load(f)
+    config.update(
+        {
+            "directories": {"sbet": "", "las": str(las_dir), "tpu": str(out_dir)},
+            "wind_ind": 1,
+            "wind_selection": "Light Breeze (4-8] kts",
+            "kd_ind": 2,
+            "kd_selection": "Moderate (0.15-0.21] m^-1",
+            "vdatum_region": "test",
+            "mcu": 5,
+            "vuc": 0.0,
+            "huc": 0.0,
+            "sensor_model": sensor,
+            "csv_option": False,
+            "las_option": True,
+            "laz_option": False,
+            "water_surface_ellipsoid_height": 150.0,
+        }
+    )
+    config.update(kwargs)
+    return config
@@ -0,0 +1,142 @@
+import json
+import tracemalloc
+
+import laspy
+import numpy as np
+import pytest
+
+from Merge import Merge
+from Sbet import SBET_COLUMNS, Sbet
+from Sensor import Sensor
+from Subaerial import Jacobian, PolySurfFit, SensorModel
+from Tpu import Tpu
+from UserInput import UserInput
+
+from conftest import make_config
+
+SENSORS = [
+    "Riegl VQ-880-G (1.0 mrad)",
+    "HawkEye 4X or 5 500m AGL",
+    "PILLS or RAMMS",
+]
+
+
+def run_tpu(las_file, out_dir, sbet_data, sensor, **kwargs):
+    config = make_config(las_file.parent, out_dir, sensor=sensor, **kwargs)
+    sensor_object = Sensor(sensor)
+    tpu = Tpu(UserInput(config), sensor_object)
+    jacobian = Jacobian(SensorModel(sensor))
+    tpu.calc_tpu((sbet_data, str(las_file), jacobian, Merge(sensor_object)))
+    return tpu
+
+
+def make_big_tile(las_file, out_file, copies):
+    """tile with each point of las_file repeated copies times (same time span)"""
+    las = laspy.read(str(las_file))
+    points = las.points.array
+    big = laspy.LasData(las.header)
+    big.points = laspy.ScaleAwarePointRecord(
+        np.tile(points, copies), las.point_format, las.header.scales, las.header.offsets
+    )
+    big.gps_time = big.gps_time + np.repeat(np.arange(copies) * 1e-5, len(points))
+    big.write(str(out_file))
+
+
+@pytest.mark.parametrize("sensor", SENSORS)
+def test_chunked_matches_whole_tile(tmp_path, las_dir, sbet_data, sensor):
+    las_file = las_dir / "tile_a.las"
+
+    whole_dir = tmp_path / "whole"
+    whole_dir.mkdir()
+    whole = run_tpu(las_file, whole_dir, sbet_data, sensor, csv_option=True)
+
+    chunked_dir = tmp_path / "chunked"
+    chunked_dir.mkdir()
+    chunked = run_tpu(las_file, chunked_dir, sbet_data, sensor, csv_option=True, chunk_size=7_000)
+
+    expected = laspy.read(str(whole_dir / "tile_a_TPU.las"))
+    actual = laspy.read(str(chunked_dir / "tile_a_TPU.las"))
+
+    assert actual.header.point_count == expected.header.point_count
+    assert np.array_equal(actual.points.array[["X", "Y", "Z", "gps_time"]],
+                          expected.points.array[["X", "Y", "Z", "gps_time"]])
+    np.testing.assert_allclose(actual.total_thu, expected.total_thu, rtol=1e-5)
+    np.testing.assert_allclose(actual.total_tvu, expected.total_tvu, rtol=1e-5)
+
+    assert list(chunked.flight_line_stats) == list(whole.flight_line_stats)
+
+    with open(whole_dir / "tile_a_TPU.csv") as f_whole, open(chunked_dir / "tile_a_TPU.csv") as f_chunked:
+        assert len(f_chunked.readlines()) == len(f_whole.readlines())
+
+    with open(chunked_dir / "tile_a.json") as f:
+        assert json.load(f)["Flight line stats (min max mean stddev)"]
+
+
+def test_chunked_flight_line_not_merged(tmp_path, las_dir, sbet_data):
+    las_file = las_dir / "tile_a.las"
+    sensor = SENSORS[0]
+
+    # trajectory that only covers the first half of the tile
+    sbet_half = sbet_data.iloc[: len(sbet_data) // 2]
+    run_tpu(las_file, tmp_path, sbet_half, sensor, chunk_size=7_000)
+    actual = laspy.read(str(tmp_path / "tile_a_TPU.las"))
+
+    (tmp_path / "whole").mkdir()
+    run_tpu(las_file, tmp_path / "whole", sbet_half, sensor)
+    expected = laspy.read(str(tmp_path / "whole" / "tile_a_TPU.las"))
+
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+
+
+def test_chunks_take_their_own_trajectory(tmp_path, las_dir, sbet_data):
+    las_file = las_dir / "tile_a.las"
+    sensor = SENSORS[0]
+    run_tpu(las_file, tmp_path, sbet_data, sensor, chunk_size=7_000)
+    expected = laspy.read(str(tmp_path / "tile_a_TPU.las"))
+
+    # each chunk takes the trajectory rows of its time range from the whole trajectory
+    sbet = Sbet(str(tmp_path), sensor)
+    sbet.data = sbet_data[SBET_COLUMNS].reset_index(drop=True)
+    (tmp_path / "sbet").mkdir()
+    run_tpu(las_file, tmp_path / "sbet", sbet, sensor, chunk_size=7_000)
+    actual = laspy.read(str(tmp_path / "sbet" / "tile_a_TPU.las"))
+
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+
+
+def test_poly_surf_fit_matches_single_fit():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    a = rng.uniform(-0.3, 0.3, n)
+    b = rng.uniform(-0.3, 0.3, n)
+    d = rng.normal(0, 0.05, (3, n))
+    key = rng.integers(0, 2**40, n)
+
+    fit = PolySurfFit()
+    for chunk in np.array_split(np.arange(n), 7):
+        fit.add(a[chunk], b[chunk], d[0][chunk], d[1][chunk], d[2][chunk], key[chunk])
+
+    sel = key % 10 == 0
+    A = SensorModel.poly_surf_design_matrix(a[sel], b[sel])
+    for coeffs, d_i in zip(fit.solve(), d):
+        expected, __, __, __ = np.linalg.lstsq(A, d_i[sel], rcond=None)
+        np.testing.assert_allclose(coeffs, expected, rtol=1e-6, atol=1e-9)
+
+
+def test_chunked_peak_memory_is_bounded(tmp_path, las_dir, sbet_data):
+    sensor = SENSORS[0]
+    peaks = {}
+    for copies in (1, 4):
+        tile_dir = tmp_path / f"tile_{copies}"
+        tile_dir.mkdir()
+        las_file = tile_dir / "tile_a.las"
+        make_big_tile(las_dir / "tile_a.las", las_file, copies)
+
+        tracemalloc.start()
+        run_tpu(las_file, tile_dir, sbet_data, sensor, chunk_size=5_000)
+        peaks[copies] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    # the tile is 4x bigger, but the peak memory only depends on the chunk size
+    assert peaks[4] < 1.5 * peaks[1]
@@ -0,0 +1,89 @@
+import os
+
+import laspy
+import numpy as np
+
+import Las as las_module
+from Las import Las, LasPoints
+from Merge import Merge
+from Sbet import SBET_COLUMNS, Sbet
+from Sensor import Sensor
+from Subaerial import Jacobian, SensorModel
+from Tpu import Tpu
+from UserInput import UserInput
+
+from conftest import LAS_SNIPPET, make_config
+
+
+def test_time_range_matches_decoded_points():
+    t = laspy.read(LAS_SNIPPET).gps_time
+    time_min, time_max = Las(LAS_SNIPPET, time_offset=-1e9).get_time_range()
+    assert time_min == t.min() - 1e9
+    assert time_max == t.max() - 1e9
+
+
+def test_read_stats():
+    las = Las(LAS_SNIPPET)
+    assert las.num_reads == 1
+    assert las.bytes_read == os.path.getsize(LAS_SNIPPET)
+    assert las.decoded_bytes == las.inFile.points.array.nbytes
+
+
+def test_tile_is_decoded_once(tmp_path, monkeypatch, las_dir, out_dir, sbet_data):
+    reads = []
+    laspy_read = laspy.read
+
+    def counting_read(*args, **kwargs):
+        reads.append(args[0])
+        return laspy_read(*args, **kwargs)
+
+    monkeypatch.setattr(las_module.laspy, "read", counting_read)
+    monkeypatch.setattr(Las, "decoded_file_bytes", {})
+
+    config = make_config(las_dir, out_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    tpu = Tpu(UserInput(config), sensor_object)
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+    las_file = str(las_dir / "tile_a.las")
+
+    # the tile takes its trajectory rows from the whole trajectory once it is decoded
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.data = sbet_data[SBET_COLUMNS].reset_index(drop=True)
+    tpu.calc_tpu((sbet, las_file, jacobian, Merge(sensor_object)))
+
+    assert reads == [las_file]
+    header = laspy.open(las_file).header
+    assert Las.decoded_file_bytes == {las_file: header.point_count * header.point_format.size}
+    out_las = laspy_read(str(out_dir / "tile_a_TPU.las"))
+    assert np.all(np.asarray(out_las.total_thu) > 0)
+
+
+def test_flight_line_columns():
+    las = Las(LAS_SNIPPET)
+    points = las.inFile.points
+
+    las_data, flight_lines = las.get_flight_line("single")
+    assert set(las_data.columns) == {"x", "y", "z", "t", "classification"}
+    assert len(las_data) == las.num_file_points
+    np.testing.assert_array_equal(las_data["x"], las.inFile.x)
+    np.testing.assert_array_equal(las_data["t"], points["gps_time"])
+
+    # the integer fields keep their las dtypes, and the fields read as they are aren't copied
+    assert las_data["classification"].dtype == np.uint8
+    assert np.shares_memory(las_data["classification"], points.array)
+    assert np.shares_memory(las_data["t"], points.array)
+
+    hawkeye_data, __ = las.get_flight_line("single_hawkeye")
+    assert hawkeye_data["scanner_channel"].dtype == hawkeye_data["user_data"].dtype == np.uint8
+    multi_data, __ = las.get_flight_line("multi")
+    assert multi_data["scan_angle"].dtype == np.int16
+
+    # a subset of the points, and the records shared with the worker processes
+    subset = hawkeye_data[np.arange(0, len(hawkeye_data), 7)]
+    records = subset.to_records(las_idx=np.arange(len(subset)))
+    block = LasPoints.from_records(records, 10, 20)
+    for name, col in subset.columns.items():
+        assert block[name].dtype == col.dtype
+        assert block[name].flags.c_contiguous
+        np.testing.assert_array_equal(block[name], col[10:20])
+    np.testing.assert_array_equal(block["las_idx"], np.arange(10, 20))
@@ -0,0 +1,107 @@
+import numpy as np
+
+from Las import Las, LasPoints
+from Merge import Merge
+from Sensor import Sensor
+
+SENSOR = "Riegl VQ-880-G (1.0 mrad)"
+
+
+def test_get_sort_order():
+    assert Merge.get_sort_order(np.array([1.0, 2.0, 2.0, 3.0])) is None
+    assert Merge.get_sort_order(np.array([])) is None
+
+    a = np.array([3.0, 1.0, 2.0, 1.0])
+    np.testing.assert_array_equal(Merge.get_sort_order(a), [1, 3, 2, 0])
+
+
+def test_match_tile_matches_flight_line_merge(las_dir, sbet_data):
+    sensor_object = Sensor(SENSOR)
+    merge = Merge(sensor_object)
+    las = Las(str(las_dir / "tile_a.las"))
+    las_data, flight_lines = las.get_flight_line(sensor_object.type)
+    sbet = sbet_data.values
+
+    # unsorted las points and an unsorted trajectory
+    rng = np.random.default_rng(0)
+    las_data = LasPoints({**las_data.columns, "t": rng.permutation(las_data["t"])})
+    sbet = sbet[rng.permutation(sbet.shape[0])]
+
+    tile_match = merge.match_tile(sbet, las_data, flight_lines)
+    for fl in las.unq_flight_lines:
+        fl_idx = np.flatnonzero(flight_lines == fl)
+        expected = merge.merge(las.las_short_name, fl, sbet, las_data[fl_idx], fl_idx, sensor_object)
+
+        fl_las, fl_las_idx, fl_match = tile_match.get_flight_line(fl)
+        assert np.all(np.diff(fl_las["t"]) >= 0)
+        actual = merge.merge(las.las_short_name, fl, sbet, fl_las, fl_las_idx, sensor_object, match=fl_match)
+
+        for row in range(11):
+            np.testing.assert_array_equal(actual[0][row], expected[0][row])
+        for row in range(9):
+            np.testing.assert_array_equal(actual[1][row], expected[1][row])
+        for a, e in zip(actual[2:4], expected[2:4]):
+            np.testing.assert_array_equal(a, e)
+
+    # the tile match of sorted points doesn't copy them
+    las_data = las_data[np.argsort(las_data["t"], kind="mergesort")]
+    tile_match = merge.match_tile(sbet, las_data, flight_lines, tile_match.sbet_ticks)
+    assert tile_match.las_data is las_data
+
+
+def test_get_nearest_candidates():
+    rng = np.random.default_rng(0)
+    xs, ys, zs = rng.integers(0, 3, (3, 50)).astype(float)  # with equally near candidates
+    left = rng.integers(0, 45, 1_000)
+    right = left + rng.integers(1, 6, left.size)
+    xl, yl, zl = rng.integers(0, 3, (3, left.size)).astype(float)
+
+    expected = [
+        l + np.argmin((xs[l:r] - x) ** 2 + (ys[l:r] - y) ** 2 + (zs[l:r] - z) ** 2)
+        for l, r, x, y, z in zip(left, right, xl, yl, zl)
+    ]
+    actual = Merge.get_nearest_candidates(left, right, xs, ys, zs, xl, yl, zl)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_merged_data(las_dir, sbet_data):
+    sensor_object = Sensor(SENSOR)
+    merge = Merge(sensor_object)
+    las = Las(str(las_dir / "tile_a.las"))
+    las_data, flight_lines = las.get_flight_line(sensor_object.type)
+    sbet = sbet_data.values
+    fl_idx = np.flatnonzero(flight_lines == las.unq_flight_lines[0])
+    fl_las = las_data[fl_idx]
+
+    data, stddev, fl_las_idx, __, __, __ = merge.merge(las.las_short_name, 0, sbet, fl_las, fl_idx, sensor_object)
+    assert data.shape == (11, fl_las_idx.size)
+    assert stddev.shape == (9, fl_las_idx.size)
+
+    # the rows of the merged data array
+    i = data.sbet_idx
+    las_rows = fl_las[np.argsort(fl_las["t"], kind="mergesort")]
+    expected = np.asarray(
+        [sbet[i, 0]]
+        + [las_rows[col] for col in ("t", "x", "y", "z")]
+        + [sbet[i, col] for col in (3, 4, 5)]
+        + [np.radians(sbet[i, col]) for col in (6, 7, 8)]
+    )
+    for row in range(11):
+        np.testing.assert_array_equal(data[row], expected[row])
+
+    # the constant standard deviations are scalars
+    assert stddev[0] == np.radians(sensor_object.a_std_dev)
+    assert stddev[1] == np.radians(sensor_object.b_std_dev)
+    assert stddev[8] == sensor_object.std_rho
+    np.testing.assert_array_equal(stddev[2], np.radians(sbet[i, 12]))
+    np.testing.assert_array_equal(stddev[7], sbet[i, 11])
+    stddev_array = stddev.to_array()
+    assert stddev_array.shape == (9, fl_las_idx.size)
+    np.testing.assert_array_equal(stddev_array[8], sensor_object.std_rho)
+
+    # a subset of the points
+    points = np.arange(fl_las_idx.size) % 3 == 0
+    subset = data[:, points]
+    assert subset.shape == (11, np.count_nonzero(points))
+    for row in (0, 4, 9):
+        np.testing.assert_array_equal(subset[row], expected[row][points])
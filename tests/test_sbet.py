@@ -0,0 +1,241 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Merge import Merge
+from Sbet import SBET_DTYPE, SMRMSG_DTYPE, Sbet
+
+
+def write_binary_sbet(sbet_dir, name, t, lat, lon, heading, wander=0.0):
+    sbet = np.zeros(t.size, dtype=SBET_DTYPE)
+    sbet["time"] = t
+    sbet["lat"] = np.radians(lat)
+    sbet["lon"] = np.radians(lon)
+    sbet["alt"] = 600.0
+    sbet["roll"] = np.radians(1.5)
+    sbet["pitch"] = np.radians(-0.5)
+    sbet["heading"] = np.radians(heading)
+    sbet["wander"] = np.radians(wander)
+    sbet.tofile(str(sbet_dir / name))
+
+    # smrmsg records are logged at a lower rate than the sbet records
+    t_smrmsg = t[::10]
+    smrmsg = np.zeros(t_smrmsg.size, dtype=SMRMSG_DTYPE)
+    smrmsg["time"] = t_smrmsg
+    smrmsg["north_std"] = 0.02
+    smrmsg["east_std"] = 0.03
+    smrmsg["down_std"] = np.linspace(0.04, 0.05, t_smrmsg.size)
+    smrmsg["roll_std"] = 0.3  # arc-minutes
+    smrmsg["pitch_std"] = 0.6
+    smrmsg["heading_std"] = 1.2
+    smrmsg.tofile(str(sbet_dir / name.replace("sbet", "smrmsg")))
+
+
+def test_geodetic_to_utm():
+    easting, northing = Sbet.geodetic_to_utm(
+        np.radians(np.array([25.9, -33.9])), np.radians(np.array([-80.1, 18.4])), 17
+    )
+    assert easting[0] == pytest.approx(590148.3299, abs=1e-3)
+    assert northing[0] == pytest.approx(2864918.8302, abs=1e-3)
+
+    easting, northing = Sbet.geodetic_to_utm(np.radians([-33.9]), np.radians([18.4]), 34)
+    assert easting[0] == pytest.approx(259583.2217, abs=1e-3)
+    assert northing[0] == pytest.approx(6245888.0455, abs=1e-3)
+
+
+def test_binary_sbet(tmp_path):
+    t = 300000.0 + np.arange(50) * 0.005  # GPS seconds-of-week
+    lat = np.full(t.size, 25.9)
+    lon = np.linspace(-80.1, -80.09, t.size)
+    write_binary_sbet(tmp_path, "20160517_sbet_mission1.out", t, lat, lon, np.full(t.size, -90.0))
+
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    assert sbet.sbet_files == [str(tmp_path / "20160517_sbet_mission1.out")]
+    sbet.set_data()
+
+    data = sbet.data
+    assert list(data.columns[:3]) == ["time", "lon", "lat"]
+    assert len(data) == t.size
+    np.testing.assert_allclose(data.time, sbet.gps_sow_to_gps_adj([2016, 5, 17], t))
+    np.testing.assert_allclose(data.lon, lon)
+    assert data.X[0] == pytest.approx(590148.3299, abs=1e-3)
+    assert data.Y[0] == pytest.approx(2864918.8302, abs=1e-3)
+    np.testing.assert_allclose(data.Z, 600.0)
+    np.testing.assert_allclose(data.roll, 1.5)
+    np.testing.assert_allclose(data.heading, 270.0)
+    np.testing.assert_allclose(data.stdX, 0.03)
+    np.testing.assert_allclose(data.stdY, 0.02)
+    assert 0.04 <= data.stdZ.min() and data.stdZ.max() <= 0.05
+    np.testing.assert_allclose(data.stdroll, 0.005)
+    np.testing.assert_allclose(data.stdheading, 0.02)
+
+
+def test_binary_sbet_wander_angle(tmp_path):
+    t = 300000.0 + np.arange(50) * 0.005
+    lat = np.full(t.size, 25.9)
+    lon = np.linspace(-80.1, -80.09, t.size)
+    # platform heading in the wander azimuth frame
+    wander = np.linspace(-30.0, 40.0, t.size)
+    write_binary_sbet(tmp_path, "20160517_sbet_mission1.out", t, lat, lon, np.full(t.size, 10.0), wander)
+
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.set_data()
+    np.testing.assert_allclose(sbet.data.heading, (10.0 - wander) % 360)
+
+
+def test_binary_sbet_without_smrmsg(tmp_path):
+    np.zeros(10, dtype=SBET_DTYPE).tofile(str(tmp_path / "20160517_sbet_mission1.out"))
+
+    with pytest.raises(FileNotFoundError):
+        Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)").set_data()
+
+
+def write_ascii_sbet(sbet_dir, sbet_data):
+    sbet_file = sbet_dir / "20160517_880_p_sbet_lidar_tpu.txt"
+    sbet_data.to_csv(str(sbet_file), sep=" ", header=False, index=False)
+    return sbet_file
+
+
+def test_trajectory_cache(tmp_path, sbet_data, monkeypatch):
+    sbet_file = write_ascii_sbet(tmp_path, sbet_data)
+    sensor = "Riegl VQ-880-G (1.0 mrad)"
+
+    cold = Sbet(str(tmp_path), sensor)
+    cold.set_data()
+    cache_file = cold.get_cache_file()
+    assert os.path.isfile(cache_file)
+
+    # a warm start memory maps the cache instead of parsing the sbet files
+    def read_csv(*args, **kwargs):
+        raise AssertionError("trajectory file parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, "read_csv", read_csv)
+        warm = Sbet(str(tmp_path), sensor)
+        warm.set_data()
+
+    pd.testing.assert_frame_equal(warm.data, cold.data)
+    assert warm.file_spans == cold.file_spans == {sbet_file.name: (sbet_data.time.min(), sbet_data.time.max())}
+
+    # the cache key depends on the sensor
+    assert Sbet(str(tmp_path), "PILLS or RAMMS").get_cache_file() != cache_file
+
+    # a changed sbet file invalidates the cache
+    write_ascii_sbet(tmp_path, sbet_data.iloc[: len(sbet_data) // 2])
+    os.utime(sbet_file, ns=(0, os.stat(sbet_file).st_mtime_ns + 10**9))
+    changed = Sbet(str(tmp_path), sensor)
+    assert changed.get_cache_file() != cache_file
+    changed.set_data()
+    assert len(changed.data) == len(sbet_data) // 2
+    assert not os.path.exists(cache_file)
+
+
+def test_shared_tile_data(tmp_path, sbet_data):
+    write_ascii_sbet(tmp_path, sbet_data)
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.set_data()
+
+    time_min, time_max = sbet.data.time[1000], sbet.data.time[2000]
+    start, end = sbet.get_tile_rows_by_time(time_min, time_max)
+
+    shared_sbet = pickle.loads(pickle.dumps(sbet.share_data()))
+    try:
+        # the workers find the rows of a tile in the shared time index
+        assert shared_sbet.get_tile_rows_by_time(time_min, time_max) == (start, end)
+        tile_ticks, __ = shared_sbet.get_time_index().get_ticks(start, end)
+        np.testing.assert_array_equal(tile_ticks, sbet.time_index.ticks[start:end])
+
+        tile_data = shared_sbet.get_tile_data_by_rows(start, end)
+        expected = sbet.get_tile_data_by_time(time_min, time_max)
+        np.testing.assert_array_equal(tile_data.values, expected.values)
+        assert list(tile_data.columns) == list(expected.columns)
+        assert end - start == len(expected)
+    finally:
+        sbet.release_shared_data()
+
+    assert not os.path.exists(shared_sbet.shared_file)
+    assert not os.path.exists(shared_sbet.ticks_file)
+    assert sbet.shared_file is None
+
+
+def test_time_index(tmp_path, sbet_data, monkeypatch):
+    # a trajectory in two files, with clusters of duplicate time ticks
+    data = sbet_data.copy()
+    t = data.time.values.copy()
+    t[10::50] = t[9::50][: t[10::50].size]
+    t[11::50] = t[9::50][: t[11::50].size] + 1e-9  # the same tick
+    data["time"] = t
+    half = len(data) // 2
+    data.iloc[:half].to_csv(str(tmp_path / "20160517_a_sbet.txt"), sep=" ", header=False, index=False)
+    data.iloc[half:].to_csv(str(tmp_path / "20160517_b_sbet.txt"), sep=" ", header=False, index=False)
+
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.set_data()
+    time_index = sbet.time_index
+    t = sbet.data.time.values
+    ticks = np.round(t * 10**7).astype(np.int64)
+    np.testing.assert_array_equal(time_index.ticks, ticks)
+    assert np.count_nonzero(np.diff(time_index.ticks) == 0) == 2 * len(range(10, len(t), 50))
+    assert time_index.file_spans == {
+        "20160517_a_sbet.txt": (t[0], t[half - 1]),
+        "20160517_b_sbet.txt": (t[half], t[-1]),
+    }
+    assert time_index.get_files(t[half - 100], t[half - 10]) == ["20160517_a_sbet.txt"]
+    assert time_index.get_files(t[half - 10], t[half + 10]) == ["20160517_a_sbet.txt", "20160517_b_sbet.txt"]
+
+    # the queries are binary searches of the index, without converting the trajectory times
+    def get_ticks(t, time_round_decimals=7):
+        assert np.ndim(t) == 0, "trajectory times converted"
+        return np.int64(round(t * 10**7))
+
+    monkeypatch.setattr(Merge, "get_ticks", staticmethod(get_ticks))
+    tiles = []
+    for lo, hi in [(1000, 2000), (9, 61), (11, 59), (0, len(t) - 1)]:
+        start, end = sbet.get_tile_rows_by_time(t[lo] + 20, t[hi] - 20)
+        # the whole clusters of duplicate ticks
+        assert start == np.searchsorted(ticks, ticks[lo], side="left")
+        assert end == np.searchsorted(ticks, ticks[hi], side="right")
+        tiles.append((start, end, time_index.get_ticks(start, end)))
+    monkeypatch.undo()
+
+    # the tile's slice of the index is its sbet ticks
+    for start, end, tile_ticks in tiles:
+        expected = Merge.get_sbet_ticks(sbet.data.values[start:end])
+        np.testing.assert_array_equal(tile_ticks[0], expected[0])
+        assert tile_ticks[1] is expected[1] is None
+
+    # replaced data are indexed again
+    sbet.data = sbet_data
+    assert sbet.get_time_index().ticks.size == len(sbet_data)
+
+
+def test_las_time_offset(tmp_path, sbet_data):
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.data = sbet_data
+    t = sbet.data.time.values
+    las_time_min, las_time_max = t[1000] + 0.002, t[2000] - 0.002
+
+    sow = (t[1000] + sbet.GPS_ADJUSTED_OFFSET) % sbet.SECS_PER_GPS_WK
+    time_bases = [
+        (0.0, 0.0),  # adjusted standard time
+        (sbet.GPS_ADJUSTED_OFFSET, -sbet.GPS_ADJUSTED_OFFSET),  # standard GPS time
+        (sbet.GPS_ADJUSTED_OFFSET - 18, -sbet.GPS_ADJUSTED_OFFSET + 18),  # UTC-based standard time
+        (sow - t[1000], t[1000] - sow),  # GPS seconds-of-week
+    ]
+    time_index = sbet.get_time_index()
+    for las_shift, expected in time_bases:
+        time_index.las_time_offset = None
+        offset = sbet.get_las_time_offset(las_time_min + las_shift, las_time_max + las_shift)
+        assert offset == pytest.approx(expected)
+        assert time_index.las_time_offset == offset
+
+    # the cached offset is reused, and a time range outside of the trajectory keeps it
+    assert sbet.get_las_time_offset(las_time_min + sow - t[1000], las_time_max + sow - t[1000]) == offset
+    assert sbet.get_las_time_offset(t[-1] + 100, t[-1] + 200) == offset
+    assert time_index.las_time_offset == offset
+
+    # a time range in another time base is resolved again
+    assert sbet.get_las_time_offset(las_time_min, las_time_max) == 0.0
@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+
+import laspy
+import numpy as np
+import pytest
+
+from Merge import Merge, MergedData
+from Sensor import Sensor
+from Subaerial import Jacobian, SensorModel, SensorModelCode, Subaerial
+from Tpu import Tpu
+from UserInput import UserInput
+
+from conftest import REPO_DIR, make_config
+
+SENSOR = "Riegl VQ-880-G (1.0 mrad)"
+
+
+def make_merged_data(n=2_000, seed=0):
+    """merged lidar/trajectory data (see Subaerial) of points below a platform"""
+    rng = np.random.default_rng(seed)
+    t = np.sort(rng.uniform(0, 10, n))
+    x_sbet = 1000.0 + 50.0 * t
+    y_sbet = np.full(n, 2000.0)
+    z_sbet = np.full(n, 600.0)
+    x_las = x_sbet + rng.uniform(-200, 200, n)
+    y_las = y_sbet + rng.uniform(-200, 200, n)
+    z_las = rng.normal(0, 2, n)
+    r, p = np.radians(rng.normal(0, 1, (2, n)))
+    h = np.radians(90.0 + rng.normal(0, 0.5, n))
+    return np.vstack((t, t, x_las, y_las, z_las, x_sbet, y_sbet, z_sbet, r, p, h))
+
+
+def test_generated_code_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(SensorModelCode, "cache_dir", str(tmp_path))
+    data = make_merged_data()
+
+    cold = Jacobian(SensorModel(SENSOR))
+    assert cold.Jx is not None
+    cache_file = SensorModelCode.get_cache_file("numexpr")
+    assert os.path.isfile(cache_file)
+
+    warm = Jacobian(SensorModel(SENSOR))
+    assert warm.Jx is None and warm.sensor_model.obs_eq is None
+    for expected, actual in zip(cold.eval_jacobian(data), warm.eval_jacobian(data)):
+        np.testing.assert_array_equal(actual, expected)
+
+    # a warm start doesn't import sympy
+    script = (
+        "import sys; sys.path.insert(0, 'tests'); import conftest, Subaerial;"
+        "Subaerial.SensorModelCode.cache_dir = {!r};"
+        "Subaerial.Jacobian(Subaerial.SensorModel({!r}));"
+        "assert 'sympy' not in sys.modules"
+    ).format(str(tmp_path), SENSOR)
+    subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, check=True)
+
+
+def test_generated_code_cache_invalid(tmp_path, monkeypatch):
+    monkeypatch.setattr(SensorModelCode, "cache_dir", str(tmp_path))
+    cache_file = SensorModelCode.get_cache_file("numexpr")
+    with open(cache_file, "w") as f:
+        f.write("def fR0(h, p):\n")
+
+    # an unusable cache is regenerated
+    assert SensorModel(SENSOR).code is None
+    Jacobian(SensorModel(SENSOR))
+    assert SensorModel(SENSOR).code is not None
+
+
+def test_cse_kernel_matches_terms(monkeypatch):
+    monkeypatch.setattr(Jacobian, "cse_block_size", 1_000)
+    data = make_merged_data(n=2_500)
+    sensor_model = SensorModel(SENSOR)
+
+    expected = Jacobian(sensor_model, "terms").eval_jacobian(data)
+    actual = Jacobian(sensor_model, "cse").eval_jacobian(data)
+    for J, J_ref in zip(actual, expected):
+        assert J.shape == J_ref.shape
+        np.testing.assert_allclose(J, J_ref, rtol=1e-12, atol=1e-12 * np.abs(J_ref).max())
+
+    with pytest.raises(ValueError):
+        Jacobian(sensor_model, "fast")
+
+
+def test_fused_kernel_matches_terms(monkeypatch):
+    monkeypatch.setattr(Jacobian, "cse_block_size", 1_000)
+    data = make_merged_data(n=2_500)
+    stddev = np.abs(np.random.default_rng(1).normal(0.01, 0.003, (9, data.shape[1])))
+    sensor_model = SensorModel(SENSOR)
+    terms = Jacobian(sensor_model, "terms")
+    fused = Jacobian(sensor_model, "fused")
+
+    expected = Subaerial(terms, data, stddev).calc_subaerial_tpu()
+    actual = Subaerial(fused, data, stddev).calc_subaerial_tpu()
+    for u, u_ref in zip(actual, expected):
+        np.testing.assert_allclose(u, u_ref, rtol=1e-12)
+
+    # the subsample fit gives the coefficients of the whole flight line fit
+    terms.get_calc_vals_for_J_eval(data)
+    expected = terms.sensor_model.poly_err_surf_coeffs_x
+    coeffs = fused.fit_poly_surf_coeffs(data)
+    assert coeffs[0] is not expected
+    np.testing.assert_array_equal(coeffs[0], expected)
+
+    # coefficients fit beforehand (chunked mode)
+    expected = Subaerial(terms, data, stddev, coeffs).calc_subaerial_tpu()
+    actual = Subaerial(fused, data, stddev, coeffs).calc_subaerial_tpu()
+    for u, u_ref in zip(actual, expected):
+        np.testing.assert_allclose(u, u_ref, rtol=1e-12)
+
+
+def test_attitude_terms_per_epoch():
+    rng = np.random.default_rng(0)
+    sbet_data = np.zeros((200, 15))
+    sbet_data[:, 6:9] = rng.normal(0, 1, (200, 3)) + [0, 0, 90]  # roll, pitch, heading (degrees)
+    sbet_idx = np.sort(rng.integers(50, 120, 5_000))
+    data = MergedData(sbet_data, sbet_idx, rng.uniform(0, 1, (4, sbet_idx.size)), (0.1, 0.1, 0.025))
+    data_array = np.vstack([data[row] for row in range(11)])
+
+    jacobian = Jacobian(SensorModel(SENSOR), "cse")
+    sensor_model = jacobian.sensor_model
+    num_epochs = []
+
+    def calc_attitude_trig_terms(r, p, h):
+        num_epochs.append(r.size)
+        return jacobian.calc_attitude_trig_terms(r, p, h)
+
+    for f in (sensor_model.calc_rotation_terms, calc_attitude_trig_terms):
+        expected = sensor_model.gather_epoch_terms(data_array, "terms", f)
+        actual = sensor_model.gather_epoch_terms(data, ("terms", f.__name__), f)
+        for a, e in zip(actual, expected):
+            np.testing.assert_array_equal(a, e)
+
+    # the terms are calculated once, for the range of matched epochs, and shared with the subsets
+    subset = data[:, ::3]
+    terms = sensor_model.gather_epoch_terms(subset, ("terms", "calc_attitude_trig_terms"), calc_attitude_trig_terms)
+    np.testing.assert_array_equal(terms[0], np.sin(data_array[8, ::3]))
+    assert num_epochs == [sbet_idx.size, sbet_idx[-1] - sbet_idx[0] + 1]
+
+
+def test_numpy_eval_type_does_not_use_numexpr(monkeypatch):
+    data = make_merged_data()
+    expected = SensorModel(SENSOR)
+    actual = SensorModel(SENSOR, "numpy")
+    for sensor_model in (expected, actual):
+        if sensor_model is actual:
+            monkeypatch.setattr("Subaerial.ne.evaluate", None)
+        sensor_model.estimate_rho_a_b(data)
+        sensor_model.calc_aer_pos_pre(data)
+        sensor_model.calc_diff(data[2], data[3], data[4])
+        sensor_model.calc_poly_surf_coeffs()
+        sensor_model.diagnostic = sensor_model.get_sensor_model_diagnostic_data(data[2:5])
+
+    for a, e in zip(actual.diagnostic, expected.diagnostic):
+        np.testing.assert_allclose(a, e, rtol=1e-9, atol=1e-9)
+
+
+def run_tile_tpu(las_dir, out_dir, sbet_data, eval_type, kernel):
+    config = make_config(las_dir, out_dir, subaerial_backend=eval_type, subaerial_kernel=kernel)
+    sensor_object = Sensor(config["sensor_model"])
+    tpu = Tpu(UserInput(config), sensor_object)
+    jacobian = Jacobian(SensorModel(config["sensor_model"], eval_type), kernel)
+    tpu.calc_tpu((sbet_data, str(las_dir / "tile_a.las"), jacobian, Merge(sensor_object)))
+    return laspy.read(str(out_dir / "tile_a_TPU.las"))
+
+
+@pytest.mark.parametrize("eval_type", SensorModel.eval_types)
+def test_eval_types_agree(eval_type, tmp_path, las_dir, sbet_data):
+    """self-test of the numeric backends on the LAS snippet"""
+    if eval_type == "numba":
+        pytest.importorskip("numba")
+
+    (tmp_path / "expected").mkdir()
+    expected = run_tile_tpu(las_dir, tmp_path / "expected", sbet_data, "numexpr", "terms")
+    for kernel in Jacobian.kernels:
+        out_dir = tmp_path / kernel
+        out_dir.mkdir()
+        actual = run_tile_tpu(las_dir, out_dir, sbet_data, eval_type, kernel)
+        np.testing.assert_allclose(actual.total_thu, expected.total_thu, rtol=1e-6)
+        np.testing.assert_allclose(actual.total_tvu, expected.total_tvu, rtol=1e-6)
+
+    with pytest.raises(ValueError):
+        SensorModel(SENSOR, "cupy")
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Sensor import Sensor
+from Subaqueous import LookupTables, Subaqueous
+
+from conftest import REPO_DIR
+
+
+def make_subaqueous(sensor, n=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    gui_object = SimpleNamespace(wind_ind=1, kd_ind=2, subaqueous_classes=[40, 43])
+    depth = rng.uniform(0, 30, n)
+    classification = rng.choice([2.0, 40.0, 41.0, 43.0], n)  # as in the merged las data
+    return Subaqueous(gui_object, depth, Sensor(sensor), classification)
+
+
+def test_fit_lut_class_mask():
+    subaqueous = make_subaqueous("Riegl VQ-880-G (1.0 mrad)")
+    subaqueous_points = np.isin(subaqueous.classification, [40, 43])
+    np.testing.assert_array_equal(subaqueous.subaqueous_mask, subaqueous_points)
+
+    res_tvu, res_thu, res_range_bias = subaqueous.fit_lut()
+    for res in (res_tvu, res_thu, res_range_bias):
+        assert res.shape == subaqueous.depth.shape
+        assert np.all(res[~subaqueous_points] == 0)
+    assert np.all(res_tvu[subaqueous_points] >= 0.03)
+    assert np.all(res_thu[subaqueous_points] > 0)
+
+
+def test_multi_beam_fit_lut():
+    subaqueous = make_subaqueous("PILLS or RAMMS")
+    fan_angle = np.random.default_rng(1).integers(0, 27, subaqueous.depth.size)
+    subaqueous_points = subaqueous.subaqueous_mask
+
+    res_tvu, res_thu = subaqueous.multi_beam_fit_lut(fan_angle)
+    assert np.all(res_tvu[~subaqueous_points] == 0)
+    assert np.all(res_thu[~subaqueous_points] == 0)
+
+    # sheet of wind 1 and kd 2
+    sensor_object = subaqueous.sensor_object
+    fit_tvu = pd.read_excel(sensor_object.vert_lut, sheet_name=11, header=None, names=["a", "b"])
+    fit_thu = pd.read_excel(sensor_object.horz_lut, sheet_name=11, header=None, names=["a", "b"])
+    for i in np.flatnonzero(subaqueous_points)[:20]:
+        thu = fit_thu.iloc[fan_angle[i]]
+        tvu = fit_tvu.iloc[fan_angle[i]]
+        assert res_thu[i] == thu["a"] * subaqueous.depth[i] + thu["b"]
+        assert res_tvu[i] == max(tvu["a"] * subaqueous.depth[i] + tvu["b"], 0.03)
+
+    # the fan angles of the subaqueous points must be covered by the look up tables
+    fan_angle[~subaqueous_points] = 40
+    subaqueous.multi_beam_fit_lut(fan_angle)
+    fan_angle[np.argmax(subaqueous_points)] = 27
+    with pytest.raises(ValueError):
+        subaqueous.multi_beam_fit_lut(fan_angle)
+
+
+def test_hawkeye_fit_lut():
+    subaqueous = make_subaqueous("HawkEye 4X or 5 400m AGL")
+    rng = np.random.default_rng(1)
+    n = subaqueous.depth.size
+    hawkeye_data = np.vstack((rng.choice([1.0, 2.0, 3.0], n), rng.choice([0.0, 1.0], n)))
+
+    res_tvu, res_thu, res_range_bias = subaqueous.hawkeye_fit_lut(hawkeye_data)
+
+    # row of wind 1 and kd 2
+    sensor_object = subaqueous.sensor_object
+    luts = [
+        pd.read_csv(lut).iloc[8]
+        for lut in (
+            sensor_object.vert_lut_deep_narrow, sensor_object.horz_lut_deep_narrow, sensor_object.range_bias_lut_narrow,
+            sensor_object.vert_lut_deep_wide, sensor_object.horz_lut_deep_wide, sensor_object.range_bias_lut_wide,
+            sensor_object.vert_lut_shallow, sensor_object.horz_lut_shallow, sensor_object.range_bias_lut_shallow,
+        )
+    ]
+    narrow, wide, shallow = luts[0:3], luts[3:6], luts[6:9]
+    for i in range(100):
+        scanner_channel, user_data = hawkeye_data[:, i]
+        if not subaqueous.subaqueous_mask[i] or scanner_channel == 1:
+            expected = (0, 0, 0)
+        else:
+            if scanner_channel == 2 and user_data == 0:
+                tvu, thu, range_bias = shallow
+            elif scanner_channel == 3 and user_data == 1:
+                tvu, thu, range_bias = wide
+            else:
+                tvu, thu, range_bias = narrow
+            x = subaqueous.depth[i]
+            expected = (
+                max(np.hypot(tvu["a"], tvu["b"] * x), 0.03),
+                thu["a"] + thu["b"] * x,
+                range_bias["a"] * x**3 + range_bias["b"] * x**2 + range_bias["c"] * x + range_bias["d"],
+            )
+        np.testing.assert_allclose((res_tvu[i], res_thu[i], res_range_bias[i]), expected, rtol=1e-12)
+
+
+def test_lookup_tables_read_once(monkeypatch):
+    # a sensor that isn't in the look up table pack
+    monkeypatch.setattr(LookupTables, "tables", {})
+    monkeypatch.setattr(LookupTables, "pack", {})
+    subaqueous = make_subaqueous("Riegl VQ-880-G (1.0 mrad)")
+    expected = subaqueous.fit_lut()
+
+    tables = LookupTables.tables["Riegl VQ-880-G (1.0 mrad)"]
+    assert tables["vertical"].shape == (5, 6, 2)
+    assert tables["range_bias"].shape == (5, 6, 4)
+    assert all(table.flags.c_contiguous for table in tables.values())
+
+    # the next flight lines of the sensor don't read the look up tables
+    def read_csv(*args, **kwargs):
+        raise AssertionError("look up table read")
+
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+    for actual, res in zip(make_subaqueous("Riegl VQ-880-G (1.0 mrad)").fit_lut(), expected):
+        np.testing.assert_array_equal(actual, res)
+
+    monkeypatch.setattr(LookupTables, "read", read_csv)
+    with pytest.raises(AssertionError):
+        Sensor("PILLS or RAMMS")
+
+
+def test_lookup_table_pack():
+    """the look up table pack is up to date with the look up tables of lidar_sensors.json"""
+    with open("lidar_sensors.json") as f:
+        sensor_config = json.load(f)
+    pack = LookupTables.load_pack(LookupTables.pack_file)
+    assert set(pack) == set(sensor_config)
+
+    for sensor_name in sensor_config:
+        packed = pack[sensor_name]["tables"]
+        tables = LookupTables.read(sensor_name, sensor_config)
+        assert set(packed) == set(tables)
+        for name, coeffs in tables.items():
+            np.testing.assert_array_equal(packed[name], coeffs)
+
+    # the sensors get their look up tables from the pack, without reading the csv/xlsx files
+    script = (
+        "import sys; sys.path.insert(0, 'tests'); import conftest, pandas, Sensor;"
+        "pandas.read_csv = pandas.read_excel = None;"
+        "tables = Sensor.Sensor('PILLS or RAMMS').subaqueous_luts;"
+        "assert tables['vertical'].shape == (5, 5, 2, 27);"
+        "assert 'openpyxl' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, check=True)
+
+
+def test_lookup_table_pack_validation(tmp_path):
+    with open("lidar_sensors.json") as f:
+        sensor_config = json.load(f)
+    sensor_config = {name: sensor_config[name] for name in ("Riegl VQ-880-G (1.0 mrad)", "PILLS or RAMMS")}
+    pack_file = str(tmp_path / "luts.npy")
+    LookupTables.build_pack(sensor_config, pack_file)
+
+    pack = LookupTables.load_pack(pack_file)
+    assert pack["PILLS or RAMMS"]["tables"]["horizontal"].shape == (5, 5, 2, 27)
+    assert not pack["Riegl VQ-880-G (1.0 mrad)"]["tables"]["vertical"].flags.writeable
+
+    # a missing wind/kd combination
+    data = np.load(pack_file)
+    data[7] = np.nan
+    np.save(pack_file, data)
+    with pytest.raises(ValueError, match="wind, kd"):
+        LookupTables.load_pack(pack_file)
+
+    np.save(pack_file, data[:100])
+    with pytest.raises(ValueError, match="truncated"):
+        LookupTables.load_pack(pack_file)
+
+    assert LookupTables.load_pack(str(tmp_path / "missing.npy")) == {}
+
+
+def test_lookup_table_pack_stale_source(tmp_path, monkeypatch):
+    with open("lidar_sensors.json") as f:
+        sensor_config = json.load(f)
+    sensor_name = "Riegl VQ-880-G (1.0 mrad)"
+    sensor_config = {sensor_name: sensor_config[sensor_name]}
+    luts = sensor_config[sensor_name]["subaqueous_LUTs"]
+    lut = str(tmp_path / "vertical.csv")
+    shutil.copy(luts["vertical"], lut)
+    luts["vertical"] = lut
+
+    pack_file = str(tmp_path / "luts.npy")
+    LookupTables.build_pack(sensor_config, pack_file)
+    monkeypatch.setattr(LookupTables, "pack", LookupTables.load_pack(pack_file))
+    assert LookupTables.get_packed(sensor_name, sensor_config) is not None
+
+    # a new modification time, but the same contents (e.g., a fresh checkout)
+    stat = os.stat(lut)
+    os.utime(lut, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert LookupTables.get_packed(sensor_name, sensor_config) is not None
+
+    # an edited look up table isn't taken from the pack
+    with open(lut) as f:
+        rows = f.read().splitlines()
+    rows[1] = rows[1].replace("0", "1", 1)
+    with open(lut, "w") as f:
+        f.write("\n".join(rows) + "\n")
+    assert LookupTables.get_packed(sensor_name, sensor_config) is None
@@ -0,0 +1,239 @@
+import os
+
+import dill
+import laspy
+import numpy as np
+import pandas as pd
+
+from Las import Las
+from Merge import Merge
+from Sbet import SBET_COLUMNS, Sbet
+from Sensor import Sensor
+from Subaerial import Jacobian, SensorModel
+from Tpu import Tpu, calc_tpu_task
+from UserInput import UserInput
+
+from conftest import LAS_SNIPPET, make_config
+
+
+def make_shared_sbet(tmp_path, sbet_data):
+    """Sbet object holding sbet_data, shared as in multiprocess mode, and its SharedSbet"""
+    sbet_dir = tmp_path / "sbet"
+    sbet_dir.mkdir()
+    sbet = Sbet(str(sbet_dir), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.data = sbet_data[SBET_COLUMNS].reset_index(drop=True)
+    return sbet, sbet.share_data()
+
+
+def test_multiprocess_matches_singleprocess(tmp_path, las_dir, sbet_data):
+    las_file = str(las_dir / "tile_a.las")
+
+    single_dir = tmp_path / "single"
+    single_dir.mkdir()
+    config = make_config(las_dir, single_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    tpu = Tpu(UserInput(config), sensor_object)
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+    tpu.run_tpu_singleprocess(1, [(sbet_data, las_file, jacobian, Merge(sensor_object))])
+
+    multi_dir = tmp_path / "multi"
+    multi_dir.mkdir()
+    config = make_config(las_dir, multi_dir, multiprocess="True")
+    tpu = Tpu(UserInput(config), Sensor(config["sensor_model"]))
+    sbet, shared_sbet = make_shared_sbet(tmp_path, sbet_data)
+    try:
+        # the tasks only carry the las file path
+        p = tpu.run_tpu_multiprocess(1, [las_file], shared_sbet)
+        p.close()
+        p.join()
+        p.clear()
+    finally:
+        sbet.release_shared_data()
+
+    expected = laspy.read(str(single_dir / "tile_a_TPU.las"))
+    actual = laspy.read(str(multi_dir / "tile_a_TPU.las"))
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+
+
+def test_task_pickles_without_tpu(tmp_path, las_dir):
+    config = make_config(las_dir, tmp_path)
+    tpu = Tpu(UserInput(config), Sensor(config["sensor_model"]))
+    las_file = str(las_dir / "tile_a.las")
+    # the pool pickles the mapped function with each task
+    task_bytes = len(dill.dumps((calc_tpu_task, las_file)))
+    bound_bytes = len(dill.dumps((tpu.calc_tpu, las_file)))
+    assert task_bytes < bound_bytes / 2
+
+
+def test_schedule_las_files_largest_first(tmp_path):
+    las = laspy.read(LAS_SNIPPET)
+    las_files = []
+    for name, num_points in (("small.las", 10), ("large.las", 1000), ("medium.las", 100)):
+        tile = laspy.LasData(las.header)
+        tile.points = las.points[:num_points]
+        tile.write(str(tmp_path / name))
+        las_files.append(str(tmp_path / name))
+
+    scheduled = Tpu.schedule_las_files(las_files)
+    assert [os.path.basename(f) for f in scheduled] == ["large.las", "medium.las", "small.las"]
+
+
+def run_flight_line_tasks(tmp_path, las_dir, sbet_data, out_name, **kwargs):
+    las_file = str(las_dir / "tile_a.las")
+    out_dir = tmp_path / out_name
+    out_dir.mkdir()
+    config = make_config(las_dir, out_dir, multiprocess="True", parallel_unit="flight_line", **kwargs)
+    tpu = Tpu(UserInput(config), Sensor(config["sensor_model"]))
+    sbet, shared_sbet = make_shared_sbet(tmp_path / out_name, sbet_data)
+    try:
+        p = tpu.run_tpu_multiprocess_flight_lines(1, [las_file], shared_sbet)
+        p.close()
+        p.join()
+        p.clear()
+    finally:
+        sbet.release_shared_data()
+    return tpu, laspy.read(str(out_dir / "tile_a_TPU.las"))
+
+
+def test_flight_line_tasks_match_tile(tmp_path, las_dir, out_dir, sbet_data):
+    config = make_config(las_dir, out_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    tile_tpu = Tpu(UserInput(config), sensor_object)
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+    tile_tpu.calc_tpu((sbet_data, str(las_dir / "tile_a.las"), jacobian, Merge(sensor_object)))
+    expected = laspy.read(str(out_dir / "tile_a_TPU.las"))
+
+    # one task per flight line
+    fl_tpu, actual = run_flight_line_tasks(tmp_path, las_dir, sbet_data, "fl")
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+    assert fl_tpu.flight_line_stats == tile_tpu.flight_line_stats
+
+    # flight lines split into blocks of points
+    block_tpu, actual = run_flight_line_tasks(
+        tmp_path, las_dir, sbet_data, "blocks", flight_line_block_size=3_000
+    )
+    np.testing.assert_allclose(actual.total_thu, expected.total_thu, rtol=1e-5)
+    np.testing.assert_allclose(actual.total_tvu, expected.total_tvu, rtol=1e-5)
+    assert list(block_tpu.flight_line_stats) == list(tile_tpu.flight_line_stats)
+
+
+def test_standard_gps_time_merged_once(tmp_path, las_dir, out_dir, sbet_data, monkeypatch):
+    config = make_config(las_dir, out_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+
+    # las timestamps in standard gps time, and the same timestamps converted to adjusted standard time
+    las = laspy.read(str(las_dir / "tile_a.las"))
+    las.gps_time = las.gps_time + 1e9
+    std_file = str(tmp_path / "std_tile.las")
+    las.write(std_file)
+    las.gps_time = las.gps_time - 1e9
+    las.write(str(las_dir / "tile_a.las"))
+
+    Tpu(UserInput(config), sensor_object).calc_tpu(
+        (sbet_data, str(las_dir / "tile_a.las"), jacobian, Merge(sensor_object))
+    )
+    expected = laspy.read(str(out_dir / "tile_a_TPU.las"))
+
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.data = sbet_data[SBET_COLUMNS].reset_index(drop=True)
+    tpu = Tpu(UserInput(config), sensor_object)
+
+    calls = []
+    match_timestamps = Merge.match_timestamps
+    monkeypatch.setattr(
+        Merge, "match_timestamps", lambda *args, **kwargs: calls.append(1) or match_timestamps(*args, **kwargs)
+    )
+    tpu.calc_tpu((sbet, std_file, jacobian, Merge(sensor_object)))
+    assert tpu.las_time_offset == -1e9  # resolved from the decoded tile
+    assert len(calls) == 1  # one match for the whole tile
+    assert all(tpu.flight_line_stats.values())
+
+    actual = laspy.read(str(out_dir / "std_tile_TPU.las"))
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+    # the las timestamps are written unchanged
+    np.testing.assert_array_equal(actual.gps_time, laspy.read(std_file).gps_time)
+
+
+def test_tiles_in_different_time_bases(tmp_path, las_dir, out_dir, sbet_data):
+    config = make_config(las_dir, out_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+    merge = Merge(sensor_object)
+
+    # a tile in standard gps time, then a tile in adjusted standard time
+    las = laspy.read(str(las_dir / "tile_a.las"))
+    las.gps_time = las.gps_time + 1e9
+    las.write(str(las_dir / "std_tile.las"))
+    las.gps_time = las.gps_time - 1e9
+    las.write(str(las_dir / "tile_a.las"))
+
+    sbet = Sbet(str(tmp_path), "Riegl VQ-880-G (1.0 mrad)")
+    sbet.data = sbet_data[SBET_COLUMNS].reset_index(drop=True)
+    tpu = Tpu(UserInput(config), sensor_object)
+
+    offsets = []
+    for name in ("std_tile", "tile_a"):
+        tpu.calc_tpu((sbet, str(las_dir / f"{name}.las"), jacobian, merge))
+        offsets.append(tpu.las_time_offset)
+        assert all(tpu.flight_line_stats.values())
+    assert offsets == [-1e9, 0.0]
+
+    expected = laspy.read(str(out_dir / "tile_a_TPU.las"))
+    actual = laspy.read(str(out_dir / "std_tile_TPU.las"))
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+
+
+def test_flight_lines_flown_hours_apart(tmp_path, las_dir, out_dir, sbet_data):
+    config = make_config(las_dir, out_dir)
+    sensor_object = Sensor(config["sensor_model"])
+    jacobian = Jacobian(SensorModel(config["sensor_model"]))
+
+    # the 2nd flight line and its trajectory flown three hours later
+    hours = 3 * 3600.0
+    las_file = str(las_dir / "tile_a.las")
+    las = laspy.read(las_file)
+    later = las.point_source_id == las.point_source_id.max()
+    las.gps_time = las.gps_time + np.where(later, hours, 0.0)
+    las.write(las_file)
+    later_sbet = sbet_data.copy()
+    later_sbet["time"] += hours
+    tile_sbet = pd.concat((sbet_data, later_sbet), ignore_index=True)
+
+    # the flight lines merged with the whole trajectory of the tile
+    tile_tpu = Tpu(UserInput(config), sensor_object)
+    tile_tpu.fl_time_buff = 2 * hours
+    tile_tpu.calc_tpu((tile_sbet, las_file, jacobian, Merge(sensor_object)))
+    expected = laspy.read(str(out_dir / "tile_a_TPU.las"))
+    assert all(tile_tpu.flight_line_stats.values())
+
+    tpu = Tpu(UserInput(config), sensor_object)
+    tpu.calc_tpu((tile_sbet, las_file, jacobian, Merge(sensor_object)))
+    actual = laspy.read(str(out_dir / "tile_a_TPU.las"))
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+
+    # each flight line only takes the trajectory of its own time range
+    las_data, flight_lines = Las(las_file).get_flight_line(sensor_object.type)
+    for fl in np.unique(flight_lines):
+        fl_las = las_data[flight_lines == fl]
+        fl_sbet, __ = tpu.get_fl_sbet("tile_a", fl, tile_sbet, fl_las)
+        t_min, t_max = fl_las["t"].min(), fl_las["t"].max()
+        assert len(fl_sbet) <= (t_max - t_min + 2 * tpu.fl_time_buff) * 200 + 3
+        assert fl_sbet.time.min() < t_min and fl_sbet.time.max() > t_max
+
+    # the same windows in flight line tasks
+    fl_tpu, actual = run_flight_line_tasks(tmp_path, las_dir, tile_sbet, "fl")
+    np.testing.assert_array_equal(actual.total_thu, expected.total_thu)
+    np.testing.assert_array_equal(actual.total_tvu, expected.total_tvu)
+
+    # without the later trajectory, the 2nd flight line isn't merged
+    for out_name, kwargs in (("fl_not_merged", {}), ("blocks_not_merged", {"flight_line_block_size": 3_000})):
+        fl_tpu, actual = run_flight_line_tasks(tmp_path, las_dir, sbet_data, out_name, **kwargs)
+        not_merged = [fl for fl, stats in fl_tpu.flight_line_stats.items() if stats is None]
+        assert len(not_merged) == 1 and not_merged[0].startswith(str(las.point_source_id.max()))
+        np.testing.assert_array_equal(actual.total_thu[~later], expected.total_thu[~later])